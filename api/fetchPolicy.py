@@ -0,0 +1,164 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from utils.local_cache import get_local_cache
+
+# 可以重试的HTTP状态码
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def _get_float_env(name: str, default: float) -> float:
+    """
+    读取正数类型的环境变量，无效时使用默认值
+    """
+    try:
+        value = float(os.environ.get(name, ""))
+        return value if value > 0 else default
+    except ValueError:
+        return default
+
+
+class FetchPolicy:
+    """
+    请求策略：连接/读取超时、有上限的重试次数、带随机抖动的指数退避
+    所有参数都可以通过环境变量配置
+    """
+    def __init__(self,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 15.0,
+                 max_retries: int = 2,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_env(cls) -> "FetchPolicy":
+        """
+        从环境变量创建请求策略
+        FETCH_CONNECT_TIMEOUT / FETCH_READ_TIMEOUT / FETCH_MAX_RETRIES /
+        FETCH_BACKOFF_BASE / FETCH_BACKOFF_MAX
+        """
+        max_retries = os.environ.get("FETCH_MAX_RETRIES", "")
+        return cls(
+            connect_timeout=_get_float_env("FETCH_CONNECT_TIMEOUT", 5.0),
+            read_timeout=_get_float_env("FETCH_READ_TIMEOUT", 15.0),
+            max_retries=int(max_retries) if max_retries.isdigit() else 2,
+            backoff_base=_get_float_env("FETCH_BACKOFF_BASE", 0.5),
+            backoff_max=_get_float_env("FETCH_BACKOFF_MAX", 8.0)
+        )
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return self.connect_timeout, self.read_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """
+        第 attempt 次重试前的等待时间，使用 full jitter：在 [0, min(上限, 基数*2^attempt)] 中随机取值
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, source_id: str, send: Callable[[Tuple[float, float]], requests.Response],
+                deadline: Optional[float] = None) -> Optional[requests.Response]:
+        """
+        按策略发送请求，连接错误、超时以及可重试的状态码会退避后重试
+        设置了 deadline 时，每次尝试的连接/读取超时不超过剩余时间，剩余时间不够退避等待时不再重试
+
+        Args:
+            source_id: 新闻源ID，用于日志
+            send: 接收超时参数并发送请求的函数
+            deadline: 截止时间（time.monotonic()），为空时不限制
+
+        Returns:
+            requests.Response: 最后一次收到的响应，所有尝试都因网络错误失败或到达截止时间时返回None
+        """
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                delay = self.backoff(attempt - 1)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    logging.warning(f"新闻源 {source_id} 剩余时间不足，不再重试")
+                    break
+                logging.warning(f"新闻源 {source_id} 第 {attempt} 次重试，等待 {delay:.2f} 秒")
+                time.sleep(delay)
+            timeout = self.timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+            try:
+                response = send(timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                logging.warning(f"请求新闻源 {source_id} 失败: {e}")
+                response = None
+                continue
+            if response.status_code not in RETRYABLE_STATUS:
+                return response
+            logging.warning(f"请求新闻源 {source_id} 返回状态码 {response.status_code}")
+        return response
+
+
+class CircuitBreaker:
+    """
+    按新闻源的熔断器，状态保存在本地缓存中，跨次运行保留
+    连续失败 failure_threshold 次后熔断，冷却期 cooldown 秒内直接跳过该新闻源；
+    冷却期结束后放行一次请求，成功则恢复，失败则再次熔断
+    """
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 1800):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # 键为新闻源ID，值包含 failures、openedUntil
+        self._states: Dict[str, Dict] = get_local_cache().get_circuit_states()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        """
+        从环境变量创建熔断器
+        CIRCUIT_FAILURE_THRESHOLD / CIRCUIT_COOLDOWN_SECONDS
+        """
+        threshold = os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "")
+        return cls(
+            failure_threshold=int(threshold) if threshold.isdigit() and int(threshold) > 0 else 3,
+            cooldown=_get_float_env("CIRCUIT_COOLDOWN_SECONDS", 1800)
+        )
+
+    def allow(self, source_id: str) -> bool:
+        """
+        新闻源当前是否允许请求
+        """
+        state = self._states.get(source_id)
+        return not state or state["openedUntil"] <= time.time()
+
+    def record_success(self, source_id: str):
+        """
+        记录一次成功，清除失败计数
+        """
+        with self._lock:
+            if source_id not in self._states:
+                return
+            del self._states[source_id]
+        get_local_cache().delete_circuit_state(source_id)
+
+    def record_failure(self, source_id: str):
+        """
+        记录一次失败，连续失败达到阈值时熔断
+        """
+        with self._lock:
+            state = self._states.setdefault(source_id, {"failures": 0, "openedUntil": 0})
+            state["failures"] += 1
+            if state["failures"] >= self.failure_threshold:
+                state["openedUntil"] = time.time() + self.cooldown
+                logging.warning(f"新闻源 {source_id} 连续失败 {state['failures']} 次，熔断 {self.cooldown:.0f} 秒")
+            state = dict(state)
+        get_local_cache().set_circuit_state(source_id, state)
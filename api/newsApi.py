@@ -1,8 +1,32 @@
-import json
+import hashlib
+import os
+import threading
+import time
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
-from pathlib import Path
+
+from api.fetchPolicy import FetchPolicy, CircuitBreaker
+from api.newsItems import decode_stream
+from utils.local_cache import get_local_cache
+from utils.lazy import lazy_instance
+from utils.metrics import run_metrics
+from utils.source_registry import get_sources
+
+# urllib3 只有在安装了 brotli 时才能解码 br 压缩的响应
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+# 新闻源数据与上次成功处理时相同
+STATUS_NOT_MODIFIED = "not_modified"
+# 到达截止时间，请求被中断，不计入熔断失败次数
+STATUS_DEADLINE_EXCEEDED = "deadline_exceeded"
+# 逐块读取响应内容时每块的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class NewsApi:
@@ -10,66 +34,188 @@ class NewsApi:
     news-now 项目中的API
     新闻API调用类，负责从远程API获取新闻数据
     """
-    def __init__(self):
-        self.base_url = "https://fork-newsnow.pages.dev/api/direct-latest"
-        self.source_file = Path(__file__).parent.parent / "news-source.json"
-        self.sources: List[Dict] = []
-        self._load_sources()
+    def __init__(self, pool_size: int = 32):
+        self.base_url = os.environ.get("NEWS_API_BASE_URL", "https://fork-newsnow.pages.dev/api/direct-latest")
+        self.sources: List[Dict] = get_sources()
+        self.session = self._create_session(pool_size)
+        # 超时、重试退避策略和按新闻源的熔断器
+        self.policy = FetchPolicy.from_env()
+        self.circuit_breaker = CircuitBreaker.from_env()
+        # 每个新闻源最近一次成功处理的响应校验信息：etag、lastModified、contentHash、updatedTime
+        self._validators: Dict[str, Dict] = get_local_cache().get_http_validators()
+        # 已获取但尚未确认处理成功的校验信息，处理成功后才生效，避免失败的数据被跳过
+        self._pending_validators: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
 
-    def _load_sources(self):
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
         """
-        加载news-source.json文件中的新闻源配置
+        创建复用连接的会话，并声明支持压缩的响应
         """
-        try:
-            with open(self.source_file, 'r', encoding='utf-8') as f:
-                self.sources = json.load(f)
-            logging.info(f"成功加载 {len(self.sources)} 个新闻源")
-        except Exception as e:
-            logging.error(f"加载新闻源配置文件失败: {e}")
-            self.sources = []
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+        return session
 
-    def fetch_news_by_id(self, source_id: str) -> Optional[Dict]:
+    def fetch_news_by_id(self, source_id: str, deadline: Optional[float] = None) -> Optional[Dict]:
         """
         获取指定新闻源的最新新闻
+        携带上次成功处理时的 ETag/Last-Modified 发送条件请求，
+        返回304、响应内容摘要相同或 updatedTime 相同时不再解析和比较数据；
+        请求按 FetchPolicy 超时和重试，处于熔断冷却期的新闻源直接跳过
         
         Args:
             source_id: 新闻源ID
+            deadline: 截止时间（time.monotonic()），超时和重试不超过截止时间，为空时不限制
             
         Returns:
-            Dict: 新闻数据，如果发生错误返回None
+            Dict: 新闻数据，如果发生错误返回None；
+            数据未变化时返回 {"status": "not_modified", "id": source_id}；
+            到达截止时间仍未获取到数据时返回 {"status": "deadline_exceeded", "id": source_id}
+            响应边读取边解码，items 逐条转为只含 id/title/url 的 NewsItem，extra 等字段不解码，
+            缺少字段或超出字段长度的新闻被丢弃并计入 droppedItems，按原因计入 droppedReasons
             返回格式示例：
             {
                 "status": "success",
                 "id": "zhihu",
                 "updatedTime": 1744359578095,
                 "items": [
-                    {
-                        "id": 1893792294466990800,
-                        "title": "新闻标题",
-                        "url": "https://example.com",
-                        "extra": {
-                            "icon": "图标URL"
-                        }
-                    },
+                    NewsItem(id="1893792294466990800", title="新闻标题", url="https://example.com"),
                     ...
-                ]
+                ],
+                "droppedItems": 0,
+                "droppedReasons": {}
             }
         """
+        if not self.circuit_breaker.allow(source_id):
+            logging.warning(f"新闻源 {source_id} 处于熔断冷却期，跳过")
+            return None
+
+        data = self._fetch(source_id, deadline)
+        if data is None and deadline is not None and time.monotonic() >= deadline:
+            logging.warning(f"新闻源 {source_id} 到达截止时间，留到下次获取")
+            return {"status": STATUS_DEADLINE_EXCEEDED, "id": source_id}
+        if data is None:
+            self.circuit_breaker.record_failure(source_id)
+        else:
+            self.circuit_breaker.record_success(source_id)
+        return data
+
+    def _fetch(self, source_id: str, deadline: Optional[float] = None) -> Optional[Dict]:
+        """
+        发送请求并解析响应，返回值同 fetch_news_by_id
+        """
         url = f"{self.base_url}?id={source_id}"
+        validators = self._validators.get(source_id, {})
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("lastModified"):
+            headers["If-Modified-Since"] = validators["lastModified"]
+        response = None
         try:
-            response = requests.get(url)
+            response = self.policy.request(
+                source_id, lambda timeout: self.session.get(url, headers=headers, timeout=timeout, stream=True), deadline
+            )
+            if response is None:
+                logging.error(f"获取新闻源 {source_id} 失败, 重试 {self.policy.max_retries} 次后仍无法连接")
+                return None
+            if response.status_code == 304:
+                logging.info(f"新闻源 {source_id} 未变化(304)")
+                return {"status": STATUS_NOT_MODIFIED, "id": source_id}
             if response.status_code == 200:
-                data = response.json()
-                if data.get("status") == "success":
-                    return data
-                else:
-                    logging.error(f"获取新闻源 {source_id} 失败: {data.get('message', '未知错误')}")
-            else:
-                logging.error(f"获取新闻源 {source_id} 失败, 状态码: {response.status_code}")
+                return self._decode_response(source_id, response, validators, deadline)
+            logging.error(f"获取新闻源 {source_id} 失败, 状态码: {response.status_code}")
         except Exception as e:
             logging.error(f"获取新闻源 {source_id} 时发生错误: {e}")
+        finally:
+            if response is not None:
+                response.close()
         return None
 
+    def _decode_response(self, source_id: str, response: requests.Response, validators: Dict,
+                         deadline: Optional[float] = None) -> Optional[Dict]:
+        """
+        边读取边解码响应内容，同时计算内容摘要，不把整个响应读入内存；
+        updatedTime 出现在 items 之前且与上次相同时，不再读取和解码 items
+
+        Returns:
+            Dict: 返回值同 fetch_news_by_id
+        """
+        digest = hashlib.sha1()
+        payload_bytes = 0
+
+        def read_chunks():
+            nonlocal payload_bytes
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("到达截止时间，停止读取响应")
+                digest.update(chunk)
+                payload_bytes += len(chunk)
+                yield chunk
+
+        def unchanged(payload: Dict) -> bool:
+            return (payload.get("status") == "success" and bool(payload.get("updatedTime"))
+                    and payload["updatedTime"] == validators.get("updatedTime"))
+
+        # 逐块读取、逐条解码 items，只保留 id/title/url，extra 等字段跳过不解码
+        data = decode_stream(read_chunks(), skip_items=unchanged)
+        run_metrics.record_source(source_id, payloadBytes=payload_bytes)
+        if data.get("status") != "success":
+            logging.error(f"获取新闻源 {source_id} 失败: {data.get('message', '未知错误')}")
+            return None
+
+        new_validators = {
+            "etag": response.headers.get("ETag"),
+            "lastModified": response.headers.get("Last-Modified"),
+            "contentHash": digest.hexdigest(),
+            "updatedTime": data.get("updatedTime")
+        }
+        if "items" not in data:
+            # 没有读完响应，沿用上次的内容摘要
+            logging.info(f"新闻源 {source_id} 更新时间未变化")
+            new_validators["contentHash"] = validators.get("contentHash")
+            self._remember_validators(source_id, new_validators)
+            return {"status": STATUS_NOT_MODIFIED, "id": source_id}
+        if validators and new_validators["contentHash"] == validators.get("contentHash"):
+            logging.info(f"新闻源 {source_id} 内容未变化")
+            self._remember_validators(source_id, new_validators)
+            return {"status": STATUS_NOT_MODIFIED, "id": source_id}
+        if new_validators["updatedTime"] and new_validators["updatedTime"] == validators.get("updatedTime"):
+            logging.info(f"新闻源 {source_id} 更新时间未变化")
+            self._remember_validators(source_id, new_validators)
+            return {"status": STATUS_NOT_MODIFIED, "id": source_id}
+
+        if data.get("droppedItems"):
+            reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(data["droppedReasons"].items()))
+            logging.warning(f"新闻源 {source_id} 有 {data['droppedItems']} 条新闻缺少字段或超出字段长度，已丢弃（{reasons}）")
+        run_metrics.record_source(source_id, droppedItems=data.get("droppedItems", 0))
+        with self._lock:
+            self._pending_validators[source_id] = new_validators
+        return data
+
+    def mark_processed(self, source_id: str):
+        """
+        确认新闻源本次获取的数据已处理成功，之后的请求以本次响应作为条件请求的依据
+
+        Args:
+            source_id: 新闻源ID
+        """
+        with self._lock:
+            validators = self._pending_validators.pop(source_id, None)
+        if validators:
+            self._remember_validators(source_id, validators)
+
+    def _remember_validators(self, source_id: str, validators: Dict):
+        """
+        保存新闻源的响应校验信息到内存和本地缓存
+        """
+        with self._lock:
+            self._validators[source_id] = validators
+        get_local_cache().set_http_validators(source_id, validators)
+
     def get_source_names(self) -> Dict[str, str]:
         """
         获取所有新闻源的ID和名称映射
@@ -88,11 +234,25 @@ class NewsApi:
         """
         return [source["id"] for source in self.sources]
 
-# 创建实例供直接导入使用
-news_api = NewsApi()
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_news_api() -> NewsApi:
+    """
+    获取 NewsApi 实例，第一次调用时创建
+    """
+    return NewsApi()
+
+
+def __getattr__(name):
+    # 兼容 from api.newsApi import news_api 的用法
+    if name == "news_api":
+        return get_news_api()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 使用示例
 if __name__ == "__main__":
+    news_api = get_news_api()
+
     # 获取单个新闻源的数据
     zhihu_news = news_api.fetch_news_by_id("zhihu")
     if zhihu_news:
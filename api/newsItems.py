@@ -0,0 +1,370 @@
+import codecs
+import json
+import re
+import string
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# news_infos 表的字段长度限制
+ORIG_ID_MAX_LENGTH = 50
+TITLE_MAX_LENGTH = 200
+URL_MAX_LENGTH = 255
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# 跳过不需要的值时使用：字符串的剩余部分（开头的引号之后）、数字和 true/false/null、数组或对象中括号以外的部分
+_STRING_REST = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_SCALAR = re.compile(r"[^,\]}\s]+")
+_STRING = r'"[^"\\]*+(?:\\.[^"\\]*+)*+"'
+_CONTAINER_TEXT = re.compile(r'(?:[^"\[\]{}]++|%s)*+' % _STRING, re.S)
+# 不含转义字符的键及其后的冒号，对象成员之间或数组元素之间的分隔符
+_KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,}\]])[ \t\n\r]*')
+_ITEM_FIELD = re.compile(r'"(id|title|url)"[ \t\n\r]*:[ \t\n\r]*"([^"\\\x00-\x1f]*)"[ \t\n\r]*([,}])[ \t\n\r]*')
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+def _nested_container(depth: int) -> str:
+    """
+    匹配嵌套不超过 depth 层的数组或对象的正则，不检查括号是否配对
+    """
+    pattern = r'[\[{](?:[^"\[\]{}]++|%s)*+[\]}]' % _STRING
+    for _ in range(depth - 1):
+        pattern = r'[\[{](?:[^"\[\]{}]++|%s|%s)*+[\]}]' % (_STRING, pattern)
+    return pattern
+
+
+# extra 等字段通常只有几层，一次正则匹配即可跳过，更深的嵌套逐个括号跳过
+_NESTED_CONTAINER = re.compile(_nested_container(4), re.S)
+# 不需要的字段：键、值和之后的分隔符一次跳过
+_SKIPPED_FIELD = re.compile(
+    r'(?!"(?:id|title|url)")"[^"\\]*+"[ \t\n\r]*:[ \t\n\r]*(?:%s|%s|[^,\]}\s"\[{]++)[ \t\n\r]*([,}])[ \t\n\r]*'
+    % (_STRING, _nested_container(4)), re.S
+)
+
+# orig_Id 比较键只转换ASCII字母的大小写
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# 每条新闻需要解码的字段
+ITEM_FIELDS = frozenset(("id", "title", "url"))
+# 丢弃新闻的原因
+DROP_REASONS = ("missingId", "missingTitle", "missingUrl", "tooLong")
+
+
+def orig_id_key(orig_id: str) -> str:
+    """
+    orig_Id 在内存和本地缓存中去重时使用的比较键
+    唯一键 uk_source_orig 在 MySQL 上按 utf8mb4_general_ci、在 SQLite 上按 NOCASE 比较，都不区分大小写，
+    只有大小写不同的orig_Id在数据库中是同一条新闻，缓存中也要视为同一条；
+    只转换两种排序规则都不区分的ASCII字母，不会把数据库认为不同的orig_Id当作重复而跳过。
+    general_ci 另外忽略的非ASCII字母大小写、重音和末尾空格在缓存中仍视为不同，这些新闻由数据库唯一键拒绝
+
+    Args:
+        orig_id: 新闻源返回的原始ID
+
+    Returns:
+        str: 比较键
+    """
+    return orig_id.translate(_ASCII_LOWER)
+
+
+class NewsItem:
+    """
+    一条新闻的紧凑记录，只保留写入 news_infos 的字段
+    """
+    __slots__ = ("id", "title", "url")
+
+    def __init__(self, id: str, title: str, url: str):
+        self.id = id
+        self.title = title
+        self.url = url
+
+    @classmethod
+    def from_raw(cls, raw, drops: Optional[Dict[str, int]] = None) -> Optional["NewsItem"]:
+        """
+        从API返回的一条新闻创建记录，同时按字段长度校验：
+        标题超长时截断，ID或链接超长时无法正确保存，返回None
+
+        Args:
+            raw: API返回的一条新闻，包含 id、title、url，其余字段忽略
+            drops: 按原因统计丢弃的新闻数量，键为 DROP_REASONS 中的原因，为空时不统计
+
+        Returns:
+            NewsItem: 校验通过的记录，缺少字段或校验失败返回None
+        """
+        reason = None
+        if not isinstance(raw, dict) or raw.get("id") is None:
+            reason = "missingId"
+        elif not isinstance(raw.get("title"), str):
+            reason = "missingTitle"
+        elif not isinstance(raw.get("url"), str):
+            reason = "missingUrl"
+        else:
+            orig_id = str(raw["id"])
+            url = raw["url"]
+            if len(orig_id) > ORIG_ID_MAX_LENGTH or len(url) > URL_MAX_LENGTH:
+                reason = "tooLong"
+            else:
+                return cls(orig_id, raw["title"][:TITLE_MAX_LENGTH], url)
+        if drops is not None:
+            drops[reason] = drops.get(reason, 0) + 1
+        return None
+
+    def __repr__(self) -> str:
+        return f"NewsItem(id={self.id!r}, title={self.title!r}, url={self.url!r})"
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _expect(text: str, pos: int, char: str) -> int:
+    """
+    跳过空白后检查下一个字符，返回该字符之后的位置
+    """
+    pos = _skip_whitespace(text, pos)
+    if pos >= len(text) or text[pos] != char:
+        raise ValueError(f"位置 {pos} 处应为 {char!r}")
+    return pos + 1
+
+
+def _next_char(text: str, pos: int) -> Tuple[str, int]:
+    """
+    跳过空白，返回下一个字符及其位置
+    """
+    pos = _skip_whitespace(text, pos)
+    if pos >= len(text):
+        raise ValueError("数据不完整")
+    return text[pos], pos
+
+
+def _decode_value(text: str, pos: int) -> Tuple[object, int]:
+    """
+    解码从 pos 开始的一个JSON值，值之后必须还有分隔符，避免数字在块的边界被截断
+    """
+    value, end = _decoder.raw_decode(text, _skip_whitespace(text, pos))
+    if end >= len(text) or text[end] in _NUMBER_CHARS:
+        raise ValueError("数据不完整")
+    return value, end
+
+
+def _skip_value(text: str, pos: int) -> int:
+    """
+    跳过从 pos 开始的一个JSON值，不解码其内容，返回该值之后的位置
+    """
+    pos = _skip_whitespace(text, pos)
+    if pos >= len(text):
+        raise ValueError("数据不完整")
+    char = text[pos]
+    if char == '"':
+        match = _STRING_REST.match(text, pos + 1)
+        if match is None:
+            raise ValueError("字符串不完整")
+        return match.end()
+    if char not in "[{":
+        match = _SCALAR.match(text, pos)
+        if match is None or match.end() >= len(text):
+            raise ValueError("数据不完整")
+        return match.end()
+    match = _NESTED_CONTAINER.match(text, pos)
+    if match is not None:
+        return match.end()
+    # 嵌套更深或数据不完整：一次跳过括号之间的普通字符和完整的字符串，只在括号处计算层数
+    depth = 0
+    while True:
+        pos = _CONTAINER_TEXT.match(text, pos).end()
+        if pos >= len(text) or text[pos] == '"':
+            raise ValueError("数据不完整")
+        if text[pos] in "[{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+
+
+def _decode_item(text: str, pos: int) -> Tuple[Tuple[Optional[Dict], bool], int]:
+    """
+    解码 items 数组中的一条新闻及其后的分隔符，只解码 ITEM_FIELDS 中的字段，extra 等字段的值直接跳过
+
+    Returns:
+        Tuple: ((只含需要字段的字典，不是对象时为None, 是否为数组的最后一条), 分隔符之后的位置)
+    """
+    char, pos = _next_char(text, pos)
+    if char != "{":
+        raw = None
+        pos = _skip_value(text, pos)
+    else:
+        raw = {}
+        pos = _skip_whitespace(text, pos + 1)
+        if text.startswith("}", pos):
+            pos += 1
+        else:
+            while True:
+                # 需要的字段是不含转义字符的字符串时，一次正则匹配到分隔符之后
+                match = _ITEM_FIELD.match(text, pos)
+                if match is not None:
+                    key, raw[key], separator = match.groups()
+                    pos = match.end()
+                    if separator == "}":
+                        break
+                    continue
+                match = _SKIPPED_FIELD.match(text, pos)
+                if match is not None:
+                    pos = match.end()
+                    if match.group(1) == "}":
+                        break
+                    continue
+                # 不含转义字符的键用一次正则匹配到值的开头
+                match = _KEY.match(text, pos)
+                if match is None:
+                    key, pos = _decode_value(text, pos)
+                    pos = _expect(text, pos, ":")
+                else:
+                    key, pos = match.group(1), match.end()
+                if key in ITEM_FIELDS:
+                    raw[key], pos = _decode_value(text, pos)
+                else:
+                    pos = _skip_value(text, pos)
+                match = _SEPARATOR.match(text, pos)
+                if match is None:
+                    raise ValueError(f"位置 {pos} 处应为 ',' 或 '}}'")
+                pos = match.end()
+                if match.group(1) == "}":
+                    break
+    match = _SEPARATOR.match(text, pos)
+    if match is None or match.group(1) == "}":
+        raise ValueError(f"位置 {pos} 处应为 ',' 或 ']'")
+    return (raw, match.group(1) == "]"), match.end()
+
+
+class _StreamReader:
+    """
+    按块读取响应内容的解码缓冲区，只保留尚未解码的部分
+    """
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """
+        丢弃已解码的部分，把下一块数据追加到缓冲区
+        """
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._decoder.decode(chunk)
+                return
+        self.text += self._decoder.decode(b"", final=True)
+        self.eof = True
+
+    def read(self, step: Callable[[str, int], Tuple[object, int]]):
+        """
+        在缓冲区上执行一步解码，数据不完整时读取下一块后从同一位置重试
+
+        Args:
+            step: 接收 (缓冲区, 位置)，返回 (解码结果, 之后的位置) 的函数
+
+        Returns:
+            解码结果
+        """
+        while True:
+            try:
+                value, self.pos = step(self.text, self.pos)
+                return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def next_char(self) -> str:
+        """
+        跳过空白并返回下一个字符，位置停在该字符上
+        """
+        return self.read(_next_char)
+
+    def expect(self, char: str):
+        if self.next_char() != char:
+            raise ValueError(f"应为 {char!r}")
+        self.pos += 1
+
+
+def _read_items(reader: _StreamReader, drops: Dict[str, int]) -> List[NewsItem]:
+    """
+    逐条解码 items 数组，每条新闻解码后立即转为 NewsItem
+    """
+    items: List[NewsItem] = []
+    reader.expect("[")
+    if reader.next_char() == "]":
+        reader.pos += 1
+        return items
+    # 循环内是热点路径，绑定为局部变量
+    read = reader.read
+    from_raw = NewsItem.from_raw
+    append = items.append
+    while True:
+        raw, last = read(_decode_item)
+        item = from_raw(raw, drops)
+        if item is not None:
+            append(item)
+        if last:
+            return items
+
+
+def decode_stream(chunks: Iterable[bytes], skip_items: Optional[Callable[[Dict], bool]] = None) -> Dict:
+    """
+    按块增量解码新闻源的响应：顶层字段正常解码，items 数组逐条解码，
+    每条新闻只解码 id/title/url 并立即转为 NewsItem，extra 等字段跳过不解码，
+    内存占用只与一块数据和保留的字段有关，与响应大小无关
+
+    Args:
+        chunks: 响应内容的字节块（UTF-8编码的JSON对象），如 response.iter_content()
+        skip_items: 遇到 items 时用已解码的顶层字段调用，返回True时停止解码，不再读取之后的数据
+
+    Returns:
+        Dict: 顶层字段，其中 items 为 NewsItem 列表，
+              droppedItems 为缺少字段或未通过长度校验而丢弃的新闻数量，
+              droppedReasons 为按原因统计的丢弃数量（键见 DROP_REASONS）；
+              skip_items 返回True时只包含 items 之前的顶层字段
+    """
+    reader = _StreamReader(chunks)
+    payload: Dict = {}
+    reader.expect("{")
+    if reader.next_char() == "}":
+        reader.pos += 1
+        return payload
+    while True:
+        key = reader.read(_decode_value)
+        reader.expect(":")
+        if key == "items" and reader.next_char() == "[":
+            if skip_items is not None and skip_items(payload):
+                return payload
+            drops: Dict[str, int] = {}
+            payload["items"] = _read_items(reader, drops)
+            payload["droppedItems"] = sum(drops.values())
+            payload["droppedReasons"] = drops
+        else:
+            payload[key] = reader.read(_decode_value)
+        char = reader.next_char()
+        reader.pos += 1
+        if char == ",":
+            continue
+        if char != "}":
+            raise ValueError("响应不是有效的JSON对象")
+        return payload
+
+
+def decode_payload(content: bytes) -> Dict:
+    """
+    解码已完整读取的响应内容，返回值同 decode_stream
+
+    Args:
+        content: 响应内容（UTF-8编码的JSON对象）
+    """
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return decode_stream([content])
@@ -0,0 +1,145 @@
+"""
+news_infos 去重索引基准测试
+
+在临时表 news_infos_bench 中分别写入 1万/10万/100万 行数据，
+对比添加 (sourceId, createDateTime) 索引和 (sourceId, orig_Id) 唯一键前后
+按渠道查询最新记录、按 orig_Id 去重查询的执行计划和耗时，结果以JSON输出
+
+用法：
+    python -m benchmark.dedup_index [--sizes 10000,100000,1000000] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import pymysql
+
+from db.dbManager import db_manager
+
+BENCH_TABLE = "news_infos_bench"
+SOURCE_COUNT = 33
+INSERT_CHUNK = 5000
+
+CREATE_SQL = f"""
+    CREATE TABLE {BENCH_TABLE} (
+        `id` int NOT NULL AUTO_INCREMENT,
+        `orig_Id` varchar(50) NULL DEFAULT NULL,
+        `sourceId` varchar(20) NULL DEFAULT NULL,
+        `title` varchar(200) NULL DEFAULT NULL,
+        `url` varchar(255) NULL DEFAULT NULL,
+        `createDateTime` datetime NULL DEFAULT NULL,
+        PRIMARY KEY (`id`) USING BTREE
+    ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci
+"""
+
+INDEX_SQL = [
+    f"ALTER TABLE {BENCH_TABLE} ADD INDEX idx_source_create (sourceId, createDateTime)",
+    f"ALTER TABLE {BENCH_TABLE} ADD UNIQUE KEY uk_source_orig (sourceId, orig_Id)",
+]
+
+# 待测查询：push_news 原来使用的最新记录查询，以及唯一键去重查询
+QUERIES = {
+    "latest_by_source": f"""
+        SELECT id, sourceId, orig_Id, title, url, createDateTime
+        FROM {BENCH_TABLE} WHERE sourceId = %s
+        ORDER BY createDateTime DESC LIMIT 90
+    """,
+    "dedup_by_orig_id": f"""
+        SELECT orig_Id FROM {BENCH_TABLE}
+        WHERE sourceId = %s AND orig_Id IN ({", ".join(["%s"] * 30)})
+    """,
+}
+
+
+def fill_table(cursor, conn, rows: int):
+    """
+    重建临时表并写入指定行数的模拟数据
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    cursor.execute(CREATE_SQL)
+    start = datetime.now() - timedelta(days=365)
+    sql = f"""
+        INSERT INTO {BENCH_TABLE} (orig_Id, title, url, sourceId, createDateTime)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    for offset in range(0, rows, INSERT_CHUNK):
+        batch = []
+        for i in range(offset, min(offset + INSERT_CHUNK, rows)):
+            source_id = f"source{i % SOURCE_COUNT}"
+            batch.append((
+                str(i),
+                f"benchmark title {i}",
+                f"https://example.com/news/{i}",
+                source_id,
+                start + timedelta(seconds=i * 30)
+            ))
+        cursor.executemany(sql, batch)
+        conn.commit()
+    cursor.execute(f"ANALYZE TABLE {BENCH_TABLE}")
+    cursor.fetchall()
+
+
+def measure(cursor, rows: int, repeat: int) -> Dict[str, Dict]:
+    """
+    获取每个查询的执行计划并多次执行统计耗时
+    """
+    results = {}
+    for name, sql in QUERIES.items():
+        timings = []
+        plan = None
+        for _ in range(repeat):
+            source_id = f"source{random.randrange(SOURCE_COUNT)}"
+            params = [source_id]
+            if name == "dedup_by_orig_id":
+                params.extend(str(random.randrange(rows)) for _ in range(30))
+            if plan is None:
+                cursor.execute("EXPLAIN " + sql, params)
+                plan = cursor.fetchall()
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            "plan": [
+                {key: row.get(key) for key in ("type", "key", "rows", "filtered", "Extra")}
+                for row in plan
+            ],
+            "median_ms": round(statistics.median(timings), 3),
+            "max_ms": round(max(timings), 3),
+        }
+    return results
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict]:
+    """
+    按数据量依次执行基准测试
+    """
+    report = []
+    with db_manager.connection() as conn:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            try:
+                for rows in sizes:
+                    fill_table(cursor, conn, rows)
+                    before = measure(cursor, rows, repeat)
+                    for sql in INDEX_SQL:
+                        cursor.execute(sql)
+                    cursor.execute(f"ANALYZE TABLE {BENCH_TABLE}")
+                    cursor.fetchall()
+                    after = measure(cursor, rows, repeat)
+                    report.append({"rows": rows, "without_index": before, "with_index": after})
+            finally:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="news_infos 去重索引基准测试")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="逗号分隔的数据量")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询的执行次数")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    print(json.dumps(run(sizes, args.repeat), ensure_ascii=False, indent=2))
@@ -0,0 +1,179 @@
+"""
+本地模拟的 direct-latest 新闻API，用于离线基准测试
+
+每次请求某个新闻源时，该新闻源会新增 new_items_per_request 条新闻，
+响应返回最新的 items_per_source 条，格式与 fork-newsnow.pages.dev/api/direct-latest 一致
+
+用法：
+    python -m benchmark.fake_news_api --port 8787 --sources 33 --latency-ms 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeNewsApi:
+    """
+    模拟新闻API服务，可配置新闻源数量、每次返回条数、新增条数、延迟、标题长度和错误率
+    """
+    def __init__(self,
+                 source_count: int = 33,
+                 items_per_source: int = 30,
+                 new_items_per_request: int = 3,
+                 latency_ms: float = 50,
+                 latency_jitter_ms: float = 20,
+                 error_rate: float = 0.0,
+                 title_length: int = 40,
+                 host: str = "127.0.0.1",
+                 port: int = 0):
+        self.source_count = source_count
+        self.items_per_source = items_per_source
+        self.new_items_per_request = new_items_per_request
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.title_length = title_length
+        self.host = host
+        self.port = port
+        # 每个新闻源当前最新一条新闻的序号
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0}
+
+    def source_ids(self) -> List[str]:
+        return [f"bench{i}" for i in range(self.source_count)]
+
+    def sources(self) -> List[Dict]:
+        """
+        生成与 news-source.json 格式一致的新闻源配置
+        """
+        return [{"id": source_id, "name": source_id} for source_id in self.source_ids()]
+
+    def build_payload(self, source_id: str) -> bytes:
+        """
+        生成一次响应的内容，并让该新闻源新增 new_items_per_request 条新闻
+        """
+        with self._lock:
+            latest = self._counters.get(source_id, self.items_per_source - self.new_items_per_request)
+            latest += self.new_items_per_request
+            self._counters[source_id] = latest
+        padding = "x" * max(0, self.title_length - 16)
+        items = [
+            {
+                "id": f"{source_id}-{seq}",
+                "title": f"{source_id} {seq} {padding}"[:self.title_length],
+                "url": f"https://example.com/{source_id}/{seq}",
+                "extra": {"icon": f"https://example.com/icon/{source_id}.png"}
+            }
+            for seq in range(latest, max(0, latest - self.items_per_source), -1)
+        ]
+        payload = {
+            "status": "success",
+            "id": source_id,
+            "updatedTime": int(time.time() * 1000),
+            "items": items
+        }
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay = max(0.0, api.latency_ms + random.uniform(-api.latency_jitter_ms, api.latency_jitter_ms))
+                time.sleep(delay / 1000)
+                source_id = parse_qs(urlparse(self.path).query).get("id", [""])[0]
+                with api._lock:
+                    api.stats["requests"] += 1
+                if not source_id or random.random() < api.error_rate:
+                    with api._lock:
+                        api.stats["errors"] += 1
+                    self.send_response(500 if source_id else 400)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = api.build_payload(source_id)
+                with api._lock:
+                    api.stats["bytes"] += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> str:
+        """
+        在后台线程启动服务
+
+        Returns:
+            str: 可以直接作为 NEWS_API_BASE_URL 的地址
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-news-api", daemon=True)
+        self._thread.start()
+        return f"http://{self.host}:{self.port}/api/direct-latest"
+
+    def stop(self):
+        """
+        停止服务
+        """
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """
+    添加模拟API的命令行参数
+    """
+    parser.add_argument("--sources", type=int, default=33, help="新闻源数量")
+    parser.add_argument("--items", type=int, default=30, help="每次返回的新闻条数")
+    parser.add_argument("--new-per-request", type=int, default=3, help="每次请求新增的新闻条数")
+    parser.add_argument("--latency-ms", type=float, default=50, help="平均响应延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的概率")
+    parser.add_argument("--title-length", type=int, default=40, help="标题长度，用于控制响应大小")
+
+
+def from_arguments(args, port: int = 0) -> FakeNewsApi:
+    """
+    根据命令行参数创建模拟API
+    """
+    return FakeNewsApi(
+        source_count=args.sources,
+        items_per_source=args.items,
+        new_items_per_request=args.new_per_request,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        title_length=args.title_length,
+        port=port
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟新闻API")
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8787, help="监听端口")
+    args = parser.parse_args()
+    api = from_arguments(args, args.port)
+    print(f"模拟新闻API已启动: {api.start()}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        api.stop()
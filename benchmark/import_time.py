@@ -0,0 +1,89 @@
+"""
+启动耗时基准测试
+
+用 python -X importtime 在新进程中多次导入入口模块，统计导入的总耗时和自身耗时最多的模块，
+每次定时任务（cron、Worker）启动都要付出这部分开销，导入模块本身不应创建连接池、读取配置或配置日志
+
+用法：
+    python -m benchmark.import_time --modules main,api.newsApi,db.dbManager --repeat 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    解析 -X importtime 的输出，每行格式为：
+    import time: self [us] | cumulative | imported package
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        entries.append({
+            "module": parts[2].strip(),
+            "selfUs": int(parts[0]),
+            "cumulativeUs": int(parts[1])
+        })
+    return entries
+
+
+def measure(module: str) -> Dict:
+    """
+    在新进程中导入一次模块，返回进程墙钟耗时和 importtime 明细
+    """
+    started = time.monotonic()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, env=dict(os.environ)
+    )
+    wall_seconds = time.monotonic() - started
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"导入 {module} 失败: {errors[-1] if errors else completed.returncode}")
+    entries = parse_importtime(completed.stderr)
+    total = next((entry["cumulativeUs"] for entry in entries if entry["module"] == module), None)
+    return {"wallSeconds": wall_seconds, "importUs": total, "entries": entries}
+
+
+def run(modules: List[str], repeat: int, top: int) -> Dict:
+    """
+    对每个模块执行 repeat 次导入，取中位数，并列出最后一次自身耗时最多的模块
+    """
+    results = {}
+    for module in modules:
+        runs = [measure(module) for _ in range(repeat)]
+        last_entries = sorted(runs[-1]["entries"], key=lambda entry: entry["selfUs"], reverse=True)
+        results[module] = {
+            "wallSecondsMedian": round(statistics.median(run["wallSeconds"] for run in runs), 4),
+            "importMsMedian": round(statistics.median(run["importUs"] or 0 for run in runs) / 1000, 2),
+            "modules": len(runs[-1]["entries"]),
+            "slowest": [
+                {"module": entry["module"], "selfMs": round(entry["selfUs"] / 1000, 2),
+                 "cumulativeMs": round(entry["cumulativeUs"] / 1000, 2)}
+                for entry in last_entries[:top]
+            ]
+        }
+    return {"python": sys.version.split()[0], "repeat": repeat, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="入口模块导入耗时基准测试")
+    parser.add_argument("--modules", default="main,api.newsApi,db.dbManager", help="逗号分隔的模块名")
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的导入次数")
+    parser.add_argument("--top", type=int, default=15, help="列出自身耗时最多的模块数量")
+    args = parser.parse_args()
+    modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    print(json.dumps(run(modules, args.repeat, args.top), ensure_ascii=False, indent=2))
@@ -0,0 +1,182 @@
+"""
+渠道租约分片的本地多进程测试
+
+启动多个工作进程，共用一个本地数据库（默认 SQLite 文件，--backend mysql 时使用 DB_HOST/DB_NAME 等环境变量，
+数据库名必须包含 bench），每个进程按心跳间隔认领渠道租约并上报持有的渠道。
+运行一段时间后强制结束（SIGKILL）其中一个进程，检查：
+- 任意时刻没有两个进程同时认为自己持有同一个渠道
+- 结束前所有渠道都被存活的进程持有，且各进程持有数不超过份额
+结果为JSON，检查不通过时退出码为1
+
+用法：
+    python -m benchmark.lease_workers --workers 3 --sources 33 --ttl 6 --duration 30
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+
+def worker(name: str, source_ids: List[str], ttl: int, reports, stop_event, env: Dict[str, str]):
+    """
+    工作进程：按心跳间隔认领租约，上报 (进程名, 上报时间, 本地租约失效时间, 持有的渠道)
+    """
+    os.environ.update(env)
+    from utils.source_sharding import SourceSharding
+
+    sharding = SourceSharding(source_ids, owner=name, ttl_seconds=ttl)
+    try:
+        while not stop_event.is_set():
+            reported_at = time.time()
+            owned = sharding.heartbeat()
+            valid_until = reported_at + sharding.ttl_seconds - sharding.heartbeat_seconds
+            reports.put((name, reported_at, valid_until, sorted(owned)))
+            stop_event.wait(sharding.heartbeat_seconds)
+    finally:
+        sharding.release()
+        reports.put((name, time.time(), time.time(), []))
+
+
+def find_overlaps(reports: List[tuple]) -> List[Dict]:
+    """
+    根据各进程的上报计算每个渠道被持有的时间段，返回不同进程时间段重叠的记录
+    一次上报持有的渠道从上报时间开始，到下一次上报或本地租约失效为止
+    """
+    by_worker = defaultdict(list)
+    for name, reported_at, valid_until, owned in reports:
+        by_worker[name].append((reported_at, valid_until, owned))
+
+    intervals = defaultdict(list)
+    for name, entries in by_worker.items():
+        entries.sort()
+        for index, (reported_at, valid_until, owned) in enumerate(entries):
+            end = valid_until
+            if index + 1 < len(entries):
+                end = min(end, entries[index + 1][0])
+            for source_id in owned:
+                intervals[source_id].append((reported_at, end, name))
+
+    overlaps = []
+    for source_id, spans in intervals.items():
+        spans.sort()
+        for (start_a, end_a, name_a), (start_b, end_b, name_b) in zip(spans, spans[1:]):
+            if name_a != name_b and start_b < end_a:
+                overlaps.append({"sourceId": source_id, "workers": [name_a, name_b],
+                                 "seconds": round(end_a - start_b, 3)})
+    return overlaps
+
+
+def run(args) -> Dict:
+    """
+    执行测试并返回结果
+    """
+    env = {"DB_BACKEND": args.backend}
+    if args.backend == "sqlite":
+        path = args.sqlite_path or os.path.join(tempfile.mkdtemp(), "leases.sqlite3")
+        for suffix in ("", "-wal", "-shm"):
+            Path(path + suffix).unlink(missing_ok=True)
+        env["SQLITE_PATH"] = path
+    else:
+        env["DB_NAME"] = args.db_name
+        os.environ.update(env)
+        from db.migrations import run_migrations
+        if not run_migrations():
+            raise RuntimeError("执行数据库迁移失败")
+
+    source_ids = [f"source{index:02d}" for index in range(args.sources)]
+    context = multiprocessing.get_context("spawn")
+    reports = context.Queue()
+    # 每个进程单独一个停止事件，被强制结束的进程可能在等待事件时持有事件内部的锁
+    stop_events = {f"worker{index}": context.Event() for index in range(args.workers)}
+    processes = {
+        name: context.Process(
+            target=worker, args=(name, source_ids, args.ttl, reports, stop_event, env), daemon=True
+        )
+        for name, stop_event in stop_events.items()
+    }
+    for process in processes.values():
+        process.start()
+
+    collected = []
+
+    def drain(seconds: float):
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            try:
+                collected.append(reports.get(timeout=0.2))
+            except Exception:
+                pass
+
+    # 运行一段时间后强制结束第一个进程，它持有的租约只能等到期后由其他进程接管
+    drain(args.duration / 2)
+    killed = "worker0"
+    processes[killed].kill()
+    killed_at = time.time()
+    drain(args.duration / 2)
+
+    final = {}
+    for name, _, _, owned in collected:
+        if name != killed:
+            final[name] = owned
+    # 子进程退出前要先把队列中的数据交给主进程，边读取边等待退出
+    for name, stop_event in stop_events.items():
+        if name != killed:
+            stop_event.set()
+    deadline = time.time() + 10
+    while any(process.is_alive() for process in processes.values()) and time.time() < deadline:
+        drain(0.5)
+    drain(0.5)
+
+    survivors = args.workers - 1
+    share = math.ceil(args.sources / survivors) if survivors else args.sources
+    covered = sorted(source_id for owned in final.values() for source_id in owned)
+    takeover = [
+        reported_at - killed_at for name, reported_at, _, owned in collected
+        if name != killed and reported_at > killed_at and len(owned) == share
+    ]
+    overlaps = find_overlaps(collected)
+    checks = {
+        "noOverlap": not overlaps,
+        "allCovered": covered == source_ids,
+        "withinShare": all(len(owned) <= share for owned in final.values())
+    }
+    return {
+        "config": {"backend": args.backend, "workers": args.workers, "sources": args.sources,
+                   "ttl": args.ttl, "duration": args.duration},
+        "checks": checks,
+        "passed": all(checks.values()),
+        "finalOwnership": {name: len(owned) for name, owned in sorted(final.items())},
+        "firstFullShareAfterKillSeconds": round(min(takeover), 3) if takeover else None,
+        "overlaps": overlaps[:20],
+        "reports": len(collected)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="渠道租约分片的本地多进程测试")
+    parser.add_argument("--workers", type=int, default=3, help="工作进程数量，至少2个")
+    parser.add_argument("--sources", type=int, default=33, help="渠道数量")
+    parser.add_argument("--ttl", type=int, default=6, help="租约有效期（秒）")
+    parser.add_argument("--duration", type=float, default=30, help="运行时长（秒），一半时强制结束一个进程")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite", help="存储后端")
+    parser.add_argument("--sqlite-path", help="SQLite 数据库文件，默认使用临时目录，运行前删除")
+    parser.add_argument("--db-name", default="news_publisher_bench", help="mysql 后端使用的数据库名，必须包含 bench")
+    args = parser.parse_args()
+
+    if args.workers < 2:
+        print("至少需要2个工作进程", file=sys.stderr)
+        sys.exit(2)
+    if args.backend == "mysql" and "bench" not in args.db_name:
+        print("数据库名必须包含 bench", file=sys.stderr)
+        sys.exit(2)
+
+    result = run(args)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0 if result["passed"] else 1)
@@ -0,0 +1,148 @@
+"""
+push_news 端到端离线基准测试
+
+启动本地模拟新闻API，连接一个可随意清空的本地 MySQL/MariaDB 数据库（表会被重建），
+多轮执行 push_news 和旧数据清理，输出每轮的总耗时、各阶段耗时（fetch/dedup/insert/retention）
+和数据库往返次数，结果为JSON，便于在不同版本之间对比
+
+数据库连接使用 DB_HOST/DB_USER/DB_PASSWORD 环境变量，数据库名由 --db-name 指定，
+为避免误删数据，数据库名必须包含 bench
+--backend sqlite 时改用嵌入式 SQLite，数据库文件由 --sqlite-path 指定，每次运行前删除重建
+
+用法：
+    python -m benchmark.run_pipeline --sources 33 --rounds 3 --output bench.json
+    python -m benchmark.run_pipeline --backend sqlite --sources 33 --rounds 3
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmark.fake_news_api import add_arguments, from_arguments
+
+TABLE_STRUCT_DIR = Path(__file__).parent.parent / "db" / "tableStruct"
+
+
+def split_sql_file(path: Path) -> List[str]:
+    """
+    把表结构SQL文件拆分为单条语句，去掉注释
+    """
+    text = path.read_text(encoding="utf-8")
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = "\n".join(line for line in text.splitlines() if not line.strip().startswith("--"))
+    return [statement.strip() for statement in text.split(";") if statement.strip()]
+
+
+def prepare_sqlite(path: str):
+    """
+    删除旧的 SQLite 基准测试数据库文件，第一次连接时按 db/tableStruct/sqlite 重新建表
+    """
+    for suffix in ("", "-wal", "-shm"):
+        Path(path + suffix).unlink(missing_ok=True)
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = path
+
+
+def prepare_database():
+    """
+    按 db/tableStruct 重建基准测试数据库中的表，并执行迁移
+    """
+    from db.dbManager import db_manager
+    from db.migrations import run_migrations
+
+    with db_manager.session():
+        for path in sorted(TABLE_STRUCT_DIR.glob("*.sql")):
+            for statement in split_sql_file(path):
+                if not db_manager.execute(statement):
+                    raise RuntimeError(f"执行 {path.name} 失败")
+        db_manager.commit()
+    if not run_migrations():
+        raise RuntimeError("执行数据库迁移失败")
+
+
+def run(args) -> Dict:
+    """
+    执行基准测试并返回结果
+    """
+    fake_api = from_arguments(args)
+    os.environ["NEWS_API_BASE_URL"] = fake_api.start()
+    if args.backend == "sqlite":
+        prepare_sqlite(args.sqlite_path)
+    else:
+        os.environ["DB_BACKEND"] = "mysql"
+        os.environ["DB_NAME"] = args.db_name
+    os.environ["FETCH_CONCURRENCY"] = str(args.concurrency)
+    # 基准测试不使用本地缓存和快照，每轮都走完整流程
+    os.environ.pop("LOCAL_CACHE_PATH", None)
+    os.environ.pop("SNAPSHOT_DIR", None)
+
+    try:
+        if args.backend == "mysql":
+            prepare_database()
+        # 环境变量设置完成后再导入，保证模块级实例使用基准测试配置
+        from main import NewsPublisher, cleanup_old_news
+        from utils.metrics import run_metrics
+
+        publisher = NewsPublisher(sources=fake_api.sources())
+        rounds = []
+        for round_no in range(1, args.rounds + 1):
+            run_metrics.reset()
+            started = time.monotonic()
+            results = publisher.push_news()
+            cleanup_old_news()
+            wall_seconds = time.monotonic() - started
+            metrics = run_metrics.snapshot()
+            rounds.append({
+                "round": round_no,
+                "wallSeconds": round(wall_seconds, 3),
+                "newItems": sum(result["newCount"] for result in results.values()),
+                "failedSources": sum(1 for result in results.values() if result["status"] == "failed"),
+                "stages": metrics["stages"],
+                "counters": metrics["counters"]
+            })
+    finally:
+        fake_api.stop()
+
+    return {
+        "config": {
+            "backend": args.backend,
+            "sources": args.sources,
+            "items": args.items,
+            "newPerRequest": args.new_per_request,
+            "latencyMs": args.latency_ms,
+            "jitterMs": args.jitter_ms,
+            "errorRate": args.error_rate,
+            "titleLength": args.title_length,
+            "concurrency": args.concurrency,
+            "rounds": args.rounds
+        },
+        "server": fake_api.stats,
+        "rounds": rounds
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="push_news 端到端离线基准测试")
+    add_arguments(parser)
+    parser.add_argument("--rounds", type=int, default=3, help="执行轮数")
+    parser.add_argument("--concurrency", type=int, default=8, help="FETCH_CONCURRENCY")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql", help="存储后端")
+    parser.add_argument("--db-name", default="news_publisher_bench", help="基准测试使用的数据库名，必须包含 bench")
+    parser.add_argument("--sqlite-path", default="data/news_publisher_bench.sqlite3",
+                        help="--backend sqlite 时使用的数据库文件，运行前删除")
+    parser.add_argument("--output", help="结果JSON的输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    if args.backend == "mysql" and "bench" not in args.db_name:
+        print("数据库名必须包含 bench，基准测试会重建其中的表", file=sys.stderr)
+        sys.exit(2)
+
+    result = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(result, encoding="utf-8")
+    else:
+        print(result)
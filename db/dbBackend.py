@@ -0,0 +1,125 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from utils.lazy import lazy_instance
+
+
+# 数据库暂时不可用时驱动抛出的异常类型（pymysql 和 sqlite3 都遵循 DB-API 的命名）
+RETRYABLE_ERRORS = ("OperationalError", "InterfaceError")
+
+
+class StorageBackend(ABC):
+    """
+    存储后端接口，dbNewsInfos、dbPushInfoLatest 等表操作类只通过该接口访问数据库
+    - DBManager：MySQL，连接池，每条语句一次网络往返
+    - SQLiteManager：嵌入式 SQLite（WAL模式），用于单机/边缘部署和本地快速测试、基准测试
+
+    SQL统一使用 %s 占位符；dialect 为 mysql 或 sqlite，两种方言写法不同的语句由表操作类按 dialect 选择
+    每个线程在执行SQL时绑定一个连接，直到 commit/rollback 或 session() 结束
+    """
+    dialect = ""
+
+    @abstractmethod
+    def session(self):
+        """
+        上下文管理器：在代码块内把一个连接绑定到当前线程，退出时回滚未提交的事务并释放连接
+        """
+
+    @abstractmethod
+    def connect(self) -> bool:
+        """
+        为当前线程绑定一个数据库连接
+        """
+
+    @abstractmethod
+    def release(self, rollback: bool = True):
+        """
+        释放当前线程绑定的连接
+        """
+
+    @abstractmethod
+    def close(self):
+        """
+        关闭所有连接
+        """
+
+    @abstractmethod
+    def execute(self, sql, params=None) -> bool:
+        """
+        执行SQL语句，失败时记录日志并返回False
+        """
+
+    @abstractmethod
+    def executemany(self, sql, params_list) -> bool:
+        """
+        批量执行SQL语句，失败时记录日志并返回False
+        """
+
+    @abstractmethod
+    def fetchall(self):
+        """
+        获取所有查询结果
+        """
+
+    @abstractmethod
+    def fetchone(self):
+        """
+        获取一条查询结果
+        """
+
+    @abstractmethod
+    def commit(self):
+        """
+        提交事务，不在 session() 代码块内时同时释放连接
+        """
+
+    @abstractmethod
+    def rollback(self):
+        """
+        回滚事务，不在 session() 代码块内时同时释放连接
+        """
+
+    @abstractmethod
+    def get_last_insert_id(self) -> Optional[int]:
+        """
+        获取最近一条INSERT语句插入的第一条记录的ID（多行INSERT时为第一行）
+        """
+
+    @abstractmethod
+    def get_rows_affected(self) -> int:
+        """
+        获取最近一次操作影响的行数
+        """
+
+    def record_error(self, error: Optional[Exception]):
+        """
+        记录当前线程最近一次数据库操作的错误，执行成功时记为None
+        """
+        self._local.last_error = error
+
+    def last_error_retryable(self) -> bool:
+        """
+        当前线程最近一次数据库操作是否因为数据库暂时不可用而失败：
+        连接失败、连接断开或超时、锁等待超时等（DB-API 的 OperationalError/InterfaceError），稍后重试可能成功；
+        唯一键冲突、数据超长、SQL错误以及写入结果与预期不符等数据错误，重试也不会成功
+        """
+        error = getattr(self._local, "last_error", None)
+        return isinstance(error, ConnectionError) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_manager() -> StorageBackend:
+    """
+    获取存储后端实例，第一次调用时按环境变量 DB_BACKEND 创建：
+    mysql（默认）为 DBManager，sqlite 为 SQLiteManager
+    """
+    backend = os.environ.get("DB_BACKEND", "mysql").lower()
+    if backend == "sqlite":
+        from .dbSqlite import SQLiteManager
+        return SQLiteManager()
+    if backend != "mysql":
+        raise ValueError(f"不支持的存储后端 DB_BACKEND={backend}，可选 mysql、sqlite")
+    from .dbManager import DBManager
+    return DBManager()
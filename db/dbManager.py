@@ -1,20 +1,38 @@
 import pymysql
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import pathlib
 import logging
 from typing import Optional
 
-class DBManager:
+from utils.logger import format_params
+from utils.metrics import run_metrics
+from .dbBackend import StorageBackend, get_db_manager  # noqa: F401
+
+# MySQL错误码：数据库不存在
+ER_BAD_DB_ERROR = 1049
+
+class DBManager(StorageBackend):
     """
-    数据库管理类，负责数据库连接、关闭等操作
+    MySQL存储后端，负责数据库连接池、连接检出归还等操作
     使用.env文件中的配置信息进行连接
+
+    每个线程在执行SQL时从连接池检出一个连接并绑定到当前线程，
+    直到 commit/rollback 或 session() 结束时归还，每次执行SQL都使用新的游标
     """
+    dialect = "mysql"
     _instance = None
+    # 数据库是否已确认存在，每个进程只需确认一次
+    _database_ready = False
+    _database_lock = threading.Lock()
     
     def __new__(cls):
         """
-        单例模式，确保只有一个数据库连接实例
+        单例模式，确保整个进程共用一个连接池
         """
         if cls._instance is None:
             cls._instance = super(DBManager, cls).__new__(cls)
@@ -39,81 +57,301 @@ class DBManager:
         self.password = os.getenv('DB_PASSWORD', 'password')
         self.db_name = os.getenv('DB_NAME', 'stock_data')
         self.charset = os.getenv('DB_CHARSET', 'utf8mb4')
+
+        # 连接池参数
+        self.pool_size = self._get_int_env('DB_POOL_SIZE', 8)
+        self.pool_timeout = self._get_int_env('DB_POOL_TIMEOUT', 30)
+        # 连接空闲超过该秒数后，检出时先做健康检查
+        self.ping_interval = self._get_int_env('DB_POOL_PING_INTERVAL', 30)
+        # 连接和读写超时，数据库无响应时语句以连接错误失败，新数据转入本地暂存区，不会一直阻塞抓取；
+        # 读取超时包含语句的执行时间，迁移中的 ALTER TABLE 也受其限制，默认值留有余量
+        self.connect_timeout = self._get_int_env('DB_CONNECT_TIMEOUT', 10)
+        self.read_timeout = self._get_int_env('DB_READ_TIMEOUT', 300)
+        self.write_timeout = self._get_int_env('DB_WRITE_TIMEOUT', 60)
         
-        # 初始化连接和游标为None
-        self.conn = None
-        self.cursor = None
+        # 空闲连接池，元素为 (连接, 最后使用时间)
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._pool_lock = threading.Lock()
+        # 每个线程当前绑定的连接和游标
+        self._local = threading.local()
         self._initialized = True
-    
+
+    @staticmethod
+    def _get_int_env(name: str, default: int) -> int:
+        """
+        读取正整数类型的环境变量，无效时使用默认值
+        """
+        value = os.getenv(name)
+        if not value or not value.isdigit() or int(value) < 1:
+            return default
+        return int(value)
+
+    def _open_connection(self, with_database: bool = True):
+        """
+        建立一个新的数据库连接
+        """
+        params = {
+            "host": self.host,
+            "user": self.user,
+            "password": self.password,
+            "charset": self.charset,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "write_timeout": self.write_timeout
+        }
+        if with_database:
+            params["database"] = self.db_name
+        return pymysql.connect(**params)
+
+    def _create_connection(self):
+        """
+        建立连接到指定数据库的新连接
+        如果数据库不存在，则创建，每个进程只执行一次
+        """
+        try:
+            conn = self._open_connection()
+        except pymysql.err.OperationalError as e:
+            if e.args[0] != ER_BAD_DB_ERROR or DBManager._database_ready:
+                raise
+            self._ensure_database()
+            conn = self._open_connection()
+        DBManager._database_ready = True
+        return conn
+
+    def _ensure_database(self):
+        """
+        创建数据库（如果不存在）
+        """
+        with DBManager._database_lock:
+            if DBManager._database_ready:
+                return
+            conn = self._open_connection(with_database=False)
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
+            finally:
+                conn.close()
+            DBManager._database_ready = True
+
+    def _checkout(self):
+        """
+        从连接池检出一个可用连接
+        空闲连接不足且未达到上限时新建连接，否则等待其他线程归还
+        """
+        try:
+            conn, last_used = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._create_connection()
+                except Exception:
+                    with self._pool_lock:
+                        self._created -= 1
+                    raise
+            try:
+                conn, last_used = self._pool.get(timeout=self.pool_timeout)
+            except queue.Empty:
+                raise TimeoutError(f"等待数据库连接超时({self.pool_timeout}秒)")
+
+        # 健康检查，连接失效时重新连接
+        if time.monotonic() - last_used >= self.ping_interval:
+            try:
+                run_metrics.incr("db_round_trips")
+                conn.ping(reconnect=True)
+            except Exception as e:
+                logging.warning(f"数据库连接已失效，重新建立连接: {e}")
+                self._discard(conn)
+                with self._pool_lock:
+                    self._created += 1
+                try:
+                    return self._create_connection()
+                except Exception:
+                    with self._pool_lock:
+                        self._created -= 1
+                    raise
+        return conn
+
+    def _return(self, conn):
+        """
+        将连接归还连接池
+        """
+        self._pool.put((conn, time.monotonic()))
+
+    def _discard(self, conn):
+        """
+        关闭并丢弃一个连接
+        """
+        with self._pool_lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """
+        检出一个连接，退出时归还连接池
+        当前线程已绑定连接时直接复用该连接
+
+        使用示例：
+            with db_manager.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+                conn.commit()
+        """
+        bound = getattr(self._local, "conn", None)
+        if bound is not None:
+            yield bound
+            return
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except pymysql.err.OperationalError:
+            broken = True
+            raise
+        finally:
+            if broken:
+                self._discard(conn)
+            else:
+                try:
+                    conn.rollback()
+                    self._return(conn)
+                except Exception:
+                    self._discard(conn)
+
+    @contextmanager
+    def session(self):
+        """
+        在代码块内把一个连接绑定到当前线程，execute/commit 等方法都使用该连接
+        退出时回滚未提交的事务并归还连接池
+        """
+        if getattr(self._local, "conn", None) is not None:
+            yield self
+            return
+        self.connect()
+        self._local.in_session = True
+        try:
+            yield self
+        finally:
+            self._local.in_session = False
+            self.release()
+
     def connect(self):
         """
-        连接到数据库
+        为当前线程检出一个数据库连接
         如果数据库不存在，则创建
         """
+        if getattr(self._local, "conn", None) is not None:
+            return True
         try:
-            # 先连接不指定数据库
-            self.conn = pymysql.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                charset=self.charset
-            )
-            self.cursor = self.conn.cursor()
-            
-            # 创建数据库（如果不存在）
-            self.cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.db_name}")
-            
-            # 关闭当前连接
-            self.close()
-            
-            # 连接到指定数据库
-            self.conn = pymysql.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.db_name,
-                charset=self.charset
-            )
-            self.cursor = self.conn.cursor()
+            self._local.conn = self._checkout()
             return True
         except Exception as e:
             logging.error(f"数据库连接出错: {e}")
             return False
+
+    def release(self, rollback: bool = True):
+        """
+        关闭当前线程的游标，回滚未提交的事务并把连接归还连接池
+
+        Args:
+            rollback: 归还前是否回滚，事务已提交或回滚时无需再次回滚
+        """
+        self._close_cursor()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        try:
+            if rollback:
+                conn.rollback()
+            self._return(conn)
+        except Exception:
+            self._discard(conn)
+
+    def _close_cursor(self):
+        """
+        关闭当前线程的游标
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            self._local.cursor = None
+
+    def _new_cursor(self):
+        """
+        为当前线程的连接创建新的游标
+        """
+        self._close_cursor()
+        self._local.cursor = self._local.conn.cursor()
+        return self._local.cursor
+
+    def _drop_broken_connection(self):
+        """
+        执行出错后如果连接已断开，丢弃该连接，下次执行时重新检出
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.open:
+            return
+        self._close_cursor()
+        self._local.conn = None
+        self._discard(conn)
     
     def close(self):
         """
-        关闭数据库连接和游标
+        关闭当前线程绑定的连接以及连接池中的所有空闲连接
         """
-        if self.cursor:
-            self.cursor.close()
-            self.cursor = None
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        self._close_cursor()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            self._discard(conn)
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
     
     def execute(self, sql, params=None):
         """
         执行SQL语句
         """
         try:
-            if not self.conn or not self.cursor:
-                if not self.connect():
-                    error_msg = "数据库连接失败，无法执行SQL\n" \
-                               f"SQL: {repr(sql)}\n" \
-                               f"参数: {repr(params) if params else '无'}"
-                    logging.error(error_msg)
-                    return False
+            if not self.connect():
+                self.record_error(ConnectionError("数据库连接失败"))
+                error_msg = "数据库连接失败，无法执行SQL\n" \
+                           f"SQL: {format_params(sql)}\n" \
+                           f"参数: {format_params(params)}"
+                logging.error(error_msg)
+                return False
             
+            cursor = self._new_cursor()
+            run_metrics.incr("db_statements")
+            run_metrics.incr("db_round_trips")
             if params:
-                self.cursor.execute(sql, params)
+                cursor.execute(sql, params)
             else:
-                self.cursor.execute(sql)
+                cursor.execute(sql)
+            self.record_error(None)
             return True
         except Exception as e:
+            self.record_error(e)
             error_msg = f"执行SQL出错: {e}\n" \
-                       f"SQL: {repr(sql)}\n" \
-                       f"参数: {repr(params) if params else '无'}"
+                       f"SQL: {format_params(sql)}\n" \
+                       f"参数: {format_params(params)}"
             logging.error(error_msg)
+            self._drop_broken_connection()
             return False
     
     def executemany(self, sql, params_list):
@@ -121,52 +359,70 @@ class DBManager:
         批量执行SQL语句
         """
         try:
-            if not self.conn or not self.cursor:
-                if not self.connect():
-                    error_msg = "数据库连接失败，无法执行批量SQL\n" \
-                               f"SQL: {repr(sql)}\n" \
-                               f"参数列表: {repr(params_list)}"
-                    logging.error(error_msg)
-                    return False
+            if not self.connect():
+                self.record_error(ConnectionError("数据库连接失败"))
+                error_msg = "数据库连接失败，无法执行批量SQL\n" \
+                           f"SQL: {format_params(sql)}\n" \
+                           f"参数列表: {format_params(params_list)}"
+                logging.error(error_msg)
+                return False
                     
-            self.cursor.executemany(sql, params_list)
+            cursor = self._new_cursor()
+            run_metrics.incr("db_statements", len(params_list))
+            run_metrics.incr("db_round_trips")
+            cursor.executemany(sql, params_list)
+            self.record_error(None)
             return True
         except Exception as e:
+            self.record_error(e)
             error_msg = f"批量执行SQL出错: {e}\n" \
-                       f"SQL: {repr(sql)}\n" \
-                       f"参数列表: {repr(params_list)}"
+                       f"SQL: {format_params(sql)}\n" \
+                       f"参数列表: {format_params(params_list)}"
             logging.error(error_msg)
+            self._drop_broken_connection()
             return False
     
     def fetchall(self):
         """
         获取所有查询结果
         """
-        if self.cursor:
-            return self.cursor.fetchall()
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.fetchall()
         return None
     
     def fetchone(self):
         """
         获取一条查询结果
         """
-        if self.cursor:
-            return self.cursor.fetchone()
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.fetchone()
         return None
     
     def commit(self):
         """
         提交事务
+        不在 session() 代码块内时，提交后把连接归还连接池
         """
-        if self.conn:
-            self.conn.commit()
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            run_metrics.incr("db_round_trips")
+            conn.commit()
+            if not getattr(self._local, "in_session", False):
+                self.release(rollback=False)
     
     def rollback(self):
         """
         回滚事务
+        不在 session() 代码块内时，回滚后把连接归还连接池
         """
-        if self.conn:
-            self.conn.rollback()
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            run_metrics.incr("db_round_trips")
+            conn.rollback()
+            if not getattr(self._local, "in_session", False):
+                self.release(rollback=False)
     
     def get_last_insert_id(self) -> Optional[int]:
         """
@@ -175,8 +431,9 @@ class DBManager:
         Returns:
             int: 最后插入的记录ID，如果没有则返回None
         """
-        if self.cursor:
-            return self.cursor.lastrowid
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.lastrowid
         return None
 
     def get_rows_affected(self) -> int:
@@ -186,8 +443,9 @@ class DBManager:
         Returns:
             int: 受影响的行数
         """
-        if self.cursor:
-            return self.cursor.rowcount
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.rowcount
         return 0
     
     def __del__(self):
@@ -195,6 +453,10 @@ class DBManager:
         析构函数，确保关闭连接
         """
         self.close()
-        
-# 创建实例供直接导入使用
-db_manager = DBManager()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_manager 的用法，返回按 DB_BACKEND 选择的存储后端
+    if name == "db_manager":
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
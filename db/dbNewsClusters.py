@@ -0,0 +1,176 @@
+import logging
+import os
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .dbBackend import get_db_manager
+from api.newsItems import NewsItem
+from utils.lazy import lazy_instance
+from utils.simhash import URL_BAND, bucket_keys, fingerprint, is_near_duplicate
+from utils.time_utils import china_now
+
+# 新闻的指纹：(标题SimHash, 规范化链接哈希)
+Fingerprint = Tuple[Optional[int], Optional[int]]
+
+_SIGN_BIT = 1 << 63
+
+
+class dbNewsClusters:
+    """
+    处理news_lsh_buckets表的数据库操作：跨渠道近似重复新闻的 SimHash/LSH 索引
+    每条新闻按标题指纹的28个16位段和规范化链接写入最多29个桶，查找时只按桶精确匹配，
+    并且只匹配 CLUSTER_WINDOW_HOURS（默认48）小时内的新闻，过期的桶记录由清理任务删除；
+    每个桶最多取最新的 CLUSTER_BUCKET_LIMIT（默认32）条候选，相似标题集中的桶也不会让候选数量随时间窗口增长
+    """
+    def __init__(self, window_hours: Optional[int] = None, bucket_limit: Optional[int] = None):
+        self.db = get_db_manager()
+        window_env = os.environ.get("CLUSTER_WINDOW_HOURS", "")
+        self.window_hours = window_hours or (int(window_env) if window_env.isdigit() and int(window_env) > 0 else 48)
+        limit_env = os.environ.get("CLUSTER_BUCKET_LIMIT", "")
+        self.bucket_limit = bucket_limit or (int(limit_env) if limit_env.isdigit() and int(limit_env) > 0 else 32)
+
+    def _to_db(self, value: Optional[int]) -> Optional[int]:
+        """
+        SQLite 的整数是有符号64位，无符号的指纹和链接哈希按补码转换为有符号数保存
+        """
+        if value is None or self.db.dialect != "sqlite" or value < _SIGN_BIT:
+            return value
+        return value - (_SIGN_BIT << 1)
+
+    def _from_db(self, value: Optional[int]) -> Optional[int]:
+        """
+        把 _to_db 保存的值转换回无符号数
+        """
+        if value is None or value >= 0:
+            return value
+        return value + (_SIGN_BIT << 1)
+
+    def assign_clusters(self, news_list: List[NewsItem]) -> Optional[Tuple[List[Optional[int]], List[Fingerprint]]]:
+        """
+        为待插入的新闻查找所属的新闻簇，一次查询取出所有候选
+        链接相同，或标题指纹的汉明距离不超过阈值的新闻属于同一簇；匹配到多个簇时取最早的簇
+
+        同一批新闻之间不互相匹配，并发处理的渠道同时出现同一条新闻时会各自成簇，
+        之后出现的转载仍会归入其中最早的簇
+
+        Args:
+            news_list: 待插入的新闻列表
+
+        Returns:
+            Tuple: (每条新闻的簇ID，没有匹配时为None, 每条新闻的指纹)，查询失败返回None
+        """
+        fingerprints = [fingerprint(item.title, item.url) for item in news_list]
+        keys: Set[Tuple[int, int]] = set()
+        for title_hash, url_hash in fingerprints:
+            keys.update(bucket_keys(title_hash, url_hash))
+        if not keys:
+            return [None] * len(news_list), fingerprints
+
+        candidates = self._find_candidates(keys)
+        if candidates is None:
+            return None
+
+        cluster_ids = []
+        for title_hash, url_hash in fingerprints:
+            matched = None
+            for key in bucket_keys(title_hash, url_hash):
+                for cluster_id, other_hash in candidates.get(key, ()):
+                    if key[0] == URL_BAND or is_near_duplicate(title_hash, other_hash):
+                        if matched is None or cluster_id < matched:
+                            matched = cluster_id
+            cluster_ids.append(matched)
+        return cluster_ids, fingerprints
+
+    def _find_candidates(self, keys: Iterable[Tuple[int, int]]) -> Optional[Dict[Tuple[int, int], List[Tuple[int, Optional[int]]]]]:
+        """
+        查询时间窗口内落在指定桶中的新闻，每个桶最多取最新的 bucket_limit 条
+
+        Returns:
+            Dict: 键为 (段号, 段值)，值为 (簇ID, 标题SimHash) 列表，查询失败返回None
+        """
+        keys = list(keys)
+        params = [china_now() - timedelta(hours=self.window_hours)]
+        for band, bucket in keys:
+            params.extend((band, self._to_db(bucket)))
+        params.append(self.bucket_limit)
+        sql = """
+            SELECT band, bucket, clusterId, simhash FROM (
+                SELECT band, bucket, clusterId, simhash,
+                       ROW_NUMBER() OVER (PARTITION BY band, bucket ORDER BY newsInfoId DESC) AS bucketRank
+                FROM news_lsh_buckets
+                WHERE createDateTime >= %s AND (band, bucket) IN (
+        """ + ", ".join(["(%s, %s)"] * len(keys)) + """
+                )
+            ) ranked
+            WHERE bucketRank <= %s
+        """
+
+        try:
+            if not self.db.execute(sql, params):
+                logging.error("查询近似重复新闻候选失败")
+                return None
+            candidates: Dict[Tuple[int, int], List[Tuple[int, Optional[int]]]] = {}
+            for band, bucket, cluster_id, simhash in self.db.fetchall() or []:
+                candidates.setdefault((band, self._from_db(bucket)), []).append((cluster_id, self._from_db(simhash)))
+            return candidates
+
+        except Exception as e:
+            logging.error(f"查询近似重复新闻候选时发生错误: {e}")
+            return None
+
+    def add_buckets(self, entries: List[Tuple[int, int, Fingerprint]], commit: bool = True) -> bool:
+        """
+        把新插入的新闻写入LSH桶，使用一条多行 INSERT IGNORE 语句完成
+
+        Args:
+            entries: 每个元素为 (news_infos主键ID, 簇ID, 指纹)，自成一簇的新闻簇ID为自身ID
+            commit: 是否立即提交事务，为False时由调用方负责提交或回滚
+
+        Returns:
+            bool: 是否写入成功
+        """
+        current_time = china_now()
+        params = []
+        rows = 0
+        for news_info_id, cluster_id, (title_hash, url_hash) in entries:
+            for band, bucket in bucket_keys(title_hash, url_hash):
+                params.extend((band, self._to_db(bucket), news_info_id, cluster_id, self._to_db(title_hash), current_time))
+                rows += 1
+        if not rows:
+            return True
+
+        sql = """
+            INSERT IGNORE INTO news_lsh_buckets
+            (band, bucket, newsInfoId, clusterId, simhash, createDateTime)
+            VALUES
+        """ + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * rows)
+
+        try:
+            if not self.db.execute(sql, params):
+                self.db.rollback()
+                logging.error("写入近似重复新闻索引失败")
+                return False
+            if commit:
+                self.db.commit()
+            return True
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"写入近似重复新闻索引时发生错误: {e}")
+            return False
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_news_clusters() -> dbNewsClusters:
+    """
+    获取 dbNewsClusters 实例，第一次调用时创建
+    """
+    return dbNewsClusters()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_news_clusters 的用法
+    if name == "db_news_clusters":
+        return get_db_news_clusters()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
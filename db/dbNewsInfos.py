@@ -1,70 +1,121 @@
-from datetime import datetime
-import pytz
-from typing import Dict, Optional, List
-from .dbManager import db_manager
+from typing import Dict, FrozenSet, Optional, List, Tuple
+from .dbBackend import get_db_manager
+from .dbRetention import get_db_retention
+from api.newsItems import NewsItem
 import logging
+from utils.lazy import lazy_instance
+from utils.time_utils import china_now
 
 class dbNewsInfos:
     """
     处理news_infos表的批量写入操作
     """
     def __init__(self):
-        self.db = db_manager
+        self.db = get_db_manager()
 
-    def batch_insert_news(self, news_list):
+    def batch_insert_news(self, source_id: str, news_list: List[NewsItem], commit: bool = True,
+                          cluster_ids: Optional[List[Optional[int]]] = None) -> Optional[List[Tuple[int, int]]]:
         """
-        批量插入新闻信息
+        批量插入同一渠道的新闻信息，使用一条多行 INSERT IGNORE 语句完成
+        (sourceId, orig_Id) 已存在的新闻由唯一键 uk_source_orig 拒绝，不会重复插入
         
         Args:
-            news_list: 包含新闻信息的列表，每个元素是一个字典，包含：
-                - orig_Id: 原始ID，但有问题，会有中文，很乱不统一
+            source_id: 原渠道
+            news_list: NewsItem 列表，字段长度已在解码时校验：
+                - id: 原始ID（orig_Id），但有问题，会有中文，很乱不统一
                 - title: 新闻标题
                 - url: 新闻链接
-                - sourceId：原渠道
+            commit: 是否立即提交事务，为False时由调用方负责提交或回滚
+            cluster_ids: 与news_list对应的近似重复新闻簇ID，为空表示自成一簇
                 
         Returns:
-            bool: 插入是否成功
+            List[Tuple[int, int]]: 新插入记录的 (主键ID, 在news_list中的下标)，按插入顺序排列，
+            已存在的新闻不包含在内，插入失败返回None
         """
         if not news_list:
             logging.warning("新闻列表为空，无需插入")
-            return True
+            return []
 
-        current_time = datetime.now(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
+        current_time = china_now()
         
-        # 准备批量插入的数据
-        insert_data = [
-            (
-                news['orig_Id'],
-                news['title'],
-                news['url'],
-                news['sourceId'],
-                current_time
-            )
-            for news in news_list
-        ]
+        # 准备批量插入的数据，展开为一条多行INSERT的参数
+        params = []
+        for index, news in enumerate(news_list):
+            params.extend((
+                news.id,
+                news.title,
+                news.url,
+                source_id,
+                current_time,
+                cluster_ids[index] if cluster_ids else None
+            ))
         
         # SQL语句
         sql = """
-            INSERT INTO news_infos 
-            (orig_Id, title, url, sourceId,createDateTime)
-            VALUES (%s, %s, %s, %s, %s)
-        """
+            INSERT IGNORE INTO news_infos 
+            (orig_Id, title, url, sourceId, createDateTime, clusterId)
+            VALUES 
+        """ + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(news_list))
         
         try:
             # 执行批量插入
-            success = self.db.executemany(sql, insert_data)
-            if success:
-                self.db.commit()
-                return True
-            else:
+            success = self.db.execute(sql, params)
+            if not success:
                 self.db.rollback()
                 logging.error("批量插入新闻数据失败")
-                return False
+                return None
+
+            first_id = self.db.get_last_insert_id()
+            rows_affected = self.db.get_rows_affected()
+            if rows_affected == 0:
+                inserted_ids = []
+            elif rows_affected == len(news_list):
+                # 没有被忽略的行时，单条多行INSERT分配的自增ID是连续的
+                inserted_ids = [(first_id + index, index) for index in range(rows_affected)]
+            else:
+                # 部分行被唯一键忽略，自增ID可能不连续，回查本次插入的记录
+                inserted_ids = self._select_inserted_ids(source_id, news_list, first_id)
+                if inserted_ids is None or len(inserted_ids) != rows_affected:
+                    self.db.rollback()
+                    logging.error(f"回查新插入的新闻ID失败, 影响行数: {rows_affected}")
+                    return None
+
+            if commit:
+                self.db.commit()
+            return inserted_ids
                 
         except Exception as e:
             self.db.rollback()
             logging.error(f"批量插入新闻数据时发生错误: {e}")
-            return False
+            return None
+
+    def _select_inserted_ids(self, source_id: str, news_list: List[NewsItem], first_id: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        查询本次 INSERT IGNORE 新插入记录的主键ID
+        已存在的记录ID一定小于本次分配的第一个自增ID
+
+        Args:
+            source_id: 原渠道
+            news_list: batch_insert_news 的新闻列表
+            first_id: 本次插入分配的第一个自增ID
+
+        Returns:
+            List[Tuple[int, int]]: 新插入记录的 (主键ID, 在news_list中的下标)，查询失败返回None
+        """
+        params = [first_id, source_id]
+        params.extend(news.id for news in news_list)
+        sql = """
+            SELECT id, orig_Id FROM news_infos
+            WHERE id >= %s AND sourceId = %s AND orig_Id IN (
+        """ + ", ".join(["%s"] * len(news_list)) + """
+            )
+            ORDER BY id
+        """
+        if not self.db.execute(sql, params):
+            return None
+        # orig_Id 的排序规则不区分大小写，按小写匹配回新闻列表
+        positions = {news.id.lower(): index for index, news in enumerate(news_list)}
+        return [(row[0], positions.get(row[1].lower())) for row in self.db.fetchall() or []]
 
     def get_latest_by_sourceId(self, sourceId, limit=90):
         """
@@ -100,6 +151,52 @@ class dbNewsInfos:
             return None
 
 
+    def get_recent_orig_ids(self, source_ids: List[str], limit: int = 90) -> Optional[Dict[str, FrozenSet[str]]]:
+        """
+        一次查询获取多个渠道最新记录的orig_Id集合，用于内存中去重
+        每个渠道一个 ORDER BY createDateTime DESC LIMIT 子查询，通过 UNION ALL 合并，
+        各子查询都走 idx_source_create 索引，只读取每个渠道最新的 limit 行
+
+        Args:
+            source_ids: 渠道ID列表
+            limit: 每个渠道读取的最新记录数量，默认90条
+
+        Returns:
+            Dict[str, FrozenSet[str]]: 键为渠道ID，值为该渠道最新记录的orig_Id集合，
+            没有记录的渠道对应空集合；如果发生错误返回None
+        """
+        if not source_ids:
+            return {}
+
+        subquery = """
+            (SELECT sourceId, orig_Id FROM news_infos
+             WHERE sourceId = %s
+             ORDER BY createDateTime DESC
+             LIMIT %s)
+        """
+        if self.db.dialect == "sqlite":
+            # SQLite 的 UNION ALL 成员不能带 ORDER BY/LIMIT，放入子查询中
+            subquery = "SELECT * FROM " + subquery
+        sql = " UNION ALL ".join([subquery] * len(source_ids))
+        params = []
+        for source_id in source_ids:
+            params.extend((source_id, limit))
+
+        try:
+            success = self.db.execute(sql, params)
+            if not success:
+                logging.error("批量查询渠道最新记录失败")
+                return None
+            orig_ids = {source_id: set() for source_id in source_ids}
+            for source_id, orig_id in self.db.fetchall() or []:
+                if orig_id is not None:
+                    orig_ids[source_id].add(orig_id)
+            return {source_id: frozenset(ids) for source_id, ids in orig_ids.items()}
+
+        except Exception as e:
+            logging.error(f"批量查询渠道最新记录时发生错误: {e}")
+            return None
+
     def insert_single_news(self, news: Dict) -> Optional[int]:
         """
         插入单条新闻信息并返回插入记录的主键ID
@@ -118,7 +215,7 @@ class dbNewsInfos:
             logging.error("数据库连接不存在")
             return None
             
-        current_time = datetime.now(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
+        current_time = china_now()
         sql = """
             INSERT INTO news_infos 
             (orig_Id, title, url, sourceId, createDateTime)
@@ -147,15 +244,17 @@ class dbNewsInfos:
             logging.error(f"插入新闻数据时发生错误: {e}")
             return None
 
-    def cleanup_old_records(self, max_records_str):
+    def cleanup_old_records(self, max_records_str, source_limits: Optional[Dict[str, int]] = None):
         """
         清理新闻信息表中的旧记录，保留最新的指定数量记录
+        由保留引擎 dbRetention 按水位线分批删除
         
         Args:
             max_records_str: 最大保留记录数的字符串
+            source_limits: 键为渠道ID，值为该渠道保留的最大记录数
             
         Returns:
-            int: 删除的记录数量
+            int: 删除的记录数量，失败返回-1
         """
         try:
             # 解析最大记录数
@@ -164,61 +263,36 @@ class dbNewsInfos:
                 max_records = 5000
             else:
                 max_records = int(max_records_str)
-            
-            # 首先查询总记录数
-            count_query = "SELECT COUNT(*) FROM news_infos"
-            success = self.db.execute(count_query)
-            if not success:
-                logging.error("查询记录总数失败")
-                return -1
-                
-            result = self.db.fetchone()
-            if not result:
-                logging.error("获取记录总数失败")
+
+            report = get_db_retention().trim_news_infos(max_records, source_limits)
+            if report is None:
+                logging.error("清理旧记录失败")
                 return -1
-                
-            total_count = result[0]
-            
-            if total_count > max_records:
-                # 计算需要删除的记录数
-                delete_count = total_count - max_records
-                
-                # 先获取要保留的最新记录的最小ID
-                min_id_query = """
-                SELECT id FROM news_infos 
-                ORDER BY createDateTime DESC 
-                LIMIT 1 OFFSET %s
-                """
-                success = self.db.execute(min_id_query, (max_records - 1,))
-                if not success:
-                    logging.error("查询最小保留ID失败")
-                    return -1
-                    
-                result = self.db.fetchone()
-                if result:
-                    min_keep_id = result[0]
-                    # 删除比这个ID更小的记录
-                    delete_query = "DELETE FROM news_infos WHERE id < %s"
-                    success = self.db.execute(delete_query, (min_keep_id,))
-                    if success:
-                        self.db.commit()
-                        logging.info(f"成功删除 {delete_count} 条旧记录，当前保留 {max_records} 条最新记录")
-                        return delete_count
-                    else:
-                        self.db.rollback()
-                        logging.error("执行删除操作失败")
-                        return -1
-                else:
-                    logging.warning("未找到要保留的记录")
-                    return 0
+
+            if report["deleted"] > 0:
+                logging.info(f"成功删除 {report['deleted']} 条旧记录，共 {len(report['chunks'])} 批，"
+                             f"耗时 {report['seconds']} 秒，全表保留 {max_records} 条最新记录")
             else:
-                logging.info(f"当前记录数 {total_count} 未超过限制 {max_records}，无需清理")
-                return 0
+                logging.info(f"当前记录数未超过限制 {max_records}，无需清理")
+            return report["deleted"]
                 
         except Exception as e:
             logging.error(f"清理旧记录时发生错误: {e}", exc_info=True)
             self.db.rollback()
             return -1
 
-# 创建实例供直接导入使用
-db_news_infos = dbNewsInfos()
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_news_infos() -> dbNewsInfos:
+    """
+    获取 dbNewsInfos 实例，第一次调用时创建
+    """
+    return dbNewsInfos()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_news_infos 的用法
+    if name == "db_news_infos":
+        return get_db_news_infos()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import Dict, Optional
+
+from .dbBackend import get_db_manager
+from utils.lazy import lazy_instance
+from utils.time_utils import china_from_timestamp
+
+
+class dbPublisherRuns:
+    """
+    处理publisher_runs表的数据库操作，保存每次运行的指标汇总
+    """
+    def __init__(self):
+        self.db = get_db_manager()
+
+    def insert_run(self, snapshot: Dict) -> Optional[int]:
+        """
+        插入一次运行的指标汇总
+
+        Args:
+            snapshot: RunMetrics.snapshot 的结果
+
+        Returns:
+            int: 插入记录的主键ID，如果插入失败返回None
+        """
+        totals = snapshot["totals"]
+        counters = snapshot["counters"]
+        sql = """
+            INSERT INTO publisher_runs
+            (startedAt, elapsedSeconds, sources, failedSources, newItems, payloadBytes,
+             dbStatements, dbRoundTrips, summary)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """
+
+        try:
+            success = self.db.execute(sql, (
+                china_from_timestamp(snapshot["startedAt"]).replace(microsecond=0),
+                snapshot["elapsedSeconds"],
+                totals["sources"],
+                totals["failedSources"],
+                totals["newItems"],
+                totals["payloadBytes"],
+                counters.get("db_statements", 0),
+                counters.get("db_round_trips", 0),
+                json.dumps(snapshot, ensure_ascii=False)
+            ))
+            if success:
+                inserted_id = self.db.get_last_insert_id()
+                self.db.commit()
+                return inserted_id
+            else:
+                self.db.rollback()
+                logging.error("插入运行指标失败")
+                return None
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"插入运行指标时发生错误: {e}")
+            return None
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_publisher_runs() -> dbPublisherRuns:
+    """
+    获取 dbPublisherRuns 实例，第一次调用时创建
+    """
+    return dbPublisherRuns()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_publisher_runs 的用法
+    if name == "db_publisher_runs":
+        return get_db_publisher_runs()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
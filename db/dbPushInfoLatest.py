@@ -1,19 +1,38 @@
-from datetime import datetime
-import pytz
+import time
+from datetime import timedelta
 from typing import List, Dict, Optional
-from .dbManager import db_manager
+from .dbBackend import get_db_manager
 import logging
+from utils.lazy import lazy_instance
+from utils.time_utils import china_now
+
+# 推送记录的状态：0 待推送，1 已被消费者认领，2 已推送
+PUSH_STATUS_NEW = 0
+PUSH_STATUS_CLAIMED = 1
+PUSH_STATUS_DONE = 2
+
+# 消费者接口返回的列，从 v_push_feed 视图读取
+_CONSUMER_COLUMNS = "id, sourceId, sourceName, newsInfoId, createDateTime, status, title, url"
+
+
+def _news_info_ref(news_info_id) -> Optional[int]:
+    """
+    把 newsInfoId 转换为整数，写入 newsInfoRef 外键字段
+    """
+    text = str(news_info_id)
+    return int(text) if text.isdigit() else None
+
 
 class dbPushInfoLatest:
     """
     处理pushinfo_latest表的数据库操作
     """
     def __init__(self):
-        self.db = db_manager
+        self.db = get_db_manager()
 
-    def batch_insert_push_info(self, push_list: List[Dict]) -> bool:
+    def batch_insert_push_info(self, push_list: List[Dict], commit: bool = True) -> Optional[List[int]]:
         """
-        批量插入推送信息
+        批量插入推送信息，使用一条多行INSERT语句完成
         
         Args:
             push_list: 包含推送信息的列表，每个元素是一个字典，包含：
@@ -23,51 +42,99 @@ class dbPushInfoLatest:
                 - newsInfoId: news_infos表的主键ID
                 - newsType: 推送类型（stock/news）
                 - status: 状态（可选，默认为0）
+            commit: 是否立即提交事务，为False时由调用方负责提交或回滚
                 
         Returns:
-            bool: 插入是否成功
+            List[int]: 按push_list顺序排列的插入记录主键ID，插入失败返回None
         """
         if not push_list:
             logging.warning("推送信息列表为空，无需插入")
-            return True
+            return []
 
-        current_time = datetime.now(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
-        
-        # 准备批量插入的数据
-        insert_data = [
+        current_time = china_now()
+        rows = [
             (
                 push['sourceId'],
                 push['sourceName'],
                 push['newsInfoId'],
                 push['newsType'],
                 push.get('status', 0),  # 如果未提供status，默认为0
-                current_time
+                current_time,
+                _news_info_ref(push['newsInfoId'])
             )
             for push in push_list
         ]
+        return self._insert_rows(rows, commit)
+
+    def batch_insert_news_pushes(self, source_id: str, source_name: str, news_info_ids: List[int],
+                                 news_type: str = "news", commit: bool = True) -> Optional[List[int]]:
+        """
+        为同一渠道新插入的新闻批量创建推送记录，不需要为每条新闻构建字典
+
+        Args:
+            source_id: 渠道ID
+            source_name: 渠道名称
+            news_info_ids: news_infos表的主键ID列表
+            news_type: 推送类型（stock/news）
+            commit: 是否立即提交事务，为False时由调用方负责提交或回滚
+
+        Returns:
+            List[int]: 按news_info_ids顺序排列的插入记录主键ID，插入失败返回None
+        """
+        if not news_info_ids:
+            logging.warning("推送信息列表为空，无需插入")
+            return []
+
+        current_time = china_now()
+        rows = [
+            (source_id, source_name, str(news_info_id), news_type, 0, current_time, news_info_id)
+            for news_info_id in news_info_ids
+        ]
+        return self._insert_rows(rows, commit)
+
+    def _insert_rows(self, rows: List[tuple], commit: bool) -> Optional[List[int]]:
+        """
+        用一条多行INSERT语句插入推送记录
+
+        Args:
+            rows: 每行为 (sourceId, sourceName, newsInfoId, newsType, status, createDateTime, newsInfoRef)
+            commit: 是否立即提交事务
+
+        Returns:
+            List[int]: 按rows顺序排列的插入记录主键ID，插入失败返回None
+        """
+        # 展开为一条多行INSERT的参数
+        params = [value for row in rows for value in row]
         
         # SQL语句
         sql = """
             INSERT INTO pushinfo_latest 
-            (sourceId, sourceName, newsInfoId, newsType, status, createDateTime)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
+            (sourceId, sourceName, newsInfoId, newsType, status, createDateTime, newsInfoRef)
+            VALUES 
+        """ + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(rows))
         
         try:
             # 执行批量插入
-            success = self.db.executemany(sql, insert_data)
+            success = self.db.execute(sql, params)
             if success:
-                self.db.commit()
-                return True
+                first_id = self.db.get_last_insert_id()
+                rows_affected = self.db.get_rows_affected()
+                if not first_id or rows_affected != len(rows):
+                    self.db.rollback()
+                    logging.error(f"批量插入推送信息返回异常, 首个ID: {first_id}, 影响行数: {rows_affected}")
+                    return None
+                if commit:
+                    self.db.commit()
+                return list(range(first_id, first_id + rows_affected))
             else:
                 self.db.rollback()
                 logging.error("批量插入推送信息失败")
-                return False
+                return None
                 
         except Exception as e:
             self.db.rollback()
             logging.error(f"批量插入推送信息时发生错误: {e}")
-            return False
+            return None
 
     def get_push_info_by_type(self, news_type: str = "news") -> Optional[List[tuple]]:
         """
@@ -100,6 +167,312 @@ class dbPushInfoLatest:
             logging.error(f"查询推送信息时发生错误: {e}")
             return None
         
+    def get_feed_rows(self, news_type: str = "news") -> Optional[List[tuple]]:
+        """
+        获取指定类型的推送信息及对应的新闻标题、链接和近似重复新闻簇，用于生成静态feed快照
+        
+        Args:
+            news_type: 推送类型（stock/news）
+            
+        Returns:
+            List[tuple]: 按渠道、时间倒序排列的查询结果，每个元素是一个元组
+                        (id, sourceId, sourceName, newsInfoId, createDateTime, title, url, clusterId)
+                        自成一簇的新闻 clusterId 为自身ID，如果发生错误返回None
+        """
+        # v_push_feed 按整数外键 newsInfoRef 关联 news_infos，使用 (newsType, sourceId, createDateTime) 索引顺序读取
+        sql = """
+            SELECT id, sourceId, sourceName, newsInfoId, createDateTime, title, url, clusterId
+            FROM v_push_feed
+            WHERE newsType = %s
+            ORDER BY sourceId, createDateTime DESC, id DESC
+        """
+        
+        try:
+            success = self.db.execute(sql, (news_type,))
+            if success:
+                return self.db.fetchall()
+            else:
+                logging.error(f"查询推送类型 {news_type} 的feed数据失败")
+                return None
+                
+        except Exception as e:
+            logging.error(f"查询feed数据时发生错误: {e}")
+            return None
+        
+    def get_latest_by_source(self, source_id: str, limit: int = 30, news_type: str = "news") -> Optional[List[tuple]]:
+        """
+        获取指定渠道最新的 limit 条推送记录及对应的新闻，使用 (newsType, sourceId, createDateTime) 索引倒序读取
+
+        Args:
+            source_id: 渠道ID
+            limit: 条数
+            news_type: 推送类型（stock/news）
+
+        Returns:
+            List[tuple]: 按时间倒序排列的查询结果，格式同 get_push_page，如果发生错误返回None
+        """
+        sql = f"""
+            SELECT {_CONSUMER_COLUMNS}
+            FROM v_push_feed
+            WHERE newsType = %s AND sourceId = %s
+            ORDER BY createDateTime DESC, id DESC
+            LIMIT %s
+        """
+
+        try:
+            if self.db.execute(sql, (news_type, source_id, limit)):
+                return self.db.fetchall()
+            logging.error(f"查询渠道 {source_id} 的最新推送记录失败")
+            return None
+
+        except Exception as e:
+            logging.error(f"查询渠道最新推送记录时发生错误: {e}")
+            return None
+
+    def backfill_news_info_ref(self, chunk_size: int = 1000, pause_seconds: float = 0.05) -> Optional[int]:
+        """
+        为旧的推送记录回填整数外键 newsInfoRef，按主键范围分批更新，每批一个事务，批之间暂停，不长时间锁表
+        只回填 news_infos 中仍存在的新闻，对应新闻已删除的记录保持为空
+
+        Args:
+            chunk_size: 每批覆盖的主键范围
+            pause_seconds: 批之间暂停的秒数
+
+        Returns:
+            int: 回填的记录数量，失败返回None
+        """
+        try:
+            if not self.db.execute("SELECT MIN(id), MAX(id) FROM pushinfo_latest WHERE newsInfoRef IS NULL"):
+                logging.error("查询待回填的推送记录失败")
+                return None
+            first_id, last_id = self.db.fetchone() or (None, None)
+            if first_id is None:
+                return 0
+
+            sql = self._backfill_sql("pushinfo_latest.id >= %s AND pushinfo_latest.id < %s")
+            total = 0
+            for start in range(first_id, last_id + 1, chunk_size):
+                if not self.db.execute(sql, (start, start + chunk_size)):
+                    self.db.rollback()
+                    logging.error(f"回填推送记录的 newsInfoRef 失败，起始ID: {start}")
+                    return None
+                total += self.db.get_rows_affected()
+                self.db.commit()
+                if pause_seconds:
+                    time.sleep(pause_seconds)
+            logging.info(f"回填推送记录的 newsInfoRef 完成，共 {total} 条")
+            return total
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"回填推送记录的 newsInfoRef 时发生错误: {e}")
+            return None
+
+    def _backfill_sql(self, condition: str = "1 = 1") -> str:
+        """
+        生成回填 newsInfoRef 的语句：把字符串 newsInfoId 转换为整数，只回填 news_infos 中存在的新闻
+        """
+        cast = "CAST(pushinfo_latest.newsInfoId AS {})".format("INTEGER" if self.db.dialect == "sqlite" else "UNSIGNED")
+        return f"""
+            UPDATE pushinfo_latest SET newsInfoRef = {cast}
+            WHERE {condition} AND newsInfoRef IS NULL
+            AND EXISTS (SELECT 1 FROM news_infos n WHERE n.id = {cast})
+        """
+
+    def get_push_page(self, news_type: str = "news", after_id: int = 0, limit: int = 100,
+                      status: Optional[int] = None) -> Optional[List[tuple]]:
+        """
+        按主键游标分页读取推送记录及对应的新闻标题和链接，每页只扫描 id > after_id 的 limit 条记录
+        下一页以本页最后一条记录的id作为 after_id，新插入的记录总在最后，增量读取不会重复或遗漏
+
+        Args:
+            news_type: 推送类型（stock/news）
+            after_id: 上一页最后一条记录的id，第一页为0
+            limit: 每页条数
+            status: 只读取该状态的记录，为空时读取所有状态
+
+        Returns:
+            List[tuple]: 按id升序排列的查询结果，每个元素为
+                        (id, sourceId, sourceName, newsInfoId, createDateTime, status, title, url)，
+                        如果发生错误返回None
+        """
+        status_filter = ""
+        params = [news_type]
+        if status is not None:
+            status_filter = "AND status = %s"
+            params.append(status)
+        params.extend((after_id, limit))
+        sql = f"""
+            SELECT {_CONSUMER_COLUMNS}
+            FROM v_push_feed
+            WHERE newsType = %s {status_filter} AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """
+
+        try:
+            if self.db.execute(sql, params):
+                return self.db.fetchall()
+            logging.error(f"分页查询推送类型 {news_type} 的数据失败")
+            return None
+
+        except Exception as e:
+            logging.error(f"分页查询推送信息时发生错误: {e}")
+            return None
+
+    def claim_batch(self, news_type: str = "news", limit: int = 100) -> Optional[List[tuple]]:
+        """
+        认领一批待推送（status=0）的记录，把状态改为1（已认领）并返回，按id升序
+        MySQL 使用 SELECT ... FOR UPDATE SKIP LOCKED，多个消费者并行认领时跳过其他消费者正在认领的记录，
+        不会互相等待，也不会认领到同一条记录；SQLite 的写事务互斥，用一条 UPDATE ... RETURNING 完成认领
+
+        返回的记录从 v_push_feed 读取，只认领已关联到新闻（newsInfoRef 不为空）的记录，认领到的记录都会返回给消费者
+
+        推送完成后调用 complete_claims，推送失败时调用 release_claims 放回；
+        消费者异常退出时，requeue_stale_claims 把认领超时的记录放回
+
+        Args:
+            news_type: 推送类型（stock/news）
+            limit: 最多认领的条数
+
+        Returns:
+            List[tuple]: 认领到的记录，格式同 get_push_page，没有待推送的记录时为空列表，如果发生错误返回None
+        """
+        now = china_now()
+        try:
+            if self.db.dialect == "sqlite":
+                success = self.db.execute("""
+                    UPDATE pushinfo_latest SET status = %s, claimedAt = %s
+                    WHERE id IN (
+                        SELECT id FROM pushinfo_latest
+                        WHERE newsType = %s AND status = %s AND newsInfoRef IS NOT NULL
+                        ORDER BY id
+                        LIMIT %s
+                    )
+                    RETURNING id
+                """, (PUSH_STATUS_CLAIMED, now, news_type, PUSH_STATUS_NEW, limit))
+                ids = [row[0] for row in self.db.fetchall() or []] if success else None
+            else:
+                success = self.db.execute("""
+                    SELECT id FROM pushinfo_latest
+                    WHERE newsType = %s AND status = %s AND newsInfoRef IS NOT NULL
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (news_type, PUSH_STATUS_NEW, limit))
+                ids = [row[0] for row in self.db.fetchall() or []] if success else None
+                if ids:
+                    success = self._set_status(ids, PUSH_STATUS_CLAIMED, claimed_at=now)
+            if not success or ids is None:
+                self.db.rollback()
+                logging.error(f"认领推送类型 {news_type} 的记录失败")
+                return None
+            if not ids:
+                self.db.commit()
+                return []
+
+            sql = f"""
+                SELECT {_CONSUMER_COLUMNS}
+                FROM v_push_feed
+                WHERE id IN ({", ".join(["%s"] * len(ids))})
+                ORDER BY id
+            """
+            if not self.db.execute(sql, ids):
+                self.db.rollback()
+                logging.error("读取认领的推送记录失败")
+                return None
+            rows = self.db.fetchall()
+            self.db.commit()
+            return rows
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"认领推送记录时发生错误: {e}")
+            return None
+
+    def complete_claims(self, ids: List[int]) -> bool:
+        """
+        把已认领的记录标记为已推送（status=2）
+
+        Args:
+            ids: claim_batch 返回的记录id
+
+        Returns:
+            bool: 是否成功
+        """
+        return self._update_claims(ids, PUSH_STATUS_DONE, "标记推送完成")
+
+    def release_claims(self, ids: List[int]) -> bool:
+        """
+        把已认领但推送失败的记录放回待推送（status=0），由其他消费者重新认领
+
+        Args:
+            ids: claim_batch 返回的记录id
+
+        Returns:
+            bool: 是否成功
+        """
+        return self._update_claims(ids, PUSH_STATUS_NEW, "放回认领的推送记录")
+
+    def requeue_stale_claims(self, news_type: str = "news", timeout_seconds: int = 600) -> int:
+        """
+        把认领超过 timeout_seconds 仍未完成的记录放回待推送，用于消费者异常退出的情况
+
+        Returns:
+            int: 放回的记录数量，失败返回-1
+        """
+        sql = """
+            UPDATE pushinfo_latest SET status = %s, claimedAt = NULL
+            WHERE newsType = %s AND status = %s AND claimedAt < %s
+        """
+        params = (PUSH_STATUS_NEW, news_type, PUSH_STATUS_CLAIMED, china_now() - timedelta(seconds=timeout_seconds))
+        try:
+            if self.db.execute(sql, params):
+                rows_affected = self.db.get_rows_affected()
+                self.db.commit()
+                if rows_affected:
+                    logging.warning(f"推送类型: {news_type} 有 {rows_affected} 条记录认领超时，已放回待推送")
+                return rows_affected
+            self.db.rollback()
+            logging.error(f"放回认领超时的推送记录失败，推送类型: {news_type}")
+            return -1
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"放回认领超时的推送记录时发生错误: {e}")
+            return -1
+
+    def _update_claims(self, ids: List[int], status: int, action: str) -> bool:
+        """
+        修改已认领（status=1）记录的状态并提交
+        """
+        if not ids:
+            return True
+        try:
+            if self._set_status(ids, status, expected=PUSH_STATUS_CLAIMED):
+                self.db.commit()
+                return True
+            self.db.rollback()
+            logging.error(f"{action}失败")
+            return False
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"{action}时发生错误: {e}")
+            return False
+
+    def _set_status(self, ids: List[int], status: int, expected: Optional[int] = None, claimed_at=None) -> bool:
+        """
+        修改记录的状态，不提交事务；expected 不为空时只修改当前为该状态的记录
+        """
+        sql = "UPDATE pushinfo_latest SET status = %s, claimedAt = %s WHERE id IN (" \
+              + ", ".join(["%s"] * len(ids)) + ")"
+        params = [status, claimed_at, *ids]
+        if expected is not None:
+            sql += " AND status = %s"
+            params.append(expected)
+        return self.db.execute(sql, params)
+
     def delete_excess_by_source_id(self, source_id: str, keep_count: int = 30, news_type: str = "news") -> bool:
         """
         保留指定source_id最新的keep_count条记录，删除多余的记录
@@ -148,6 +521,69 @@ class dbPushInfoLatest:
             logging.error(f"删除过期记录时发生错误: {e}", exc_info=True)
             return False
     
+    def trim_all(self, keep_counts: Optional[Dict[str, int]] = None, default_keep: int = 30, news_type: str = "news") -> int:
+        """
+        一条语句裁剪指定推送类型下所有渠道的记录，每个 (sourceId, newsType) 分组只保留最新的若干条
+        通过 ROW_NUMBER() 窗口函数给每个分组内的记录按时间倒序编号，删除编号超过保留数量的记录
+
+        Args:
+            keep_counts: 键为渠道ID，值为该渠道保留的记录数量
+            default_keep: 未单独配置的渠道保留的记录数量，默认30条
+            news_type: 推送类型（stock/news），默认为"news"，其他类型的记录不受影响
+
+        Returns:
+            int: 删除的记录数量，失败返回-1
+        """
+        if not self.db:
+            logging.error("数据库连接不存在")
+            return -1
+
+        params = [news_type]
+        keep_expr = "%s"
+        if keep_counts:
+            keep_expr = "CASE r.sourceId " + " ".join(["WHEN %s THEN %s"] * len(keep_counts)) + " ELSE %s END"
+            for source_id, keep_count in keep_counts.items():
+                params.extend((source_id, keep_count))
+        params.append(default_keep)
+
+        ranked = f"""
+                SELECT r.id FROM (
+                    SELECT id, sourceId,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY sourceId, newsType
+                               ORDER BY createDateTime DESC, id DESC
+                           ) AS rn
+                    FROM pushinfo_latest
+                    WHERE newsType = %s
+                ) r
+                WHERE r.rn > {keep_expr}
+        """
+        if self.db.dialect == "sqlite":
+            # SQLite 不支持 DELETE ... JOIN
+            sql = f"DELETE FROM pushinfo_latest WHERE id IN ({ranked})"
+        else:
+            sql = f"""
+            DELETE p FROM pushinfo_latest p
+            JOIN ({ranked}) d ON d.id = p.id
+        """
+
+        try:
+            success = self.db.execute(sql, params)
+            if success:
+                rows_affected = self.db.get_rows_affected()
+                self.db.commit()
+                logging.info(f"推送类型: {news_type} 裁剪完成，删除 {rows_affected} 条过期记录")
+                return rows_affected
+            else:
+                self.db.rollback()
+                logging.error(f"裁剪过期推送记录失败，推送类型: {news_type}")
+                return -1
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"裁剪过期推送记录时发生错误: {e}", exc_info=True)
+            return -1
+
     def delete_by_type_and_source(self, source_id: str, news_type: str = "news") -> bool:
         """
         删除指定新闻类型和来源的所有记录
@@ -203,7 +639,7 @@ class dbPushInfoLatest:
             logging.error("数据库连接不存在")
             return None
             
-        current_time = datetime.now(pytz.timezone('Asia/Shanghai')).replace(tzinfo=None)
+        current_time = china_now()
         sql = """
             INSERT INTO pushinfo_latest 
             (sourceId, sourceName, newsInfoId, newsType, status, createDateTime)
@@ -235,5 +671,18 @@ class dbPushInfoLatest:
             logging.error(f"插入推送信息时发生错误: {e}")
             return None
 
-# 创建实例供直接导入使用
-db_push_info_latest = dbPushInfoLatest()
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_push_info_latest() -> dbPushInfoLatest:
+    """
+    获取 dbPushInfoLatest 实例，第一次调用时创建
+    """
+    return dbPushInfoLatest()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_push_info_latest 的用法
+    if name == "db_push_info_latest":
+        return get_db_push_info_latest()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
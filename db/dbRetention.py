@@ -0,0 +1,192 @@
+import logging
+import os
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+
+from .dbBackend import get_db_manager
+from utils.lazy import lazy_instance
+from utils.time_utils import china_now
+
+
+class dbRetention:
+    """
+    news_infos 表的数据保留引擎
+    先通过主键/索引定位保留边界的ID（水位线），再按主键顺序分批删除水位线以下的记录，
+    每批一个事务，批之间暂停，避免长时间持有锁和产生大量undo日志
+    """
+    def __init__(self, chunk_size: Optional[int] = None, pause_seconds: Optional[float] = None):
+        self.db = get_db_manager()
+        chunk_env = os.environ.get("RETENTION_CHUNK_SIZE", "")
+        pause_env = os.environ.get("RETENTION_PAUSE_MS", "")
+        self.chunk_size = chunk_size or (int(chunk_env) if chunk_env.isdigit() and int(chunk_env) > 0 else 1000)
+        if pause_seconds is None:
+            pause_seconds = int(pause_env) / 1000 if pause_env.isdigit() else 0.05
+        self.pause_seconds = pause_seconds
+
+    def trim_news_infos(self, max_records: int, source_limits: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+        """
+        清理 news_infos 中的旧记录
+        先按渠道保留各自最新的指定数量，再在全表范围保留最新的 max_records 条
+
+        Args:
+            max_records: 全表保留的最大记录数
+            source_limits: 键为渠道ID，值为该渠道保留的最大记录数
+
+        Returns:
+            Dict: 清理报告，包含：
+                - deleted: 删除的总行数
+                - seconds: 总耗时（秒）
+                - chunks: 每批的范围、行数和耗时
+            如果发生错误返回None
+        """
+        started = time.monotonic()
+        report = {"deleted": 0, "seconds": 0.0, "chunks": []}
+        for source_id, limit in (source_limits or {}).items():
+            watermark = self._find_watermark(limit, source_id)
+            if watermark is None:
+                return None
+            if watermark and not self._delete_below(watermark, report, source_id):
+                return None
+
+        watermark = self._find_watermark(max_records)
+        if watermark is None:
+            return None
+        if watermark and not self._delete_below(watermark, report):
+            return None
+
+        report["seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def _find_watermark(self, keep_count: int, source_id: Optional[str] = None) -> Optional[int]:
+        """
+        获取要保留的最旧一条记录的ID，ID小于它的记录都可以删除
+        全表范围沿主键倒序扫描，按渠道时走 idx_source_create 索引，都不需要排序；
+        同一批插入的记录 createDateTime 相同，按渠道时再按主键倒序，与删除条件 id < 水位线 一致
+
+        Args:
+            keep_count: 保留的记录数量
+            source_id: 渠道ID，为空时表示全表
+
+        Returns:
+            int: 水位线ID，记录数未超过保留数量时返回0，查询失败返回None
+        """
+        if source_id is None:
+            sql = "SELECT id FROM news_infos ORDER BY id DESC LIMIT 1 OFFSET %s"
+            params = (keep_count - 1,)
+        else:
+            sql = """
+                SELECT id FROM news_infos WHERE sourceId = %s
+                ORDER BY createDateTime DESC, id DESC LIMIT 1 OFFSET %s
+            """
+            params = (source_id, keep_count - 1)
+
+        if not self.db.execute(sql, params):
+            logging.error(f"查询保留水位线失败, 渠道: {source_id or '全部'}")
+            return None
+        result = self.db.fetchone()
+        return result[0] if result else 0
+
+    def _delete_below(self, watermark: int, report: Dict, source_id: Optional[str] = None) -> bool:
+        """
+        按主键顺序分批删除水位线以下的记录，每批提交一次
+
+        Args:
+            watermark: 水位线ID
+            report: 清理报告，每批的结果追加到 chunks 中
+            source_id: 渠道ID，为空时表示全表
+
+        Returns:
+            bool: 是否全部删除成功
+        """
+        if source_id is None:
+            condition = "id < %s"
+            params = (watermark, self.chunk_size)
+        else:
+            condition = "sourceId = %s AND id < %s"
+            params = (source_id, watermark, self.chunk_size)
+        sql = self._chunk_delete_sql("news_infos", condition, "id")
+        return self._delete_in_chunks(sql, params, source_id or "全部", report)
+
+    def trim_lsh_buckets(self, window_hours: int) -> Optional[Dict]:
+        """
+        删除近似重复新闻索引中超出匹配时间窗口的桶记录，保持每个桶的大小稳定
+
+        Args:
+            window_hours: 匹配时间窗口（小时），与 dbNewsClusters.window_hours 一致
+
+        Returns:
+            Dict: 清理报告，格式同 trim_news_infos，如果发生错误返回None
+        """
+        started = time.monotonic()
+        report = {"deleted": 0, "seconds": 0.0, "chunks": []}
+        sql = self._chunk_delete_sql("news_lsh_buckets", "createDateTime < %s", "createDateTime")
+        params = (china_now() - timedelta(hours=window_hours), self.chunk_size)
+        if not self._delete_in_chunks(sql, params, "news_lsh_buckets", report):
+            return None
+        report["seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def _chunk_delete_sql(self, table: str, condition: str, order_by: str) -> str:
+        """
+        生成按顺序删除一批记录的语句，最后一个参数为每批的行数
+        MySQL 直接使用 DELETE ... ORDER BY ... LIMIT；SQLite 默认不支持，改为按 rowid 子查询删除
+        """
+        if self.db.dialect == "sqlite":
+            return f"""
+                DELETE FROM {table} WHERE rowid IN (
+                    SELECT rowid FROM {table} WHERE {condition} ORDER BY {order_by} LIMIT %s
+                )
+            """
+        return f"DELETE FROM {table} WHERE {condition} ORDER BY {order_by} LIMIT %s"
+
+    def _delete_in_chunks(self, sql: str, params: tuple, scope: str, report: Dict) -> bool:
+        """
+        重复执行带 LIMIT 的删除语句直到删除的行数不足一批，每批提交一次，批之间暂停
+
+        Args:
+            sql: 删除语句，最后一个参数为每批的行数
+            params: 删除语句的参数
+            scope: 日志和报告中显示的范围
+            report: 清理报告，每批的结果追加到 chunks 中
+
+        Returns:
+            bool: 是否全部删除成功
+        """
+        while True:
+            chunk_started = time.monotonic()
+            try:
+                if not self.db.execute(sql, params):
+                    self.db.rollback()
+                    logging.error(f"分批删除旧记录失败, 范围: {scope}")
+                    return False
+                rows = self.db.get_rows_affected()
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                logging.error(f"分批删除旧记录时发生错误: {e}", exc_info=True)
+                return False
+
+            seconds = round(time.monotonic() - chunk_started, 3)
+            report["deleted"] += rows
+            report["chunks"].append({"scope": scope, "rows": rows, "seconds": seconds})
+            logging.info(f"范围: {scope} 本批删除 {rows} 条旧记录，耗时 {seconds} 秒")
+            if rows < self.chunk_size:
+                return True
+            time.sleep(self.pause_seconds)
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_retention() -> dbRetention:
+    """
+    获取 dbRetention 实例，第一次调用时创建
+    """
+    return dbRetention()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_retention 的用法
+    if name == "db_retention":
+        return get_db_retention()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
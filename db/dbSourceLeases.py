@@ -0,0 +1,232 @@
+import logging
+from typing import Iterable, List, Optional
+
+from .dbBackend import get_db_manager
+from utils.lazy import lazy_instance
+
+
+class dbSourceLeases:
+    """
+    处理source_leases、lease_workers表的数据库操作
+    每个渠道一条租约，同一时刻只有一个进程持有；抢占和续约都是带条件的UPDATE，
+    多个进程同时抢占同一个渠道时只有一个进程的UPDATE生效，不依赖外部协调服务
+    到期时间和心跳时间都在SQL中按数据库时钟计算，不使用各进程所在主机的时钟
+    """
+    def __init__(self):
+        self.db = get_db_manager()
+
+    def _run(self, action: str, sql: str, params, commit: bool) -> Optional[int]:
+        """
+        执行一条写语句
+
+        Returns:
+            int: 影响的行数，执行失败返回None
+        """
+        try:
+            if not self.db.execute(sql, params):
+                self.db.rollback()
+                logging.error(f"{action}失败")
+                return None
+            rows_affected = self.db.get_rows_affected()
+            if commit:
+                self.db.commit()
+            return rows_affected
+
+        except Exception as e:
+            self.db.rollback()
+            logging.error(f"{action}时发生错误: {e}")
+            return None
+
+    def _db_time(self, offset: bool = False) -> str:
+        """
+        数据库当前时间（与 china_now 一致，为UTC+8）的SQL表达式，所有进程都以数据库时钟为准，不受各主机时钟偏差影响
+        offset 为 True 时再加上一个参数指定的秒数（可以为负数）
+        """
+        if self.db.dialect == "sqlite":
+            return "datetime('now', '+8 hours', %s || ' seconds')" if offset else "datetime('now', '+8 hours')"
+        return "UTC_TIMESTAMP() + INTERVAL 8 HOUR + INTERVAL %s SECOND" if offset \
+            else "UTC_TIMESTAMP() + INTERVAL 8 HOUR"
+
+    def touch_worker(self, owner: str, commit: bool = True) -> bool:
+        """
+        记录进程心跳，第一次心跳时插入记录
+
+        Args:
+            owner: 进程标识
+            commit: 是否立即提交事务，为False时由调用方负责提交或回滚
+
+        Returns:
+            bool: 是否成功
+        """
+        updated = self._run("更新进程心跳", f"UPDATE lease_workers SET heartbeatAt = {self._db_time()} WHERE owner = %s",
+                            (owner,), commit=False)
+        if updated is None:
+            return False
+        if not updated and self._run(
+            "插入进程心跳",
+            f"INSERT IGNORE INTO lease_workers (owner, heartbeatAt) VALUES (%s, {self._db_time()})",
+            (owner,), commit=False
+        ) is None:
+            return False
+        if commit:
+            self.db.commit()
+        return True
+
+    def count_live_workers(self, within_seconds: int) -> Optional[int]:
+        """
+        统计最近 within_seconds 秒内有心跳的进程数量
+
+        Returns:
+            int: 进程数量，查询失败返回None
+        """
+        try:
+            if not self.db.execute(
+                f"SELECT COUNT(*) FROM lease_workers WHERE heartbeatAt >= {self._db_time(offset=True)}",
+                (-within_seconds,)
+            ):
+                logging.error("统计分片进程数量失败")
+                return None
+            row = self.db.fetchone()
+            return row[0] if row else 0
+
+        except Exception as e:
+            logging.error(f"统计分片进程数量时发生错误: {e}")
+            return None
+
+    def remove_workers(self, owner: Optional[str] = None, idle_seconds: Optional[int] = None,
+                       commit: bool = True) -> Optional[int]:
+        """
+        删除进程记录：指定 owner 时删除该进程，指定 idle_seconds 时删除超过这么多秒没有心跳的进程
+
+        Returns:
+            int: 删除的记录数量，执行失败返回None
+        """
+        if owner is not None:
+            return self._run("删除分片进程", "DELETE FROM lease_workers WHERE owner = %s", (owner,), commit)
+        return self._run("删除失联的分片进程",
+                         f"DELETE FROM lease_workers WHERE heartbeatAt < {self._db_time(offset=True)}",
+                         (-idle_seconds,), commit)
+
+    def ensure_sources(self, source_ids: List[str], commit: bool = True) -> bool:
+        """
+        为还没有租约记录的渠道插入空闲的租约
+
+        Returns:
+            bool: 是否成功
+        """
+        if not source_ids:
+            return True
+        sql = "INSERT IGNORE INTO source_leases (sourceId) VALUES " + ", ".join(["(%s)"] * len(source_ids))
+        return self._run("初始化渠道租约", sql, source_ids, commit) is not None
+
+    def get_free(self, source_ids: List[str]) -> Optional[List[str]]:
+        """
+        查询空闲或已到期的租约
+
+        Returns:
+            List[str]: 渠道ID列表，查询失败返回None
+        """
+        if not source_ids:
+            return []
+        sql = f"""
+            SELECT sourceId FROM source_leases
+            WHERE sourceId IN ({", ".join(["%s"] * len(source_ids))})
+            AND (owner IS NULL OR expiresAt IS NULL OR expiresAt < {self._db_time()})
+        """
+        try:
+            if not self.db.execute(sql, source_ids):
+                logging.error("查询空闲的渠道租约失败")
+                return None
+            return [row[0] for row in self.db.fetchall() or []]
+
+        except Exception as e:
+            logging.error(f"查询空闲的渠道租约时发生错误: {e}")
+            return None
+
+    def claim(self, owner: str, source_ids: Iterable[str], ttl_seconds: int, commit: bool = True) -> Optional[int]:
+        """
+        抢占空闲、已到期或本进程已持有的租约，其他进程持有且未到期的租约不受影响
+
+        Args:
+            owner: 进程标识
+            source_ids: 要抢占的渠道ID
+            ttl_seconds: 租约有效期（秒），到期时间按数据库当前时间计算
+
+        Returns:
+            int: 抢占成功的数量，执行失败返回None
+        """
+        source_ids = list(source_ids)
+        if not source_ids:
+            return 0
+        sql = f"""
+            UPDATE source_leases SET owner = %s, expiresAt = {self._db_time(offset=True)}, updatedAt = {self._db_time()}
+            WHERE sourceId IN ({", ".join(["%s"] * len(source_ids))})
+            AND (owner IS NULL OR owner = %s OR expiresAt IS NULL OR expiresAt < {self._db_time()})
+        """
+        return self._run("抢占渠道租约", sql, (owner, ttl_seconds, *source_ids, owner), commit)
+
+    def renew(self, owner: str, ttl_seconds: int, commit: bool = True) -> Optional[int]:
+        """
+        续约本进程持有且未到期的租约，已到期的租约可能已被其他进程接管，不再续约
+
+        Returns:
+            int: 续约的数量，执行失败返回None
+        """
+        sql = f"""
+            UPDATE source_leases SET expiresAt = {self._db_time(offset=True)}, updatedAt = {self._db_time()}
+            WHERE owner = %s AND expiresAt >= {self._db_time()}
+        """
+        return self._run("续约渠道租约", sql, (ttl_seconds, owner), commit)
+
+    def get_owned(self, owner: str) -> Optional[List[str]]:
+        """
+        查询本进程持有且未到期的租约
+
+        Returns:
+            List[str]: 渠道ID列表，查询失败返回None
+        """
+        try:
+            if not self.db.execute(
+                f"SELECT sourceId FROM source_leases WHERE owner = %s AND expiresAt >= {self._db_time()} "
+                "ORDER BY sourceId",
+                (owner,)
+            ):
+                logging.error("查询本进程的渠道租约失败")
+                return None
+            return [row[0] for row in self.db.fetchall() or []]
+
+        except Exception as e:
+            logging.error(f"查询本进程的渠道租约时发生错误: {e}")
+            return None
+
+    def release(self, owner: str, source_ids: Optional[List[str]] = None, commit: bool = True) -> Optional[int]:
+        """
+        释放本进程持有的租约，source_ids 为空时释放全部
+
+        Returns:
+            int: 释放的数量，执行失败返回None
+        """
+        sql = "UPDATE source_leases SET owner = NULL, expiresAt = NULL WHERE owner = %s"
+        params = [owner]
+        if source_ids is not None:
+            if not source_ids:
+                return 0
+            sql += " AND sourceId IN (" + ", ".join(["%s"] * len(source_ids)) + ")"
+            params.extend(source_ids)
+        return self._run("释放渠道租约", sql, params, commit)
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_db_source_leases() -> dbSourceLeases:
+    """
+    获取 dbSourceLeases 实例，第一次调用时创建
+    """
+    return dbSourceLeases()
+
+
+def __getattr__(name):
+    # 兼容 from ... import db_source_leases 的用法
+    if name == "db_source_leases":
+        return get_db_source_leases()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
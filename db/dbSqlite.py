@@ -0,0 +1,260 @@
+import functools
+import logging
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from utils.logger import format_params
+from utils.metrics import run_metrics
+from .dbBackend import StorageBackend
+
+SCHEMA_FILE = pathlib.Path(__file__).parent / "tableStruct" / "sqlite" / "schema.sql"
+# schema.sql 发布之后新增的字段：(表名, 字段名, 字段定义, 补上字段后回填数据的SQL)，打开旧版本创建的数据库文件时补上
+ADDED_COLUMNS = [
+    ("pushinfo_latest", "claimedAt", "datetime", None),
+    ("pushinfo_latest", "newsInfoRef", "int REFERENCES news_infos (id) ON DELETE CASCADE", """
+        UPDATE pushinfo_latest SET newsInfoRef = CAST(newsInfoId AS INTEGER)
+        WHERE EXISTS (SELECT 1 FROM news_infos n WHERE n.id = CAST(pushinfo_latest.newsInfoId AS INTEGER))
+    """),
+]
+
+# datetime 以 "YYYY-MM-DD HH:MM:SS[.ffffff]" 文本保存，可以直接按字符串比较和排序，
+# 读取时声明为 datetime 的字段转换回 datetime 对象，与 pymysql 的返回值一致
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("datetime", lambda value: datetime.fromisoformat(value.decode()))
+
+
+@functools.lru_cache(maxsize=256)
+def _translate(sql: str) -> str:
+    """
+    把 MySQL 写法的SQL转换为 SQLite 写法：%s 占位符改为 ?，INSERT IGNORE 改为 INSERT OR IGNORE
+    转换结果按SQL文本缓存，相同的SQL在连接上复用已编译的语句
+    """
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.I)
+    return sql.replace("%s", "?")
+
+
+class SQLiteManager(StorageBackend):
+    """
+    嵌入式 SQLite 存储后端，数据库文件路径由环境变量 SQLITE_PATH 指定
+    WAL 模式下读写互不阻塞；每个线程使用自己的连接（连接上缓存已编译的语句），写事务以
+    BEGIN IMMEDIATE 开始，多个线程同时写入时按 busy_timeout 排队等待，不会在升级写锁时死锁
+
+    第一次打开数据库时按 db/tableStruct/sqlite/schema.sql 建表，表结构和索引与 MySQL 一致
+    """
+    dialect = "sqlite"
+
+    def __init__(self, path: Optional[str] = None):
+        # 与 DBManager 读取相同的.env文件
+        load_dotenv(dotenv_path=pathlib.Path(__file__).parent / '.env')
+        self.path = path or os.getenv("SQLITE_PATH", "data/news_publisher.sqlite3")
+        busy_env = os.getenv("SQLITE_BUSY_TIMEOUT", "")
+        self.busy_timeout = int(busy_env) if busy_env.isdigit() else 30
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """
+        打开一个新连接并设置 WAL 模式，第一次打开时建表
+        """
+        if self.path != ":memory:":
+            pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level="IMMEDIATE",
+            check_same_thread=False,
+            cached_statements=256
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with self._lock:
+            if not self._schema_ready:
+                self._upgrade_columns(conn)
+                conn.executescript(SCHEMA_FILE.read_text(encoding="utf-8"))
+                self._schema_ready = True
+            self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _upgrade_columns(conn: sqlite3.Connection):
+        """
+        为旧版本创建的表补上新增的字段，需要在执行 schema.sql 之前完成（其中的索引可能用到新字段）
+        """
+        for table, column, definition, backfill in ADDED_COLUMNS:
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if columns and column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                if backfill:
+                    conn.execute(backfill)
+                conn.commit()
+                logging.info(f"SQLite 表 {table} 新增字段 {column}")
+
+    @contextmanager
+    def connection(self):
+        """
+        获取当前线程的连接，退出时回滚未提交的事务
+        """
+        self.connect()
+        conn = self._local.conn
+        try:
+            yield conn
+        finally:
+            if not getattr(self._local, "in_session", False):
+                conn.rollback()
+
+    @contextmanager
+    def session(self):
+        """
+        在代码块内把当前线程的连接标记为会话中，commit/rollback 不结束会话，退出时回滚未提交的事务
+        """
+        if getattr(self._local, "in_session", False):
+            yield self
+            return
+        self.connect()
+        self._local.in_session = True
+        try:
+            yield self
+        finally:
+            self._local.in_session = False
+            self.release()
+
+    def connect(self) -> bool:
+        """
+        为当前线程打开连接，连接在线程内复用
+        """
+        if getattr(self._local, "conn", None) is not None:
+            return True
+        try:
+            self._local.conn = self._open_connection()
+            return True
+        except Exception as e:
+            logging.error(f"打开SQLite数据库出错: {e}")
+            return False
+
+    def release(self, rollback: bool = True):
+        """
+        回滚当前线程未提交的事务，连接保留给该线程下次使用
+        """
+        self._local.cursor = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and rollback and conn.in_transaction:
+            conn.rollback()
+
+    def close(self):
+        """
+        关闭所有线程的连接
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    def execute(self, sql, params=None) -> bool:
+        """
+        执行SQL语句
+        """
+        try:
+            if not self.connect():
+                self.record_error(ConnectionError("数据库连接失败"))
+                logging.error(f"数据库连接失败，无法执行SQL\nSQL: {format_params(sql)}")
+                return False
+            run_metrics.incr("db_statements")
+            self._local.cursor = self._local.conn.execute(_translate(sql), params or ())
+            self.record_error(None)
+            return True
+        except Exception as e:
+            self.record_error(e)
+            logging.error(f"执行SQL出错: {e}\nSQL: {format_params(sql)}\n参数: {format_params(params)}")
+            return False
+
+    def executemany(self, sql, params_list) -> bool:
+        """
+        批量执行SQL语句
+        """
+        try:
+            if not self.connect():
+                self.record_error(ConnectionError("数据库连接失败"))
+                logging.error(f"数据库连接失败，无法执行批量SQL\nSQL: {format_params(sql)}")
+                return False
+            run_metrics.incr("db_statements", len(params_list))
+            self._local.cursor = self._local.conn.executemany(_translate(sql), params_list)
+            self.record_error(None)
+            return True
+        except Exception as e:
+            self.record_error(e)
+            logging.error(f"批量执行SQL出错: {e}\nSQL: {format_params(sql)}\n参数列表: {format_params(params_list)}")
+            return False
+
+    def fetchall(self):
+        """
+        获取所有查询结果
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.fetchall()
+        return None
+
+    def fetchone(self):
+        """
+        获取一条查询结果
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return cursor.fetchone()
+        return None
+
+    def commit(self):
+        """
+        提交事务
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn.commit()
+            if not getattr(self._local, "in_session", False):
+                self.release(rollback=False)
+
+    def rollback(self):
+        """
+        回滚事务
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn.rollback()
+            if not getattr(self._local, "in_session", False):
+                self.release(rollback=False)
+
+    def get_last_insert_id(self) -> Optional[int]:
+        """
+        获取最近一条INSERT语句插入的第一条记录的ID
+        SQLite 返回的是最后一行的ID；表使用 AUTOINCREMENT，单条语句插入的行ID连续
+        （被 OR IGNORE 忽略的行不占用ID），由此换算出与 MySQL 一致的第一行ID
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None or not cursor.lastrowid:
+            return None
+        return cursor.lastrowid - max(cursor.rowcount, 1) + 1
+
+    def get_rows_affected(self) -> int:
+        """
+        获取最近一次操作影响的行数
+        """
+        cursor = getattr(self._local, "cursor", None)
+        if cursor:
+            return max(cursor.rowcount, 0)
+        return 0
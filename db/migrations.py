@@ -0,0 +1,303 @@
+import logging
+import sys
+from typing import Dict, List
+
+from .dbBackend import get_db_manager
+
+def backfill_push_news_ref() -> bool:
+    """
+    分批回填 pushinfo_latest.newsInfoRef，在添加外键之前执行
+    """
+    from .dbPushInfoLatest import get_db_push_info_latest
+
+    return get_db_push_info_latest().backfill_news_info_ref() is not None
+
+
+# 迁移列表，按顺序执行
+# 每个迁移通过 information_schema 检查约束（声明了 constraint 时）、索引（声明了 index 时）或表（视图）是否已存在，可重复执行
+# 声明了 run 的迁移先执行该函数（如分批回填数据），再执行 statements
+MIGRATIONS: List[Dict] = [
+    {
+        "name": "news_infos_source_create_index",
+        "table": "news_infos",
+        "index": "idx_source_create",
+        "statements": [
+            "ALTER TABLE news_infos ADD INDEX idx_source_create (sourceId, createDateTime)",
+        ],
+    },
+    {
+        "name": "news_infos_source_orig_unique",
+        "table": "news_infos",
+        "index": "uk_source_orig",
+        "statements": [
+            # 添加唯一键前先清理重复数据，每组 (sourceId, orig_Id) 保留最新插入的一条
+            """
+            DELETE n FROM news_infos n
+            JOIN (
+                SELECT sourceId, orig_Id, MAX(id) AS keep_id
+                FROM news_infos
+                GROUP BY sourceId, orig_Id
+                HAVING COUNT(*) > 1
+            ) d ON n.sourceId = d.sourceId AND n.orig_Id = d.orig_Id AND n.id < d.keep_id
+            """,
+            "ALTER TABLE news_infos ADD UNIQUE KEY uk_source_orig (sourceId, orig_Id)",
+        ],
+    },
+    {
+        "name": "create_publisher_runs",
+        "table": "publisher_runs",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS `publisher_runs` (
+              `id` int NOT NULL AUTO_INCREMENT,
+              `startedAt` datetime NULL DEFAULT NULL COMMENT '运行开始时间',
+              `elapsedSeconds` decimal(10, 3) NULL DEFAULT NULL COMMENT '运行总耗时',
+              `sources` int NULL DEFAULT NULL COMMENT '处理的渠道数',
+              `failedSources` int NULL DEFAULT NULL COMMENT '失败的渠道数',
+              `newItems` int NULL DEFAULT NULL COMMENT '新增新闻数',
+              `payloadBytes` bigint NULL DEFAULT NULL COMMENT '获取的数据字节数',
+              `dbStatements` int NULL DEFAULT NULL COMMENT '执行的SQL语句数',
+              `dbRoundTrips` int NULL DEFAULT NULL COMMENT '数据库往返次数',
+              `summary` json NULL COMMENT '完整的运行指标',
+              PRIMARY KEY (`id`) USING BTREE,
+              INDEX `idx_started`(`startedAt` ASC) USING BTREE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '每次运行的指标汇总'
+            """,
+        ],
+    },
+    {
+        "name": "news_infos_cluster_id",
+        "table": "news_infos",
+        "index": "idx_cluster",
+        "statements": [
+            """
+            ALTER TABLE news_infos
+            ADD COLUMN clusterId int NULL DEFAULT NULL COMMENT '近似重复新闻簇，为簇中第一条新闻的ID，为空表示自成一簇',
+            ADD INDEX idx_cluster (clusterId)
+            """,
+        ],
+    },
+    {
+        "name": "create_news_lsh_buckets",
+        "table": "news_lsh_buckets",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS `news_lsh_buckets` (
+              `band` tinyint UNSIGNED NOT NULL COMMENT '段号，8为规范化链接的哈希，16~43为标题SimHash的28个16位段',
+              `bucket` bigint UNSIGNED NOT NULL COMMENT '段值',
+              `newsInfoId` int NOT NULL COMMENT 'news_infos主键ID',
+              `clusterId` int NOT NULL COMMENT '所属新闻簇，为簇中第一条新闻的ID',
+              `simhash` bigint UNSIGNED NULL DEFAULT NULL COMMENT '标题SimHash指纹',
+              `createDateTime` datetime NOT NULL,
+              PRIMARY KEY (`band`, `bucket`, `newsInfoId`) USING BTREE,
+              INDEX `idx_create`(`createDateTime` ASC) USING BTREE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '近似重复新闻的LSH索引'
+            """,
+        ],
+    },
+    {
+        "name": "pushinfo_latest_consumer_index",
+        "table": "pushinfo_latest",
+        "index": "idx_type_status_id",
+        "statements": [
+            # 消费者按 (newsType, status) 认领、按id游标分页；claimedAt 用于把认领超时的记录放回
+            """
+            ALTER TABLE pushinfo_latest
+            ADD COLUMN claimedAt datetime NULL DEFAULT NULL COMMENT '被消费者认领的时间',
+            ADD INDEX idx_type_status_id (newsType, status, id)
+            """,
+        ],
+    },
+    {
+        "name": "create_source_leases",
+        "table": "source_leases",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS `source_leases` (
+              `sourceId` varchar(20) NOT NULL COMMENT '渠道ID',
+              `owner` varchar(128) NULL DEFAULT NULL COMMENT '持有租约的进程，为空表示空闲',
+              `expiresAt` datetime NULL DEFAULT NULL COMMENT '租约到期时间，到期后其他进程可以接管',
+              `updatedAt` datetime NULL DEFAULT NULL,
+              PRIMARY KEY (`sourceId`) USING BTREE,
+              INDEX `idx_owner`(`owner` ASC) USING BTREE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '多进程分片处理渠道时每个渠道的租约'
+            """,
+        ],
+    },
+    {
+        "name": "create_lease_workers",
+        "table": "lease_workers",
+        "statements": [
+            """
+            CREATE TABLE IF NOT EXISTS `lease_workers` (
+              `owner` varchar(128) NOT NULL COMMENT '进程标识',
+              `heartbeatAt` datetime NOT NULL COMMENT '最近一次心跳时间',
+              PRIMARY KEY (`owner`) USING BTREE,
+              INDEX `idx_heartbeat`(`heartbeatAt` ASC) USING BTREE
+            ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '参与分片的进程及心跳，用于计算每个进程的份额'
+            """,
+        ],
+    },
+    {
+        # 第一步：添加整数外键字段和索引，之后新写入的推送记录同时写入 newsInfoId 和 newsInfoRef
+        "name": "pushinfo_latest_news_ref",
+        "table": "pushinfo_latest",
+        "index": "idx_news_ref",
+        "statements": [
+            """
+            ALTER TABLE pushinfo_latest
+            ADD COLUMN newsInfoRef int NULL DEFAULT NULL COMMENT 'news_infos主键ID（整数外键）',
+            ADD INDEX idx_news_ref (newsInfoRef),
+            ADD INDEX idx_type_source_create (newsType, sourceId, createDateTime)
+            """,
+        ],
+    },
+    {
+        # 第二步：分批回填旧记录，再添加外键，新闻被清理时对应的推送记录一起删除
+        "name": "pushinfo_latest_news_ref_fk",
+        "table": "pushinfo_latest",
+        "constraint": "fk_push_news",
+        "run": backfill_push_news_ref,
+        "statements": [
+            """
+            ALTER TABLE pushinfo_latest
+            ADD CONSTRAINT fk_push_news FOREIGN KEY (newsInfoRef) REFERENCES news_infos (id) ON DELETE CASCADE
+            """,
+        ],
+    },
+    {
+        "name": "create_v_push_feed",
+        "table": "v_push_feed",
+        "statements": [
+            """
+            CREATE OR REPLACE VIEW v_push_feed AS
+            SELECT p.id, p.sourceId, p.sourceName, p.newsInfoId, p.newsInfoRef, p.newsType, p.status,
+                   p.createDateTime, p.claimedAt, n.title, n.url, COALESCE(n.clusterId, n.id) AS clusterId
+            FROM pushinfo_latest p
+            JOIN news_infos n ON n.id = p.newsInfoRef
+            """,
+        ],
+    },
+]
+
+
+def constraint_exists(table: str, constraint: str) -> bool:
+    """
+    检查当前数据库中指定表的约束是否存在
+
+    Args:
+        table: 表名
+        constraint: 约束名
+
+    Returns:
+        bool: 约束是否存在
+    """
+    sql = """
+        SELECT 1 FROM information_schema.TABLE_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = %s
+        LIMIT 1
+    """
+    db_manager = get_db_manager()
+    if not db_manager.execute(sql, (table, constraint)):
+        raise RuntimeError(f"查询约束 {table}.{constraint} 失败")
+    return db_manager.fetchone() is not None
+
+
+def index_exists(table: str, index: str) -> bool:
+    """
+    检查当前数据库中指定表的索引是否存在
+
+    Args:
+        table: 表名
+        index: 索引名
+
+    Returns:
+        bool: 索引是否存在
+    """
+    sql = """
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        LIMIT 1
+    """
+    db_manager = get_db_manager()
+    if not db_manager.execute(sql, (table, index)):
+        raise RuntimeError(f"查询索引 {table}.{index} 失败")
+    return db_manager.fetchone() is not None
+
+
+def table_exists(table: str) -> bool:
+    """
+    检查当前数据库中指定表是否存在
+
+    Args:
+        table: 表名
+
+    Returns:
+        bool: 表是否存在
+    """
+    sql = """
+        SELECT 1 FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        LIMIT 1
+    """
+    db_manager = get_db_manager()
+    if not db_manager.execute(sql, (table,)):
+        raise RuntimeError(f"查询表 {table} 失败")
+    return db_manager.fetchone() is not None
+
+
+def is_applied(migration: Dict) -> bool:
+    """
+    检查迁移是否已应用
+    """
+    if "constraint" in migration:
+        return constraint_exists(migration["table"], migration["constraint"])
+    if "index" in migration:
+        return index_exists(migration["table"], migration["index"])
+    return table_exists(migration["table"])
+
+
+def run_migrations() -> bool:
+    """
+    依次执行尚未应用的迁移
+
+    Returns:
+        bool: 所有迁移是否都已成功应用
+    """
+    db_manager = get_db_manager()
+    if db_manager.dialect != "mysql":
+        # SQLite 后端打开数据库时按 db/tableStruct/sqlite/schema.sql 建表，已包含所有迁移的结果
+        logging.info(f"{db_manager.dialect} 后端的表结构在打开数据库时创建，无需迁移")
+        return True
+    with db_manager.session():
+        for migration in MIGRATIONS:
+            name = migration["name"]
+            try:
+                if is_applied(migration):
+                    logging.info(f"迁移 {name} 已应用，跳过")
+                    continue
+                logging.info(f"开始执行迁移 {name}")
+                if "run" in migration and not migration["run"]():
+                    db_manager.rollback()
+                    logging.error(f"迁移 {name} 执行失败")
+                    return False
+                for sql in migration["statements"]:
+                    if not db_manager.execute(sql):
+                        db_manager.rollback()
+                        logging.error(f"迁移 {name} 执行失败")
+                        return False
+                    logging.info(f"迁移 {name} 影响行数: {db_manager.get_rows_affected()}")
+                    db_manager.commit()
+                logging.info(f"迁移 {name} 执行完成")
+            except Exception as e:
+                db_manager.rollback()
+                logging.error(f"迁移 {name} 执行时发生错误: {e}", exc_info=True)
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    from utils.logger import setup_logger
+
+    setup_logger()
+    sys.exit(0 if run_migrations() else 1)
@@ -28,7 +28,11 @@ CREATE TABLE `news_infos`  (
   `title` varchar(200) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
   `url` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL,
   `createDateTime` datetime NULL DEFAULT NULL,
-  PRIMARY KEY (`id`) USING BTREE
+  `clusterId` int NULL DEFAULT NULL COMMENT '近似重复新闻簇，为簇中第一条新闻的ID，为空表示自成一簇',
+  PRIMARY KEY (`id`) USING BTREE,
+  UNIQUE INDEX `uk_source_orig`(`sourceId` ASC, `orig_Id` ASC) USING BTREE,
+  INDEX `idx_source_create`(`sourceId` ASC, `createDateTime` ASC) USING BTREE,
+  INDEX `idx_cluster`(`clusterId` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci ROW_FORMAT = Dynamic;
 
 -- ----------------------------
@@ -0,0 +1,19 @@
+SET NAMES utf8mb4;
+SET FOREIGN_KEY_CHECKS = 0;
+
+-- ----------------------------
+-- Table structure for news_lsh_buckets
+-- ----------------------------
+DROP TABLE IF EXISTS `news_lsh_buckets`;
+CREATE TABLE `news_lsh_buckets`  (
+  `band` tinyint UNSIGNED NOT NULL COMMENT '段号，8为规范化链接的哈希，16~43为标题SimHash的28个16位段',
+  `bucket` bigint UNSIGNED NOT NULL COMMENT '段值',
+  `newsInfoId` int NOT NULL COMMENT 'news_infos主键ID',
+  `clusterId` int NOT NULL COMMENT '所属新闻簇，为簇中第一条新闻的ID',
+  `simhash` bigint UNSIGNED NULL DEFAULT NULL COMMENT '标题SimHash指纹',
+  `createDateTime` datetime NOT NULL,
+  PRIMARY KEY (`band`, `bucket`, `newsInfoId`) USING BTREE,
+  INDEX `idx_create`(`createDateTime` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '近似重复新闻的LSH索引' ROW_FORMAT = Dynamic;
+
+SET FOREIGN_KEY_CHECKS = 1;
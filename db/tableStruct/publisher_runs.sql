@@ -0,0 +1,23 @@
+SET NAMES utf8mb4;
+SET FOREIGN_KEY_CHECKS = 0;
+
+-- ----------------------------
+-- Table structure for publisher_runs
+-- ----------------------------
+DROP TABLE IF EXISTS `publisher_runs`;
+CREATE TABLE `publisher_runs`  (
+  `id` int NOT NULL AUTO_INCREMENT,
+  `startedAt` datetime NULL DEFAULT NULL COMMENT '运行开始时间',
+  `elapsedSeconds` decimal(10, 3) NULL DEFAULT NULL COMMENT '运行总耗时',
+  `sources` int NULL DEFAULT NULL COMMENT '处理的渠道数',
+  `failedSources` int NULL DEFAULT NULL COMMENT '失败的渠道数',
+  `newItems` int NULL DEFAULT NULL COMMENT '新增新闻数',
+  `payloadBytes` bigint NULL DEFAULT NULL COMMENT '获取的数据字节数',
+  `dbStatements` int NULL DEFAULT NULL COMMENT '执行的SQL语句数',
+  `dbRoundTrips` int NULL DEFAULT NULL COMMENT '数据库往返次数',
+  `summary` json NULL COMMENT '完整的运行指标',
+  PRIMARY KEY (`id`) USING BTREE,
+  INDEX `idx_started`(`startedAt` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '每次运行的指标汇总' ROW_FORMAT = Dynamic;
+
+SET FOREIGN_KEY_CHECKS = 1;
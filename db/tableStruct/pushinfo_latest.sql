@@ -27,9 +27,15 @@ CREATE TABLE `pushinfo_latest`  (
   `sourceName` varchar(30) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL COMMENT '渠道名',
   `newsInfoId` varchar(30) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL COMMENT 'news_infos主键ID',
   `newsType` varchar(10) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL COMMENT '现在是2个推送信息，stock和news',
-  `status` int NULL DEFAULT NULL,
+  `status` int NULL DEFAULT NULL COMMENT '0 待推送，1 已被消费者认领，2 已推送',
   `createDateTime` datetime NULL DEFAULT NULL,
-  PRIMARY KEY (`id`) USING BTREE
+  `claimedAt` datetime NULL DEFAULT NULL COMMENT '被消费者认领的时间',
+  `newsInfoRef` int NULL DEFAULT NULL COMMENT 'news_infos主键ID（整数外键）',
+  PRIMARY KEY (`id`) USING BTREE,
+  INDEX `idx_type_status_id`(`newsType` ASC, `status` ASC, `id` ASC) USING BTREE,
+  INDEX `idx_news_ref`(`newsInfoRef` ASC) USING BTREE,
+  INDEX `idx_type_source_create`(`newsType` ASC, `sourceId` ASC, `createDateTime` ASC) USING BTREE,
+  CONSTRAINT `fk_push_news` FOREIGN KEY (`newsInfoRef`) REFERENCES `news_infos` (`id`) ON DELETE CASCADE
 ) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '最近需要推送的数据' ROW_FORMAT = Dynamic;
 
 -- ----------------------------
@@ -0,0 +1,28 @@
+SET NAMES utf8mb4;
+SET FOREIGN_KEY_CHECKS = 0;
+
+-- ----------------------------
+-- Table structure for source_leases
+-- ----------------------------
+DROP TABLE IF EXISTS `source_leases`;
+CREATE TABLE `source_leases`  (
+  `sourceId` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL COMMENT '渠道ID',
+  `owner` varchar(128) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NULL DEFAULT NULL COMMENT '持有租约的进程，为空表示空闲',
+  `expiresAt` datetime NULL DEFAULT NULL COMMENT '租约到期时间，到期后其他进程可以接管',
+  `updatedAt` datetime NULL DEFAULT NULL,
+  PRIMARY KEY (`sourceId`) USING BTREE,
+  INDEX `idx_owner`(`owner` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '多进程分片处理渠道时每个渠道的租约' ROW_FORMAT = Dynamic;
+
+-- ----------------------------
+-- Table structure for lease_workers
+-- ----------------------------
+DROP TABLE IF EXISTS `lease_workers`;
+CREATE TABLE `lease_workers`  (
+  `owner` varchar(128) CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci NOT NULL COMMENT '进程标识',
+  `heartbeatAt` datetime NOT NULL COMMENT '最近一次心跳时间',
+  PRIMARY KEY (`owner`) USING BTREE,
+  INDEX `idx_heartbeat`(`heartbeatAt` ASC) USING BTREE
+) ENGINE = InnoDB CHARACTER SET = utf8mb4 COLLATE = utf8mb4_general_ci COMMENT = '参与分片的进程及心跳，用于计算每个进程的份额' ROW_FORMAT = Dynamic;
+
+SET FOREIGN_KEY_CHECKS = 1;
@@ -0,0 +1,75 @@
+-- SQLite 后端的表结构，与 MySQL 表结构（db/tableStruct/*.sql 加上 db/migrations.py）保持一致，包括相同的索引
+-- 每次打开数据库时执行，全部使用 IF NOT EXISTS，可重复执行
+
+CREATE TABLE IF NOT EXISTS news_infos (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  orig_Id varchar(50) COLLATE NOCASE,
+  sourceId varchar(20) COLLATE NOCASE,
+  title varchar(200),
+  url varchar(255),
+  createDateTime datetime,
+  clusterId int
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uk_source_orig ON news_infos (sourceId, orig_Id);
+CREATE INDEX IF NOT EXISTS idx_source_create ON news_infos (sourceId, createDateTime);
+CREATE INDEX IF NOT EXISTS idx_cluster ON news_infos (clusterId);
+
+CREATE TABLE IF NOT EXISTS pushinfo_latest (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  sourceId varchar(20),
+  sourceName varchar(30),
+  newsInfoId varchar(30),
+  newsType varchar(10),
+  status int,
+  createDateTime datetime,
+  claimedAt datetime,
+  newsInfoRef int REFERENCES news_infos (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_type_status_id ON pushinfo_latest (newsType, status, id);
+CREATE INDEX IF NOT EXISTS idx_news_ref ON pushinfo_latest (newsInfoRef);
+CREATE INDEX IF NOT EXISTS idx_type_source_create ON pushinfo_latest (newsType, sourceId, createDateTime);
+
+CREATE VIEW IF NOT EXISTS v_push_feed AS
+SELECT p.id, p.sourceId, p.sourceName, p.newsInfoId, p.newsInfoRef, p.newsType, p.status,
+       p.createDateTime, p.claimedAt, n.title, n.url, COALESCE(n.clusterId, n.id) AS clusterId
+FROM pushinfo_latest p
+JOIN news_infos n ON n.id = p.newsInfoRef;
+
+CREATE TABLE IF NOT EXISTS news_lsh_buckets (
+  band int NOT NULL,
+  bucket bigint NOT NULL,
+  newsInfoId int NOT NULL,
+  clusterId int NOT NULL,
+  simhash bigint,
+  createDateTime datetime NOT NULL,
+  PRIMARY KEY (band, bucket, newsInfoId)
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_create ON news_lsh_buckets (createDateTime);
+
+CREATE TABLE IF NOT EXISTS publisher_runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  startedAt datetime,
+  elapsedSeconds real,
+  sources int,
+  failedSources int,
+  newItems int,
+  payloadBytes bigint,
+  dbStatements int,
+  dbRoundTrips int,
+  summary text
+);
+CREATE INDEX IF NOT EXISTS idx_started ON publisher_runs (startedAt);
+
+CREATE TABLE IF NOT EXISTS source_leases (
+  sourceId varchar(20) PRIMARY KEY,
+  owner varchar(128),
+  expiresAt datetime,
+  updatedAt datetime
+);
+CREATE INDEX IF NOT EXISTS idx_owner ON source_leases (owner);
+
+CREATE TABLE IF NOT EXISTS lease_workers (
+  owner varchar(128) PRIMARY KEY,
+  heartbeatAt datetime NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_heartbeat ON lease_workers (heartbeatAt);
@@ -0,0 +1,9 @@
+-- ----------------------------
+-- View structure for v_push_feed
+-- 推送记录按整数外键 newsInfoRef 关联新闻，feed 和消费者接口从该视图读取
+-- ----------------------------
+CREATE OR REPLACE VIEW `v_push_feed` AS
+SELECT p.id, p.sourceId, p.sourceName, p.newsInfoId, p.newsInfoRef, p.newsType, p.status,
+       p.createDateTime, p.claimedAt, n.title, n.url, COALESCE(n.clusterId, n.id) AS clusterId
+FROM pushinfo_latest p
+JOIN news_infos n ON n.id = p.newsInfoRef;
@@ -1,128 +1,785 @@
+import argparse
+import asyncio
 import json
 import os
-from pathlib import Path
+import signal
+import time
 import logging
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, FrozenSet, Optional
 
-from db.dbNewsInfos import db_news_infos
-from db.dbPushInfoLatest import db_push_info_latest
-from api.newsApi import news_api
+from db.dbBackend import get_db_manager
+from db.dbNewsClusters import get_db_news_clusters
+from db.dbNewsInfos import get_db_news_infos
+from db.dbPushInfoLatest import get_db_push_info_latest
+from db.dbPublisherRuns import get_db_publisher_runs
+from db.dbRetention import get_db_retention
+from api.newsApi import get_news_api, STATUS_DEADLINE_EXCEEDED, STATUS_NOT_MODIFIED
+from api.newsItems import NewsItem, orig_id_key
+from utils.feed_snapshot import create_snapshot_writer
+from utils.lazy import lazy_instance
+from utils.local_cache import get_local_cache
 from utils.logger import setup_logger
+from utils.metrics import run_metrics, export_metrics
+from utils.outbox import get_news_outbox
+from utils.scheduler import SourceScheduler
+from utils.source_sharding import get_source_sharding
+from utils.source_registry import get_sources
 
-# 配置日志系统
-setup_logger()
+# _save_news 的返回值：新闻因数据错误无法写入，重试也不会成功
+SAVE_REJECTED = -1
 
 class NewsPublisher:
     """
     新闻发布管理器
     """
-    def __init__(self):
+    def __init__(self, fetch_concurrency: int = None, sources: Optional[List[Dict]] = None):
         self.sources = []
-        self.initialize()
+        # 单独配置了推送记录保留数量（keep_count）的数据源
+        self.push_keep_counts: Dict[str, int] = {}
+        self.fetch_concurrency = fetch_concurrency or self._load_fetch_concurrency()
+        # 静态feed快照写入器，配置 SNAPSHOT_DIR 后启用
+        self.snapshot_writer = create_snapshot_writer()
+        self._snapshot_initialized = False
+        # 本地去重缓存的有效期、每个数据源保留条数和最长保留时间
+        self.seen_cache_ttl = self._load_int_env("LOCAL_CACHE_TTL_HOURS", 24) * 3600
+        self.seen_cache_max_per_source = self._load_int_env("LOCAL_CACHE_MAX_PER_SOURCE", 500)
+        self.seen_cache_max_age = self._load_int_env("LOCAL_CACHE_MAX_AGE_DAYS", 7) * 86400
+        # 跨渠道近似重复新闻归并，NEWS_CLUSTERING=0 时关闭
+        self.clustering_enabled = os.environ.get("NEWS_CLUSTERING", "1") != "0"
+        # 数据库写入失败后的 OUTBOX_RETRY_SECONDS（默认60）秒内不再尝试写入，新数据直接写入本地暂存区
+        self.db_retry_seconds = self._load_int_env("OUTBOX_RETRY_SECONDS", 60)
+        # 一次写入超过 DB_SLOW_WRITE_SECONDS（默认5）秒时同样暂停写入，数据库变慢时不拖慢抓取
+        self.db_slow_write_seconds = self._load_int_env("DB_SLOW_WRITE_SECONDS", 5)
+        # 数据库恢复后每批补写的暂存记录数量
+        self.outbox_drain_batch = self._load_int_env("OUTBOX_DRAIN_BATCH", 500)
+        self._db_retry_at = 0.0
+        self.initialize(sources)
 
-    def initialize(self):
+    def initialize(self, sources: Optional[List[Dict]] = None):
         """
         初始化函数，加载数据源配置
+
+        Args:
+            sources: 数据源配置列表，为空时从 news-source.json 加载
         """
         try:
-            source_file = Path(__file__).parent / "news-source.json"
-            with open(source_file, 'r', encoding='utf-8') as f:
-                self.sources = json.load(f)
-            logging.info(f"成功加载 {len(self.sources)} 个新闻源")
+            # news-source.json 每个进程只解析一次，与 NewsApi 共用
+            self.sources = sources if sources is not None else get_sources()
+            self.push_keep_counts = {
+                source["id"]: source["keep_count"] for source in self.sources if source.get("keep_count")
+            }
         except Exception as e:
             logging.error(f"加载新闻源配置文件失败: {e}", exc_info=True)
             self.sources = []
 
-    def push_news(self):
+    @staticmethod
+    def _load_int_env(name: str, default: int) -> int:
+        """
+        读取正整数类型的环境变量，无效时使用默认值
+        """
+        value = os.environ.get(name)
+        if not value or not value.isdigit() or int(value) < 1:
+            return default
+        return int(value)
+
+    @classmethod
+    def _load_fetch_concurrency(cls, default: int = 8) -> int:
+        """
+        从环境变量 FETCH_CONCURRENCY 读取同时处理的数据源数量上限
         """
-        推送新闻业务逻辑
-        1. 遍历数据源
-        2. 对每个数据源：
-           - 获取数据库中的最新记录
+        return cls._load_int_env("FETCH_CONCURRENCY", default)
+
+    def push_news(self, sources: Optional[List[Dict]] = None, deadline: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        推送新闻业务逻辑，sources 为空时处理所有数据源
+        1. 获取所有数据源最新记录的orig_Id集合，优先使用本地缓存，
+           缓存过期或未命中的数据源一次查询数据库
+        2. 按顺序并发处理数据源，同时进行中的数据源数量不超过 fetch_concurrency；
+           设置了 deadline 时，到达截止时间后不再开始新的数据源，进行中的请求超时和重试不超过截止时间，
+           返回前等待进行中的数据源处理完成
+        3. 对每个数据源：
            - 获取API的最新数据
-           - 比较并插入新数据
-           - 创建推送记录
-        """
-        logging.info("开始执行新闻推送任务...")
-        for source in self.sources:
-            source_id = source["id"]
-            source_name = source["name"]
-            logging.info(f"处理新闻源: {source_name}({source_id})")
-            
-            # 获取数据库中的最新记录，默认前90条
-            db_records = db_news_infos.get_latest_by_sourceId(source_id)
-            db_orig_ids = set()
-            if db_records:
-                db_orig_ids = {record[2] for record in db_records if record is not None and len(record) > 2 and record[2] is not None}
-                # db_orig_ids = {record[2] for record in db_records}  # orig_Id在结果的第3个位置
-            
-            # 获取API的最新数据
-            api_data = news_api.fetch_news_by_id(source_id)
-            if not api_data or api_data.get("status") != "success":
-                logging.error(f"获取新闻源 {source_id} 的API数据失败")
-                continue
-            
-            # 处理新数据
-            try:
-                new_items = [item for item in api_data["items"] if "id" in item and str(item["id"]) not in db_orig_ids]
-                # new_items = [item for item in api_data["items"] if str(item["id"]) not in db_orig_ids]
-            except Exception as e:
-                logging.error(f"发现新闻时出错:{e}")
-                continue
-            
-            # if new_items:
-            #     # 删除已发布的信息
-            #     db_push_info_latest.delete_by_type_and_source(source_id)
-
-            # 统计成功插入的数量
-            success_count = 0
-            for item in new_items:
-                orig_id = str(item["id"])
-                # 插入新的新闻记录
-                news_data = {
-                    "orig_Id": orig_id,
-                    "title": item["title"],
-                    "url": item["url"],
-                    "sourceId": source_id
-                }
-                
-                inserted_id = db_news_infos.insert_single_news(news_data)
-                if inserted_id:
-                    # 创建推送记录
-                    push_data = {
-                        "sourceId": source_id,
-                        "sourceName": source_name,
-                        "newsInfoId": str(inserted_id),
-                        "newsType": "news",
-                        "status": 0
-                    }
-                    push_result = db_push_info_latest.insert_single_push_info(push_data)
-                    if push_result:
-                        success_count += 1
-            
-             # 新数据处理完成后，保留最新的30条记录，删除多余的旧记录
-          
-            if new_items and success_count > 0:
-                db_push_info_latest.delete_excess_by_source_id(source_id, keep_count=30)
-                logging.info(f"source_id: {source_id}, 来源: {source_name} - 成功处理 {success_count} 条新闻")
-            
+           - 数据返回后立即在内存中与数据库最新记录比较
+           - 有新数据时从连接池检出连接，插入新数据（超出比较窗口的旧数据由唯一键拒绝）
+           - 为新插入的新闻创建推送记录
+        4. 数据库可用时，把本地暂存区中的新闻批量补写到数据库
+        5. 有新数据时，一条语句裁剪所有数据源的推送记录，并更新静态feed快照
+
+        Args:
+            sources: 要处理的数据源，为空时处理所有数据源
+            deadline: 截止时间（time.monotonic()），为空时不限制
+
+        Returns:
+            Dict[str, Dict]: 键为数据源ID，值为 run_source 返回的处理结果；
+            因到达截止时间没有开始或请求被中断的数据源 status 为 deferred
+        """
+        sources = self.sources if sources is None else sources
+        logging.info(f"开始执行新闻推送任务，数据源: {len(sources)} 个，并发数: {self.fetch_concurrency}")
+        results = {}
+        if not sources:
+            logging.info("完成新闻推送处理")
+            return results
+
+        source_ids = [source["id"] for source in sources]
+        with run_metrics.timed("dedup"):
+            recent_orig_ids = self._load_recent_orig_ids(source_ids)
+
+        queued = deque(sources)
+        # 没有截止时间时一次提交全部数据源；有截止时间时只保持 fetch_concurrency 个在处理中，
+        # 每完成一个再按顺序开始下一个，截止时间之后不再开始。
+        # 进行中的请求超时和重试不超过截止时间，这些数据源都会等到处理完成，
+        # 之后才释放租约、保存续跑游标，不会有线程在返回后继续写入
+        window = len(queued) if deadline is None else self.fetch_concurrency
+        with ThreadPoolExecutor(max_workers=self.fetch_concurrency, thread_name_prefix="news-source") as executor:
+            futures = {}
+            while queued or futures:
+                while queued and len(futures) < window and (deadline is None or time.monotonic() < deadline):
+                    source = queued.popleft()
+                    futures[executor.submit(
+                        self.run_source, source, recent_orig_ids.get(source["id"], frozenset()), deadline
+                    )] = source
+                if not futures:
+                    break
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = futures.pop(future)
+                    try:
+                        results[source["id"]] = future.result()
+                    except Exception as e:
+                        logging.error(f"处理新闻源 {source['id']} 时发生错误: {e}", exc_info=True)
+                        results[source["id"]] = {"sourceId": source["id"], "status": "failed", "newCount": 0,
+                                                 "fetchSeconds": None, "updatedTime": None}
+
+        for source in queued:
+            run_metrics.record_source(source["id"], status="deferred")
+            results[source["id"]] = {"sourceId": source["id"], "status": "deferred", "newCount": 0,
+                                     "fetchSeconds": None, "updatedTime": None}
+        deferred_count = sum(1 for result in results.values() if result["status"] == "deferred")
+        if deferred_count:
+            logging.info(f"已到达截止时间，{deferred_count} 个数据源留到下次处理")
+
+        # 到达截止时间后暂存区留到下次补写
+        drained = self.drain_outbox() if deadline is None or time.monotonic() < deadline else 0
+
+        # 所有数据源处理完成后，一条语句裁剪推送记录，每个数据源保留最新的 keep_count（默认30）条
+        has_new = drained > 0 or any(result["newCount"] > 0 for result in results.values())
+        if has_new:
+            with run_metrics.timed("retention"), get_db_manager().session():
+                get_db_push_info_latest().trim_all(self.push_keep_counts)
+        if self.snapshot_writer and (has_new or not self._snapshot_initialized):
+            with run_metrics.timed("snapshot"):
+                self._write_snapshots()
+
+        evicted = get_local_cache().evict_seen_ids(self.seen_cache_max_per_source, self.seen_cache_max_age)
+        if evicted:
+            logging.info(f"本地去重缓存淘汰 {evicted} 条记录")
         logging.info("完成新闻推送处理")
+        return results
+
+    def _write_snapshots(self):
+        """
+        把推送记录写成静态feed快照，内容未变化的快照不会重写
+        """
+        with get_db_manager().session():
+            rows = get_db_push_info_latest().get_feed_rows()
+        if rows is None:
+            return
+        try:
+            written = self.snapshot_writer.write(rows)
+            self._snapshot_initialized = True
+            logging.info(f"feed快照更新 {written} 个文件")
+        except Exception as e:
+            logging.error(f"写入feed快照失败: {e}", exc_info=True)
 
-# 创建发布器实例
-news_publisher = NewsPublisher()
+    def _load_recent_orig_ids(self, source_ids: List[str]) -> Dict[str, FrozenSet[str]]:
+        """
+        获取各数据源最新记录的orig_Id集合
+        先读本地缓存，缓存过期或未命中的数据源再一次查询数据库并写回缓存
 
-if __name__ == "__main__":
+        Args:
+            source_ids: 数据源ID列表
+
+        Returns:
+            Dict[str, FrozenSet[str]]: 键为数据源ID，值为orig_Id比较键（orig_id_key）集合；
+            查询数据库失败的数据源不包含在内，完全依赖数据库唯一键去重
+        """
+        local_cache = get_local_cache()
+        recent_orig_ids = local_cache.get_seen_ids(source_ids, self.seen_cache_ttl)
+        missing_ids = [source_id for source_id in source_ids if source_id not in recent_orig_ids]
+        if local_cache.enabled:
+            logging.info(f"本地去重缓存命中 {len(recent_orig_ids)}/{len(source_ids)} 个数据源")
+        if missing_ids:
+            with get_db_manager().session():
+                db_orig_ids = get_db_news_infos().get_recent_orig_ids(missing_ids)
+            if db_orig_ids is not None:
+                local_cache.sync_seen_ids(db_orig_ids)
+                recent_orig_ids.update({
+                    source_id: frozenset(map(orig_id_key, orig_ids)) for source_id, orig_ids in db_orig_ids.items()
+                })
+            else:
+                self._pause_db_writes()
+        return recent_orig_ids
+
+    def _db_writes_paused(self) -> bool:
+        return time.monotonic() < self._db_retry_at
+
+    def _pause_db_writes(self):
+        """
+        数据库不可用，在重试间隔内新数据直接写入本地暂存区，不再逐个数据源等待数据库
+        """
+        if get_news_outbox().enabled:
+            self._db_retry_at = time.monotonic() + self.db_retry_seconds
+
+    def run_source(self, source: Dict, known_orig_ids: FrozenSet[str] = frozenset(),
+                   deadline: Optional[float] = None) -> Dict:
+        """
+        获取单个数据源的API数据并处理
+
+        Args:
+            source: 新闻源配置，包含 id 和 name
+            known_orig_ids: 数据库中该数据源最新记录的orig_Id比较键（orig_id_key）集合
+            deadline: 请求的截止时间（time.monotonic()），为空时不限制
+
+        Returns:
+            Dict: 处理结果，包含：
+                - sourceId: 数据源ID
+                - status: success / not_modified / failed / deferred（到达截止时间请求被中断，或租约已不属于本进程）
+                - newCount: 成功处理的新闻数量
+                - fetchSeconds: 获取API数据的耗时（秒）
+                - updatedTime: API数据的 updatedTime
+        """
+        sharding = get_source_sharding()
+        if sharding is not None and not sharding.owns(source["id"]):
+            # 排队期间租约被释放或到期，可能已由其他进程接管
+            logging.info(f"数据源 {source['id']} 的租约已不属于本进程，跳过")
+            run_metrics.record_source(source["id"], status="deferred")
+            return {"sourceId": source["id"], "status": "deferred", "newCount": 0,
+                    "fetchSeconds": None, "updatedTime": None}
+
+        started = time.monotonic()
+        api_data = get_news_api().fetch_news_by_id(source["id"], deadline)
+        fetch_seconds = time.monotonic() - started
+        run_metrics.add_time("fetch", fetch_seconds)
+        new_count = self.process_source(source, api_data, known_orig_ids)
+
+        status = api_data.get("status") if api_data else None
+        if status == STATUS_DEADLINE_EXCEEDED:
+            status = "deferred"
+        elif status not in ("success", STATUS_NOT_MODIFIED):
+            status = "failed"
+        run_metrics.record_source(
+            source["id"],
+            status=status,
+            fetchSeconds=fetch_seconds,
+            items=len(api_data.get("items") or []) if status == "success" else 0,
+            newItems=new_count
+        )
+        return {
+            "sourceId": source["id"],
+            "status": status,
+            "newCount": new_count,
+            "fetchSeconds": fetch_seconds,
+            "updatedTime": api_data.get("updatedTime") if api_data else None
+        }
+
+    def process_source(self, source: Dict, api_data: Optional[Dict], known_orig_ids: FrozenSet[str] = frozenset()) -> int:
+        """
+        处理单个数据源的API数据：在内存中去重，插入新数据、为新插入的新闻创建推送记录
+        只有存在新数据时才从连接池检出连接
+
+        Args:
+            source: 新闻源配置，包含 id 和 name
+            api_data: fetch_news_by_id 返回的新闻数据
+            known_orig_ids: 数据库中该数据源最新记录的orig_Id比较键（orig_id_key）集合
+
+        Returns:
+            int: 成功处理的新闻数量
+        """
+        source_id = source["id"]
+        source_name = source["name"]
+        logging.info(f"处理新闻源: {source_name}({source_id})")
+
+        if api_data and api_data.get("status") == STATUS_NOT_MODIFIED:
+            logging.info(f"source_id: {source_id} 数据未变化，跳过")
+            return 0
+        if api_data and api_data.get("status") == STATUS_DEADLINE_EXCEEDED:
+            return 0
+        if not api_data or api_data.get("status") != "success":
+            logging.error(f"获取新闻源 {source_id} 的API数据失败")
+            return 0
+
+        # 处理新数据，跳过数据库中已有的orig_Id，同一批数据中重复的orig_Id只保留第一条，
+        # 与数据库唯一键一样按不区分大小写的比较键判断
+        dedup_started = time.monotonic()
+        try:
+            unique_items: Dict[str, NewsItem] = {}
+            payload_orig_ids = set()
+            for item in api_data["items"]:
+                key = orig_id_key(item.id)
+                payload_orig_ids.add(key)
+                if key not in known_orig_ids and key not in unique_items:
+                    unique_items[key] = item
+            news_list = list(unique_items.values())
+        except Exception as e:
+            logging.error(f"发现新闻时出错:{e}")
+            return 0
+        finally:
+            run_metrics.add_time("dedup", time.monotonic() - dedup_started)
+
+        # if new_items:
+        #     # 删除已发布的信息
+        #     db_push_info_latest.delete_by_type_and_source(source_id)
+
+        success_count = 0
+        if news_list:
+            if self._db_writes_paused():
+                success_count = self._spool_news(source, news_list)
+            else:
+                write_started = time.monotonic()
+                with run_metrics.timed("insert"), get_db_manager().session():
+                    success_count = self._save_news(source, news_list)
+                write_seconds = time.monotonic() - write_started
+                if success_count is None:
+                    self._pause_db_writes()
+                    success_count = self._spool_news(source, news_list)
+                elif success_count == SAVE_REJECTED:
+                    success_count = self._reject_news(source, news_list)
+                elif write_seconds >= self.db_slow_write_seconds:
+                    logging.warning(f"source_id: {source_id} 写入数据库耗时 {write_seconds:.1f} 秒，暂停写入数据库")
+                    self._pause_db_writes()
+            if success_count is None:
+                return 0
+
+        # 数据已写入数据库、数据库中已存在或已写入本地暂存区，记入本地去重缓存，并确认本次响应已处理
+        get_local_cache().add_seen_ids(source_id, payload_orig_ids)
+        get_news_api().mark_processed(source_id)
+        return success_count
+
+    def _spool_news(self, source: Dict, news_list: List[NewsItem]) -> Optional[int]:
+        """
+        数据库不可用时把新数据写入本地暂存区，等数据库恢复后补写
+
+        Returns:
+            int: 0（暂存的新闻尚未发布），暂存区关闭或写入失败返回None
+        """
+        source_id = source["id"]
+        spooled = get_news_outbox().add(source_id, source["name"], news_list)
+        if spooled is None:
+            return None
+        run_metrics.incr("outbox_spooled", spooled)
+        logging.warning(f"source_id: {source_id} 数据库不可用，{len(news_list)} 条新数据已写入本地暂存区")
+        return 0
+
+    def _reject_news(self, source: Dict, news_list: List[NewsItem]) -> int:
+        """
+        新数据因数据错误无法写入数据库，重试也不会成功：写入暂存区的隔离表，不再重试
+
+        Returns:
+            int: 0（隔离的新闻不发布）
+        """
+        source_id = source["id"]
+        rejected = get_news_outbox().add_rejected(source_id, source["name"], news_list, "数据错误，写入数据库失败")
+        run_metrics.incr("outbox_rejected", len(news_list))
+        if rejected:
+            logging.error(f"source_id: {source_id} {len(news_list)} 条新数据因数据错误无法写入，已移入暂存区隔离表")
+        else:
+            logging.error(f"source_id: {source_id} {len(news_list)} 条新数据因数据错误无法写入，已丢弃")
+        return 0
+
+    def drain_outbox(self) -> int:
+        """
+        把本地暂存区中的新闻按暂存顺序、按数据源批量补写到数据库，每批 outbox_drain_batch 条
+        补写与正常写入使用同一条路径，已存在的新闻由唯一键拒绝，重复补写不会产生重复数据
+        某个数据源因连接等原因补写失败或写入过慢时视为数据库仍不可用，停止本次补写；
+        因数据错误无法写入的记录直接移入隔离表，不占用重试次数
+
+        Returns:
+            int: 补写成功并新发布的新闻数量
+        """
+        outbox = get_news_outbox()
+        if self._db_writes_paused() or not outbox.pending_count():
+            return 0
+        source_names = {source["id"]: source["name"] for source in self.sources}
+        published = 0
+        drained = 0
+        with run_metrics.timed("outbox"):
+            while True:
+                batches = outbox.take(self.outbox_drain_batch)
+                taken = sum(len(seqs) for _, seqs, _ in batches.values())
+                for source_id, (source_name, seqs, news_list) in batches.items():
+                    source = {"id": source_id, "name": source_names.get(source_id, source_name)}
+                    write_started = time.monotonic()
+                    with get_db_manager().session():
+                        saved = self._save_news(source, news_list)
+                    if saved is None:
+                        outbox.mark_failed(seqs)
+                        self._pause_db_writes()
+                        logging.error(f"补写本地暂存区失败，剩余 {outbox.pending_count()} 条等待下次补写")
+                        return published
+                    if saved == SAVE_REJECTED:
+                        rejected = outbox.reject(seqs, "数据错误，补写数据库失败")
+                        run_metrics.incr("outbox_rejected", rejected)
+                        logging.error(f"source_id: {source_id} {rejected} 条暂存记录因数据错误无法补写，已移入隔离表")
+                        continue
+                    if not outbox.remove(seqs):
+                        return published
+                    get_local_cache().add_seen_ids(source_id, [item.id for item in news_list])
+                    drained += len(seqs)
+                    published += saved
+                    run_metrics.incr("outbox_drained", len(seqs))
+                    if time.monotonic() - write_started >= self.db_slow_write_seconds:
+                        self._pause_db_writes()
+                        logging.warning(f"补写本地暂存区过慢，剩余 {outbox.pending_count()} 条等待下次补写")
+                        return published
+                if taken < self.outbox_drain_batch:
+                    break
+        logging.info(f"本地暂存区补写完成：{drained} 条，新发布 {published} 条")
+        return published
+
+    def _save_news(self, source: Dict, news_list: List[NewsItem]) -> Optional[int]:
+        """
+        在当前数据库会话中写入新闻记录和推送记录
+
+        Args:
+            source: 新闻源配置，包含 id 和 name
+            news_list: 待插入的新闻列表
+
+        Returns:
+            int: 成功处理的新闻数量；
+            连接失败、超时等数据库暂时不可用的错误返回None，稍后可以重试；
+            唯一键冲突、数据超长、写入结果与预期不符等数据错误返回 SAVE_REJECTED
+        """
+        saved = self._insert_news(source, news_list)
+        if saved is None and not get_db_manager().last_error_retryable():
+            return SAVE_REJECTED
+        return saved
+
+    def _insert_news(self, source: Dict, news_list: List[NewsItem]) -> Optional[int]:
+        """
+        写入新闻记录和推送记录，返回成功处理的新闻数量，写入失败返回None
+        """
+        source_id = source["id"]
+        source_name = source["name"]
+
+        # 先在LSH索引中查找跨渠道的近似重复新闻，插入时直接写入所属的簇ID
+        cluster_ids, fingerprints = None, None
+        if self.clustering_enabled:
+            clusters = get_db_news_clusters().assign_clusters(news_list)
+            if clusters is None:
+                logging.warning(f"source_id: {source_id} 查找近似重复新闻失败，本次不归并")
+            else:
+                cluster_ids, fingerprints = clusters
+
+        # 新闻记录、LSH索引和推送记录在同一个事务中批量写入，整个数据源只提交一次
+        # 已存在的新闻由数据库唯一键拒绝，只为新插入的新闻创建推送记录
+        inserted = get_db_news_infos().batch_insert_news(source_id, news_list, commit=False, cluster_ids=cluster_ids)
+        if inserted is None:
+            logging.error(f"source_id: {source_id} 批量插入新闻数据失败")
+            return None
+        if not inserted:
+            return 0 if self._commit(source_id) else None
+
+        if fingerprints is not None:
+            # 自成一簇的新闻以自身ID作为簇ID写入索引
+            entries = [
+                (news_id, cluster_ids[index] or news_id, fingerprints[index])
+                for news_id, index in inserted if index is not None
+            ]
+            if not get_db_news_clusters().add_buckets(entries, commit=False):
+                logging.error(f"source_id: {source_id} 写入近似重复新闻索引失败")
+                return None
+            clustered = sum(1 for _, index in inserted if index is not None and cluster_ids[index])
+            if clustered:
+                logging.info(f"source_id: {source_id} 有 {clustered} 条新闻与已有新闻归为同一簇")
+
+        # 归入已有新闻簇的新闻已经由簇里的第一条新闻推送过，不再创建推送记录
+        push_news_ids = [
+            news_id for news_id, index in inserted
+            if cluster_ids is None or index is None or not cluster_ids[index]
+        ]
+        if push_news_ids:
+            push_ids = get_db_push_info_latest().batch_insert_news_pushes(source_id, source_name, push_news_ids, commit=False)
+            if not push_ids:
+                logging.error(f"source_id: {source_id} 批量插入推送信息失败")
+                return None
+        if not self._commit(source_id):
+            return None
+        # 统计成功插入的数量
+        success_count = len(inserted)
+
+        logging.info(f"source_id: {source_id}, 来源: {source_name} - 成功处理 {success_count} 条新闻，"
+                     f"新增 {len(push_news_ids)} 条推送记录")
+        return success_count
+
+    @staticmethod
+    def _commit(source_id: str) -> bool:
+        """
+        提交当前会话的事务，失败时记录错误供 last_error_retryable 判断
+        """
+        try:
+            get_db_manager().commit()
+            return True
+        except Exception as e:
+            get_db_manager().record_error(e)
+            logging.error(f"source_id: {source_id} 提交新闻数据失败: {e}")
+            return False
+
+# 第一次使用时才创建发布器实例，导入模块没有副作用
+@lazy_instance
+def get_news_publisher() -> NewsPublisher:
+    """
+    获取 NewsPublisher 实例，第一次调用时创建
+    """
+    return NewsPublisher()
+
+
+def __getattr__(name):
+    # 兼容 from main import news_publisher 的用法
+    if name == "news_publisher":
+        return get_news_publisher()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def cleanup_old_news():
+    """
+    清理超出保留数量的旧新闻记录，以及近似重复新闻索引中超出匹配时间窗口的桶记录
+    数据源可以在 news-source.json 中用 retention 字段单独配置保留数量
+    """
+    publisher = get_news_publisher()
+    source_limits = {
+        source["id"]: source["retention"]
+        for source in publisher.sources if source.get("retention")
+    }
+    with run_metrics.timed("cleanup"), get_db_manager().session():
+        cleanup_result = get_db_news_infos().cleanup_old_records(os.environ.get("max_news_infos_data"), source_limits)
+        if publisher.clustering_enabled:
+            bucket_report = get_db_retention().trim_lsh_buckets(get_db_news_clusters().window_hours)
+            if bucket_report and bucket_report["deleted"]:
+                logging.info(f"清理了 {bucket_report['deleted']} 条过期的近似重复新闻索引")
+    if cleanup_result > 0:
+        logging.info(f"清理了 {cleanup_result} 条旧新闻记录")
+
+
+def run_once():
+    """
+    单次执行：处理所有数据源后清理旧数据，供定时任务（GitHub Actions cron）调用
+    启用分片（SOURCE_SHARDING=1）时只处理本进程认领的数据源，处理期间在后台续约，结束后释放租约
+    """
+    logging.info(f"务执开始执行")
+    run_metrics.reset()
+    sharding = get_source_sharding()
+    publisher = get_news_publisher()
+    if sharding is None:
+        publisher.push_news()
+    else:
+        sharding.start()
+        try:
+            publisher.push_news([source for source in publisher.sources if source["id"] in sharding.owned])
+        finally:
+            sharding.release()
+    logging.info("任务执行完成")
+
+    # 在处理新闻之后，清理旧数据
+    cleanup_old_news()
+    publish_metrics()
+
+
+def publish_metrics():
+    """
+    导出本次运行的指标：写入 METRICS_TEXTFILE / METRICS_JSON 文件，
+    设置 METRICS_DB_ENABLED=1 时同时写入 publisher_runs 表
+    """
+    snapshot = run_metrics.snapshot()
+    totals = snapshot["totals"]
+    logging.info(
+        f"运行指标: 耗时 {snapshot['elapsedSeconds']:.2f}s，数据源 {totals['sources']} 个"
+        f"（失败 {totals['failedSources']}，留到下次 {totals['deferredSources']}），新增 {totals['newItems']} 条，"
+        f"数据库语句 {snapshot['counters'].get('db_statements', 0)} 条"
+    )
     try:
-        logging.info(f"务执开始执行")
-        news_publisher.push_news()
-        logging.info("任务执行完成")
+        export_metrics(snapshot)
+    except Exception as e:
+        logging.error(f"导出运行指标失败: {e}")
+    if os.environ.get("METRICS_DB_ENABLED") == "1":
+        with get_db_manager().session():
+            get_db_publisher_runs().insert_run(snapshot)
 
-        # 在处理新闻之前，先清理旧数据
-        cleanup_result = db_news_infos.cleanup_old_records(os.environ.get("max_news_infos_data"))
-        if cleanup_result > 0:
-            logging.info(f"清理了 {cleanup_result} 条旧新闻记录")
-    
 
+def run_batch(sources: List[Dict]) -> Dict[str, Dict]:
+    """
+    常驻模式下处理一批到期的数据源，每批单独统计并导出指标
+    启用分片时跳过本进程没有持有租约的数据源，处理期间失去租约而没有处理的数据源不计入运行统计
+    """
+    sharding = get_source_sharding()
+    if sharding is not None:
+        sources = [source for source in sources if sharding.owns(source["id"])]
+        if not sources:
+            return {}
+    run_metrics.reset()
+    results = get_news_publisher().push_news(sources)
+    publish_metrics()
+    return {source_id: result for source_id, result in results.items() if result["status"] != "deferred"}
 
+
+def run_daemon():
+    """
+    常驻模式：进程、HTTP会话和数据库连接池保持不变，
+    每个数据源从 interval 开始轮询，并根据新增数量和上游更新频率自适应调整间隔，
+    定期清理旧数据，收到 SIGINT/SIGTERM 后退出
+    启用分片时在后台线程中按心跳间隔续约、重新分配数据源，批次耗时不影响续约，退出时释放租约
+    """
+    scheduler = SourceScheduler(get_news_publisher().sources, run_batch)
+    sharding = get_source_sharding()
+    if sharding is not None:
+        sharding.start()
+    cleanup_interval = NewsPublisher._load_int_env("CLEANUP_INTERVAL_SECONDS", 3600)
+    scheduler.add_task("cleanup_old_news", cleanup_interval, cleanup_old_news)
+    # 定期把各数据源的运行统计写入日志
+    scheduler.add_task(
+        "log_source_stats", cleanup_interval,
+        lambda: logging.info(f"数据源运行统计: {json.dumps(scheduler.get_stats(), ensure_ascii=False)}")
+    )
+
+    def handle_signal(signum, frame):
+        logging.info(f"收到信号 {signum}，当前批次完成后退出")
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    try:
+        scheduler.run_forever()
+    finally:
+        if sharding is not None:
+            sharding.release()
+
+
+def order_scheduled_sources(sources: List[Dict], pending: List[str], last_run: Dict[str, float]) -> List[Dict]:
+    """
+    定时触发时数据源的处理顺序：
+    1. 上次因到达截止时间没有处理的数据源（续跑游标），保持上次的顺序
+    2. 其余数据源按 priority（默认0）从高到低，同优先级按最近一次处理时间从早到晚，从未处理过的最先
+
+    Args:
+        sources: 数据源配置列表
+        pending: 续跑游标中的数据源ID
+        last_run: 键为数据源ID，值为最近一次处理时间
+
+    Returns:
+        List[Dict]: 排序后的数据源配置列表
+    """
+    by_id = {source["id"]: source for source in sources}
+    resumed = [by_id[source_id] for source_id in dict.fromkeys(pending) if source_id in by_id]
+    resumed_ids = {source["id"] for source in resumed}
+    rest = sorted(
+        (source for source in sources if source["id"] not in resumed_ids),
+        key=lambda source: (-(source.get("priority") or 0), last_run.get(source["id"], 0.0))
+    )
+    return resumed + rest
+
+
+def run_scheduled(budget_seconds: int, reserve_seconds: int) -> Dict:
+    """
+    在 budget_seconds 秒的时间预算内执行一次定时任务：
+    按 order_scheduled_sources 的顺序并发处理数据源，预算剩余 reserve_seconds 秒时到达截止时间：
+    不再开始新的数据源，进行中的请求不超过截止时间，等进行中的数据源处理完成后，剩余时间留给裁剪推送记录和保存状态；
+    没有开始或请求被中断的数据源保存为续跑游标，下次触发时优先处理。
+    时间有剩余时清理旧数据，最后导出运行指标
+    启用分片（SOURCE_SHARDING=1）时只处理本进程认领的数据源，处理期间在后台续约，结束后释放租约
+
+    Returns:
+        Dict: 包含 processed（处理的数据源数量）、deferred（没有处理的数据源ID）、newCount、seconds
+    """
+    started = time.monotonic()
+    deadline = started + max(budget_seconds - reserve_seconds, 1)
+    run_metrics.reset()
+    publisher = get_news_publisher()
+    sources = publisher.sources
+    sharding = get_source_sharding()
+    if sharding is not None:
+        sharding.start()
+        sources = [source for source in sources if source["id"] in sharding.owned]
+
+    local_cache = get_local_cache()
+    if not local_cache.enabled:
+        logging.warning("未配置 LOCAL_CACHE_PATH，续跑游标和数据源处理时间不会保存")
+    pending, last_run = local_cache.get_scheduled_state()
+    ordered = order_scheduled_sources(sources, pending, last_run)
+    try:
+        results = publisher.push_news(ordered, deadline=deadline)
+    finally:
+        if sharding is not None:
+            sharding.release()
+
+    deferred = [source["id"] for source in ordered if results.get(source["id"], {}).get("status") == "deferred"]
+    deferred_ids = set(deferred)
+    processed = [source_id for source_id in results if source_id not in deferred_ids]
+    local_cache.save_scheduled_state(processed, deferred, time.time())
+
+    if time.monotonic() < deadline:
+        cleanup_old_news()
+    else:
+        logging.info("时间预算已用完，本次跳过旧数据清理")
+    publish_metrics()
+    return {
+        "processed": len(processed),
+        "deferred": deferred,
+        "newCount": sum(result["newCount"] for result in results.values()),
+        "seconds": time.monotonic() - started
+    }
+
+
+async def scheduled(event, env, ctx) -> Dict:
+    """
+    定时触发入口，由 cron 运行 python worker.py 调用，本地可用 test_worker.py 调用
+    依赖 pymysql、sqlite3 和线程池等阻塞IO，只能在普通的 Python 进程中运行，不能部署到 Cloudflare Python Workers
+    env 中的字符串变量先写入环境变量，本地缓存、数据库连接等都在第一次使用时才创建，因此 env 中的配置同样生效；
+    之后在线程中执行 run_scheduled，不阻塞事件循环
+    时间预算为 SCHEDULED_BUDGET_SECONDS（默认25）秒，最后 SCHEDULED_RESERVE_SECONDS（默认5）秒不再开始新的数据源
+
+    Args:
+        event: 触发事件，包含 time（触发时间）
+        env: 环境变量绑定
+        ctx: 执行上下文
+
+    Returns:
+        Dict: status 为 success 或 error，message 为执行结果说明
+    """
+    if isinstance(env, dict):
+        os.environ.update({key: value for key, value in env.items() if isinstance(value, str)})
+    budget_seconds = NewsPublisher._load_int_env("SCHEDULED_BUDGET_SECONDS", 25)
+    reserve_seconds = NewsPublisher._load_int_env("SCHEDULED_RESERVE_SECONDS", 5)
+    trigger_time = event.get("time") if isinstance(event, dict) else None
+    logging.info(f"定时任务触发，触发时间: {trigger_time}，时间预算: {budget_seconds}s")
+
+    try:
+        summary = await asyncio.to_thread(run_scheduled, budget_seconds, reserve_seconds)
+    except Exception as e:
+        logging.error("定时任务执行失败", exc_info=True)
+        return {"status": "error", "message": f"定时任务执行失败: {e}"}
+
+    message = (f"处理 {summary['processed']} 个数据源，新增 {summary['newCount']} 条，"
+               f"耗时 {summary['seconds']:.2f}s")
+    if summary["deferred"]:
+        message += f"；{len(summary['deferred'])} 个数据源留到下次处理: {', '.join(summary['deferred'])}"
+    return {"status": "success", "message": message}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="新闻推送服务")
+    parser.add_argument("--daemon", action="store_true", help="常驻进程，按数据源的 interval 持续轮询")
+    args = parser.parse_args()
+    # 配置日志系统，只在作为脚本运行时配置，导入模块没有副作用
+    setup_logger()
+    try:
+        if args.daemon:
+            run_daemon()
+        else:
+            run_once()
     except Exception as e:
         logging.error("任务执行失败", exc_info=True)
+    finally:
+        # 关闭本地缓存和暂存区，把WAL内容写回主文件后再由 actions/cache 保存
+        get_local_cache().close()
+        get_news_outbox().close()
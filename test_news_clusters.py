@@ -0,0 +1,115 @@
+import random
+
+import db.dbNewsClusters
+from api.newsItems import NewsItem
+from db.dbSqlite import SQLiteManager
+from utils.simhash import BAND_COUNT, bucket_keys, fingerprint
+
+
+def random_title(rng: random.Random) -> str:
+    return "".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(12, 24)))
+
+
+def make_clusters(tmp_path, monkeypatch, name: str, bucket_limit: int = 32):
+    manager = SQLiteManager(str(tmp_path / f"{name}.sqlite3"))
+    monkeypatch.setattr(db.dbNewsClusters, "get_db_manager", lambda: manager)
+    return manager, db.dbNewsClusters.dbNewsClusters(window_hours=48, bucket_limit=bucket_limit)
+
+
+def fill_window(manager, clusters, titles):
+    entries = [
+        (news_id, news_id, fingerprint(title, f"https://example.com/{news_id}"))
+        for news_id, title in enumerate(titles, start=1)
+    ]
+    with manager.session():
+        for start in range(0, len(entries), 500):
+            assert clusters.add_buckets(entries[start:start + 500])
+
+
+def candidate_counts(manager, clusters, titles):
+    counts = []
+    with manager.session():
+        for title in titles:
+            candidates = clusters._find_candidates(bucket_keys(*fingerprint(title, "https://example.com/probe")))
+            counts.append(sum(len(rows) for rows in candidates.values()))
+    return counts
+
+
+def test_candidates_stay_bounded_as_window_grows(tmp_path, monkeypatch):
+    """
+    时间窗口内的新闻增加8倍，每条新闻查到的候选数量仍然很少，并且不超过每个桶的上限
+    """
+    rng = random.Random(7)
+    probes = [random_title(rng) for _ in range(50)]
+    averages = []
+    for size in (500, 4000):
+        manager, clusters = make_clusters(tmp_path, monkeypatch, f"window{size}")
+        fill_window(manager, clusters, [random_title(rng) for _ in range(size)])
+        counts = candidate_counts(manager, clusters, probes)
+        assert max(counts) <= BAND_COUNT * clusters.bucket_limit
+        averages.append(sum(counts) / len(counts))
+        manager.close()
+    # 8位的段每条新闻约读取 窗口/32 条候选（4000条时约125条），16位的段只有个位数
+    assert averages[-1] < 5
+
+
+def test_crowded_bucket_is_capped(tmp_path, monkeypatch):
+    """
+    同一个标题反复出现时，每个桶只返回最新的 bucket_limit 条候选，仍然能匹配到新闻簇
+    """
+    manager, clusters = make_clusters(tmp_path, monkeypatch, "crowded", bucket_limit=8)
+    title = "国务院常务会议部署稳就业政策措施"
+    fill_window(manager, clusters, [title] * 100)
+    counts = candidate_counts(manager, clusters, [title])
+    assert counts[0] == BAND_COUNT * 8
+
+    with manager.session():
+        cluster_ids, _ = clusters.assign_clusters([NewsItem("probe", "国务院常务会议部署稳定就业政策措施", "https://example.com/p")])
+    assert cluster_ids[0] is not None
+    manager.close()
+
+
+def test_cross_source_duplicate_gets_no_push_row(tmp_path, monkeypatch):
+    """
+    另一个渠道的近似重复新闻写入 news_infos 并归入已有的簇，但不再创建第二条推送记录
+    """
+    import db.dbNewsInfos
+    import db.dbPushInfoLatest
+    import main
+
+    manager, clusters = make_clusters(tmp_path, monkeypatch, "duplicate")
+    monkeypatch.setattr(db.dbNewsInfos, "get_db_manager", lambda: manager)
+    monkeypatch.setattr(db.dbPushInfoLatest, "get_db_manager", lambda: manager)
+    news_infos = db.dbNewsInfos.dbNewsInfos()
+    push_info = db.dbPushInfoLatest.dbPushInfoLatest()
+    monkeypatch.setattr(main, "get_db_manager", lambda: manager)
+    monkeypatch.setattr(main, "get_db_news_infos", lambda: news_infos)
+    monkeypatch.setattr(main, "get_db_push_info_latest", lambda: push_info)
+    monkeypatch.setattr(main, "get_db_news_clusters", lambda: clusters)
+    publisher = main.NewsPublisher(sources=[])
+    publisher.clustering_enabled = True
+
+    with manager.session():
+        assert publisher._save_news({"id": "first", "name": "渠道1"}, [
+            NewsItem("a-1", "国务院常务会议部署稳就业政策措施", "https://a.example.com/1")
+        ]) == 1
+        assert publisher._save_news({"id": "second", "name": "渠道2"}, [
+            NewsItem("b-1", "国务院常务会议部署稳定就业政策措施", "https://b.example.com/1"),
+            NewsItem("b-2", "新能源汽车下乡活动在多地启动", "https://b.example.com/2")
+        ]) == 2
+
+        manager.execute("SELECT orig_Id, clusterId FROM news_infos ORDER BY id")
+        news_rows = manager.fetchall()
+        manager.execute("SELECT sourceId, newsInfoRef FROM pushinfo_latest ORDER BY id")
+        push_rows = manager.fetchall()
+
+    assert len(news_rows) == 3
+    assert news_rows[1][1] is not None
+    assert [row[0] for row in push_rows] == ["first", "second"]
+    manager.close()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
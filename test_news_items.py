@@ -0,0 +1,79 @@
+import json
+
+from api.newsItems import decode_payload, decode_stream
+
+PAYLOAD = {
+    "status": "success",
+    "id": "zhihu",
+    "updatedTime": 1744359578095,
+    "items": [
+        {"id": 1, "title": "标题 \"引号\" ]}", "url": "https://example.com/1",
+         "extra": {"icon": "x]}\"\\", "info": [1.5e-3, {"a": "}"}], "hover": True}},
+        {"id": "2", "title": "缺少链接", "extra": None},
+        {"id": "3", "title": "链接不是字符串", "url": 3},
+        {"title": "缺少ID", "url": "https://example.com/4"},
+        {"id": "x" * 60, "title": "ID超长", "url": "https://example.com/5"},
+        "不是对象",
+        {"extra": [], "id": "6", "title": "最后一条", "url": "https://example.com/6"}
+    ],
+    "message": "ok",
+    "ratio": 1.5e3
+}
+
+
+def split(content: bytes, size: int):
+    return [content[start:start + size] for start in range(0, len(content), size)]
+
+
+def test_decode_stream_any_chunk_size():
+    """
+    任意大小的分块（包括在多字节字符、转义字符和数字中间切开）解码结果都相同
+    """
+    for indent in (None, 2):
+        content = json.dumps(PAYLOAD, ensure_ascii=False, indent=indent).encode("utf-8")
+        for size in range(1, 64):
+            payload = decode_stream(split(content, size))
+            assert [(item.id, item.title, item.url) for item in payload["items"]] == [
+                ("1", "标题 \"引号\" ]}", "https://example.com/1"),
+                ("6", "最后一条", "https://example.com/6")
+            ]
+            assert payload["ratio"] == 1500.0
+            assert payload["message"] == "ok"
+            assert payload["droppedItems"] == 5
+            assert payload["droppedReasons"] == {"missingUrl": 2, "missingId": 2, "tooLong": 1}
+
+
+def test_skip_items_stops_before_items():
+    """
+    skip_items 返回True时不再读取 items 之后的数据
+    """
+    chunks = split(json.dumps(PAYLOAD).encode("utf-8"), 16)
+    consumed = []
+
+    def read():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    payload = decode_stream(read(), skip_items=lambda top: top.get("updatedTime") == PAYLOAD["updatedTime"])
+    assert payload == {"status": "success", "id": "zhihu", "updatedTime": PAYLOAD["updatedTime"]}
+    assert len(consumed) < len(chunks)
+
+
+def test_truncated_payload_is_rejected():
+    """
+    响应不完整时报错，不返回部分数据
+    """
+    content = json.dumps(PAYLOAD).encode("utf-8")
+    for end in (len(content) // 2, len(content) - 1):
+        try:
+            decode_payload(content[:end])
+        except ValueError:
+            continue
+        raise AssertionError(f"截断在 {end} 处的响应没有报错")
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
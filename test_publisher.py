@@ -0,0 +1,159 @@
+import main
+from api.newsApi import STATUS_NOT_MODIFIED
+
+
+class RecordingApi:
+    """
+    记录请求过的新闻源，所有新闻源都返回数据未变化
+    """
+    def __init__(self):
+        self.requested = []
+
+    def fetch_news_by_id(self, source_id, deadline=None):
+        self.requested.append(source_id)
+        return {"status": STATUS_NOT_MODIFIED, "id": source_id}
+
+    def mark_processed(self, source_id):
+        pass
+
+
+def test_custom_sources_are_respected(monkeypatch):
+    """
+    传入 sources 时只处理这些数据源，不加载 news-source.json
+    """
+    sources = [{"id": "fake01", "name": "假数据源1"}, {"id": "fake02", "name": "假数据源2", "keep_count": 5}]
+    api = RecordingApi()
+    monkeypatch.setattr(main, "get_news_api", lambda: api)
+
+    publisher = main.NewsPublisher(fetch_concurrency=2, sources=sources)
+    monkeypatch.setattr(publisher, "_load_recent_orig_ids", lambda source_ids: {})
+    monkeypatch.setattr(publisher, "drain_outbox", lambda: 0)
+    results = publisher.push_news()
+
+    assert [source["id"] for source in publisher.sources] == ["fake01", "fake02"]
+    assert publisher.push_keep_counts == {"fake02": 5}
+    assert sorted(api.requested) == ["fake01", "fake02"]
+    assert sorted(results) == ["fake01", "fake02"]
+
+
+def make_sqlite_publisher(tmp_path, monkeypatch):
+    """
+    使用临时 SQLite 数据库和本地暂存区的发布器，不归并近似重复新闻
+    """
+    import db.dbNewsInfos
+    import db.dbPushInfoLatest
+    from db.dbSqlite import SQLiteManager
+    from utils.local_cache import LocalCache
+    from utils.outbox import NewsOutbox
+
+    manager = SQLiteManager(str(tmp_path / "news_publisher.sqlite3"))
+    monkeypatch.setattr(db.dbNewsInfos, "get_db_manager", lambda: manager)
+    monkeypatch.setattr(db.dbPushInfoLatest, "get_db_manager", lambda: manager)
+    news_infos = db.dbNewsInfos.dbNewsInfos()
+    push_info = db.dbPushInfoLatest.dbPushInfoLatest()
+    outbox = NewsOutbox(str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setattr(main, "get_db_manager", lambda: manager)
+    monkeypatch.setattr(main, "get_db_news_infos", lambda: news_infos)
+    monkeypatch.setattr(main, "get_db_push_info_latest", lambda: push_info)
+    monkeypatch.setattr(main, "get_news_outbox", lambda: outbox)
+    monkeypatch.setattr(main, "get_local_cache", lambda: LocalCache())
+    publisher = main.NewsPublisher(sources=[{"id": "fake01", "name": "假数据源1"}])
+    publisher.clustering_enabled = False
+    return publisher, manager, news_infos, outbox
+
+
+def test_outbox_data_error_is_quarantined(tmp_path, monkeypatch):
+    """
+    补写时回查新插入的ID与影响行数不符属于数据错误：记录直接移入隔离表，不计失败次数，也不暂停写入
+    """
+    from api.newsItems import NewsItem
+
+    publisher, manager, news_infos, outbox = make_sqlite_publisher(tmp_path, monkeypatch)
+    with manager.session():
+        assert publisher._save_news({"id": "fake01", "name": "假数据源1"}, [NewsItem("a-1", "标题1", "https://example.com/1")]) == 1
+    outbox.add("fake01", "假数据源1", [NewsItem("a-1", "标题1", "https://example.com/1"),
+                                     NewsItem("a-2", "标题2", "https://example.com/2")])
+    monkeypatch.setattr(news_infos, "_select_inserted_ids", lambda *args: [])
+
+    assert publisher.drain_outbox() == 0
+    assert outbox.pending_count() == 0
+    assert not publisher._db_writes_paused()
+    rejected = outbox._connection(create=False).execute("SELECT orig_Id FROM news_outbox_rejected ORDER BY orig_Id").fetchall()
+    assert [row[0] for row in rejected] == ["a-1", "a-2"]
+    outbox.close()
+    manager.close()
+
+
+def test_outbox_connection_error_is_retried(tmp_path, monkeypatch):
+    """
+    连接失败时记录留在暂存区等待下次补写，并暂停写入数据库
+    """
+    from api.newsItems import NewsItem
+
+    publisher, manager, _, outbox = make_sqlite_publisher(tmp_path, monkeypatch)
+    outbox.add("fake01", "假数据源1", [NewsItem("a-1", "标题1", "https://example.com/1")])
+    monkeypatch.setattr(manager, "connect", lambda: False)
+
+    assert publisher.drain_outbox() == 0
+    assert outbox.pending_count() == 1
+    assert publisher._db_writes_paused()
+    attempts = outbox._connection(create=False).execute("SELECT attempts FROM news_outbox").fetchone()[0]
+    assert attempts == 1
+    outbox.close()
+    manager.close()
+
+
+def test_slow_write_pauses_db_writes(tmp_path, monkeypatch):
+    """
+    写入成功但耗时超过 DB_SLOW_WRITE_SECONDS 时暂停写入，之后的数据源直接写入暂存区
+    """
+    from api.newsItems import NewsItem
+
+    publisher, manager, _, outbox = make_sqlite_publisher(tmp_path, monkeypatch)
+    monkeypatch.setattr(main, "get_news_api", lambda: RecordingApi())
+    publisher.db_slow_write_seconds = 0
+    source = {"id": "fake01", "name": "假数据源1"}
+
+    first = {"status": "success", "items": [NewsItem("a-1", "标题1", "https://example.com/1")]}
+    assert publisher.process_source(source, first) == 1
+    assert publisher._db_writes_paused()
+    second = {"status": "success", "items": [NewsItem("a-2", "标题2", "https://example.com/2")]}
+    assert publisher.process_source(source, second) == 0
+    assert outbox.pending_count() == 1
+    outbox.close()
+    manager.close()
+
+
+def test_orig_ids_compared_case_insensitively(tmp_path, monkeypatch):
+    """
+    与 uk_source_orig 一样不区分大小写：只有大小写不同的orig_Id视为已存在，本地缓存按比较键保存
+    """
+    from api.newsItems import NewsItem
+    from utils.local_cache import LocalCache
+
+    publisher, manager, _, outbox = make_sqlite_publisher(tmp_path, monkeypatch)
+    cache = LocalCache(str(tmp_path / "local_cache.sqlite3"))
+    monkeypatch.setattr(main, "get_local_cache", lambda: cache)
+    monkeypatch.setattr(main, "get_news_api", lambda: RecordingApi())
+    source = {"id": "fake01", "name": "假数据源1"}
+
+    api_data = {"status": "success", "items": [
+        NewsItem("ABC-1", "标题1", "https://example.com/1"),
+        NewsItem("Abc-2", "标题2", "https://example.com/2"),
+        NewsItem("abc-2", "标题2", "https://example.com/2")
+    ]}
+    assert publisher.process_source(source, api_data, frozenset({"abc-1"})) == 1
+    cache.sync_seen_ids({"fake02": ["XYZ-1"]})
+    assert cache.get_seen_ids(["fake01", "fake02"], 60) == {"fake02": frozenset({"xyz-1"})}
+    assert cache._conn.execute("SELECT orig_Id FROM seen_ids WHERE sourceId = 'fake01' ORDER BY orig_Id").fetchall() == [
+        ("abc-1",), ("abc-2",)
+    ]
+    cache.close()
+    outbox.close()
+    manager.close()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,45 @@
+import db.dbNewsInfos
+import db.dbRetention
+from api.newsItems import NewsItem
+from db.dbSqlite import SQLiteManager
+
+
+def test_source_watermark_with_tied_timestamps(tmp_path, monkeypatch):
+    """
+    同一批插入的记录 createDateTime 相同，按渠道清理后恰好保留主键最大的 keep_count 条
+    """
+    manager = SQLiteManager(str(tmp_path / "news_publisher.sqlite3"))
+    monkeypatch.setattr(db.dbNewsInfos, "get_db_manager", lambda: manager)
+    monkeypatch.setattr(db.dbRetention, "get_db_manager", lambda: manager)
+    news_infos = db.dbNewsInfos.dbNewsInfos()
+    retention = db.dbRetention.dbRetention(chunk_size=2, pause_seconds=0)
+
+    with manager.session():
+        for batch in range(2):
+            inserted = news_infos.batch_insert_news(
+                "tied", [NewsItem(f"{batch}-{index}", f"标题 {batch}-{index}", "https://example.com")
+                         for index in range(10)]
+            )
+            assert len(inserted) == 10
+        # 另一个渠道的记录不受影响
+        assert len(news_infos.batch_insert_news("other", [NewsItem("o-1", "标题", "https://example.com")])) == 1
+
+        manager.execute("SELECT id FROM news_infos WHERE sourceId = %s ORDER BY id DESC", ("tied",))
+        expected = [row[0] for row in manager.fetchall()][:13]
+        report = retention.trim_news_infos(100, {"tied": 13})
+
+        manager.execute("SELECT id FROM news_infos WHERE sourceId = %s ORDER BY id DESC", ("tied",))
+        kept = [row[0] for row in manager.fetchall()]
+        manager.execute("SELECT COUNT(*) FROM news_infos WHERE sourceId = %s", ("other",))
+        other_count = manager.fetchone()[0]
+
+    assert report["deleted"] == 7
+    assert kept == expected
+    assert other_count == 1
+    manager.close()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,155 @@
+import json
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import requests
+
+from api.fetchPolicy import FetchPolicy
+
+PROJECT_DIR = Path(__file__).parent
+
+# 在新进程中执行 scheduled：环境变量只通过 env 参数传入，模拟每次请求都很慢的新闻源
+SCHEDULED_SCRIPT = textwrap.dedent("""
+    import asyncio, json, sys, time
+    import requests
+    import main
+    from api.fetchPolicy import FetchPolicy
+    from api.newsApi import STATUS_DEADLINE_EXCEEDED
+
+    class SlowApi:
+        policy = FetchPolicy(connect_timeout=5, read_timeout=15, max_retries=2, backoff_base=0.1)
+
+        def fetch_news_by_id(self, source_id, deadline=None):
+            def send(timeout):
+                time.sleep(min(timeout[1], 12))
+                raise requests.exceptions.Timeout("read timeout")
+            self.policy.request(source_id, send, deadline)
+            return {"status": STATUS_DEADLINE_EXCEEDED, "id": source_id}
+
+    main.get_news_api = lambda: SlowApi()
+    env = json.loads(sys.argv[1])
+    started = time.monotonic()
+    result = asyncio.run(main.scheduled({"time": "2025-04-14T13:23:38Z"}, env, {}))
+    print(json.dumps({"result": result, "seconds": time.monotonic() - started,
+                      "sources": [source["id"] for source in main.get_news_publisher().sources]}))
+""")
+
+
+def run_scheduled(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-c", SCHEDULED_SCRIPT, json.dumps(env)],
+        cwd=PROJECT_DIR, capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_fetch_policy_stops_at_deadline():
+    """
+    每次请求都超时时，超时和重试不超过截止时间
+    """
+    policy = FetchPolicy(connect_timeout=5, read_timeout=15, max_retries=2, backoff_base=0.1)
+    timeouts = []
+
+    def send(timeout):
+        timeouts.append(timeout)
+        time.sleep(min(timeout[1], 12))
+        raise requests.exceptions.Timeout("read timeout")
+
+    started = time.monotonic()
+    assert policy.request("slow", send, deadline=started + 1) is None
+    assert time.monotonic() - started < 1.5
+    assert all(read_timeout <= 1 for _, read_timeout in timeouts)
+
+
+def test_in_flight_sources_finish_before_push_news_returns(monkeypatch):
+    """
+    截止时间前开始的数据源等处理完成后才返回，不记为 deferred；截止时间后没有开始的才是 deferred
+    """
+    import threading
+
+    import main
+    from api.newsApi import STATUS_NOT_MODIFIED
+
+    finished = []
+
+    class LateApi:
+        def fetch_news_by_id(self, source_id, deadline=None):
+            time.sleep(1)
+            finished.append(source_id)
+            return {"status": STATUS_NOT_MODIFIED, "id": source_id}
+
+    monkeypatch.setattr(main, "get_news_api", lambda: LateApi())
+    publisher = main.NewsPublisher(fetch_concurrency=1, sources=[
+        {"id": "first", "name": "先开始"}, {"id": "second", "name": "没开始"}
+    ])
+    monkeypatch.setattr(publisher, "_load_recent_orig_ids", lambda source_ids: {})
+    monkeypatch.setattr(publisher, "drain_outbox", lambda: 0)
+    results = publisher.push_news(deadline=time.monotonic() + 0.5)
+
+    assert finished == ["first"]
+    assert results["first"]["status"] == STATUS_NOT_MODIFIED
+    assert results["second"]["status"] == "deferred"
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith("news-source")]
+
+
+def test_deferred_sources_are_not_up():
+    """
+    deferred 的新闻源 source_up 为0，单独计入 source_deferred 和 run_deferred_sources，不计为失败
+    """
+    from utils.metrics import RunMetrics, to_prometheus
+
+    metrics = RunMetrics()
+    metrics.record_source("ok", status="success")
+    metrics.record_source("same", status="not_modified")
+    metrics.record_source("late", status="deferred")
+    metrics.record_source("broken", status="failed")
+    snapshot = metrics.snapshot()
+    lines = set(to_prometheus(snapshot).splitlines())
+
+    assert snapshot["totals"]["failedSources"] == 1
+    assert snapshot["totals"]["deferredSources"] == 1
+    for source, up, deferred in (("ok", 1, 0), ("same", 1, 0), ("late", 0, 1), ("broken", 0, 0)):
+        assert f'news_publisher_source_up{{source="{source}"}} {up}' in lines
+        assert f'news_publisher_source_deferred{{source="{source}"}} {deferred}' in lines
+    assert "news_publisher_run_deferred_sources 1" in lines
+
+
+def test_scheduled_within_budget_and_cursor_from_env(tmp_path):
+    """
+    LOCAL_CACHE_PATH 只通过 env 传入时也能保存续跑游标，新闻源很慢时不超出时间预算
+    """
+    from utils.local_cache import LocalCache
+
+    cache_path = tmp_path / "local_cache.sqlite3"
+    env = {
+        "DB_BACKEND": "sqlite",
+        "SQLITE_PATH": str(tmp_path / "news_publisher.sqlite3"),
+        "OUTBOX_PATH": str(tmp_path / "outbox.sqlite3"),
+        "LOCAL_CACHE_PATH": str(cache_path),
+        "SCHEDULED_BUDGET_SECONDS": "6",
+        "SCHEDULED_RESERVE_SECONDS": "2"
+    }
+    output = run_scheduled(env)
+
+    assert output["result"]["status"] == "success"
+    assert output["seconds"] < 6
+    assert cache_path.exists()
+    cache = LocalCache(str(cache_path))
+    try:
+        pending, last_run = cache.get_scheduled_state()
+    finally:
+        cache.close()
+    assert sorted(pending) == sorted(output["sources"])
+    assert not last_run
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_fetch_policy_stops_at_deadline()
+    test_scheduled_within_budget_and_cursor_from_env(Path(tempfile.mkdtemp()))
+    print("测试成功！")
@@ -0,0 +1,36 @@
+from utils.scheduler import AdaptivePolicy, SourceStats
+
+
+def next_interval(policy: AdaptivePolicy, stats: SourceStats, result: dict) -> float:
+    stats.record(result)
+    stats.interval = policy.next_interval({"id": stats.source_id}, stats, 600)
+    return stats.interval
+
+
+def test_slow_source_backs_off_instead_of_tightening():
+    """
+    新数据很多但获取很慢的新闻源不收紧轮询间隔，获取快的新闻源照常收紧
+    """
+    policy = AdaptivePolicy(min_interval=60, max_interval=7200, slow_fetch_seconds=10)
+    fast, slow = SourceStats("fast", 600), SourceStats("slow", 600)
+
+    assert next_interval(policy, fast, {"status": "success", "newCount": 20, "fetchSeconds": 0.5}) == 300
+    assert next_interval(policy, slow, {"status": "success", "newCount": 20, "fetchSeconds": 12}) == 900
+
+
+def test_timing_out_source_backs_off():
+    """
+    普通的失败不调整间隔（由熔断器负责），持续超时的失败按退避系数拉长间隔
+    """
+    policy = AdaptivePolicy(min_interval=60, max_interval=7200, slow_fetch_seconds=10)
+    failing, timing_out = SourceStats("failing", 600), SourceStats("timing_out", 600)
+
+    assert next_interval(policy, failing, {"status": "failed", "newCount": 0, "fetchSeconds": 0.2}) == 600
+    assert next_interval(policy, timing_out, {"status": "failed", "newCount": 0, "fetchSeconds": 30}) == 900
+    assert next_interval(policy, timing_out, {"status": "failed", "newCount": 0, "fetchSeconds": 30}) == 1350
+
+
+if __name__ == "__main__":
+    import pytest
+
+    raise SystemExit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# brotli 为可选依赖，未安装时只生成 gzip 预压缩文件
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 快照格式版本，格式变化时递增，文件写入对应版本的目录
+SNAPSHOT_VERSION = 1
+
+
+class FeedSnapshotWriter:
+    """
+    把 pushinfo_latest 关联 news_infos 后的数据写成静态JSON快照，网站直接读取静态文件
+    目录结构（以 SNAPSHOT_DIR 为根目录）：
+        v1/sources/<sourceId>.json[.gz|.br]  每个渠道一个文件
+        v1/feed.json[.gz|.br]                所有渠道合并的feed，近似重复新闻簇只保留最早的一条
+        v1/manifest.json                     每个文件的内容摘要（可作为ETag）、大小和更新时间
+
+    内容摘要只根据数据计算，与生成时间无关；摘要未变化的文件不会重写，
+    所有文件先写入临时文件再原子替换，读取方不会读到写了一半的文件
+    """
+    def __init__(self, root: str):
+        self.root = Path(root) / f"v{SNAPSHOT_VERSION}"
+        self.manifest_path = self.root / "manifest.json"
+
+    def write(self, rows: List[tuple]) -> int:
+        """
+        根据查询结果写入快照
+
+        Args:
+            rows: dbPushInfoLatest.get_feed_rows 的查询结果
+
+        Returns:
+            int: 重写的快照数量（不含预压缩文件和manifest）
+        """
+        manifest = self._load_manifest()
+        files = manifest.setdefault("files", {})
+        groups: Dict[str, Dict] = {}
+        for _id, source_id, source_name, news_info_id, create_time, title, url, cluster_id in rows:
+            group = groups.setdefault(source_id, {"sourceId": source_id, "sourceName": source_name, "items": []})
+            group["items"].append({
+                "id": int(news_info_id),
+                "title": title,
+                "url": url,
+                "createDateTime": create_time.strftime("%Y-%m-%d %H:%M:%S") if create_time else None,
+                "clusterId": cluster_id
+            })
+
+        snapshots = {f"sources/{source_id}.json": group for source_id, group in groups.items()}
+        snapshots["feed.json"] = {"sources": self._collapse_clusters(groups)}
+
+        written = 0
+        for name, data in snapshots.items():
+            content_hash = self._hash(data)
+            if files.get(name, {}).get("etag") == content_hash:
+                continue
+            body = json.dumps(
+                {"version": SNAPSHOT_VERSION, "etag": content_hash, "generatedAt": int(time.time()), **data},
+                ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+            self._write_variants(name, body)
+            files[name] = {"etag": content_hash, "bytes": len(body), "updatedAt": int(time.time())}
+            written += 1
+
+        # 已经没有推送记录的渠道，删除其快照
+        for name in [name for name in files if name not in snapshots]:
+            for suffix in ("", ".gz", ".br"):
+                (self.root / (name + suffix)).unlink(missing_ok=True)
+            del files[name]
+            written += 1
+
+        if written:
+            manifest["version"] = SNAPSHOT_VERSION
+            self._atomic_write(self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        return written
+
+    @staticmethod
+    def _collapse_clusters(groups: Dict[str, Dict]) -> List[Dict]:
+        """
+        合并feed中的近似重复新闻：每个簇只保留最早插入的一条，
+        同簇其他渠道的新闻记入该条的 alsoIn，不再单独出现；没有剩余新闻的渠道不出现在feed中
+
+        Args:
+            groups: 键为渠道ID，值为该渠道的快照数据
+
+        Returns:
+            List[Dict]: 按渠道ID排序的feed数据
+        """
+        members: Dict[int, List] = {}
+        for group in groups.values():
+            for item in group["items"]:
+                members.setdefault(item["clusterId"], []).append((group, item))
+
+        # 键为保留的新闻ID，值为同簇其他渠道的新闻
+        kept: Dict[int, List[Dict]] = {}
+        for entries in members.values():
+            entries.sort(key=lambda entry: entry[1]["id"])
+            kept[entries[0][1]["id"]] = [
+                {"sourceId": group["sourceId"], "sourceName": group["sourceName"], "url": item["url"]}
+                for group, item in entries[1:]
+            ]
+
+        feed = []
+        for source_id in sorted(groups):
+            group = groups[source_id]
+            items = []
+            for item in group["items"]:
+                if item["id"] not in kept:
+                    continue
+                also_in = kept[item["id"]]
+                items.append({**item, "alsoIn": also_in} if also_in else item)
+            if items:
+                feed.append({**group, "items": items})
+        return feed
+
+    @staticmethod
+    def _hash(data: Dict) -> str:
+        """
+        计算数据的内容摘要，作为ETag使用
+        """
+        canonical = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def _write_variants(self, name: str, body: bytes):
+        """
+        写入原始文件以及 gzip / brotli 预压缩文件
+        """
+        path = self.root / name
+        self._atomic_write(path, body)
+        # mtime=0 使相同内容的压缩结果保持一致
+        self._atomic_write(path.with_name(path.name + ".gz"), gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self._atomic_write(path.with_name(path.name + ".br"), brotli.compress(body))
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes):
+        """
+        先写入同目录下的临时文件，再原子替换目标文件
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _load_manifest(self) -> Dict:
+        """
+        读取上次写入的manifest，不存在或损坏时返回空manifest
+        """
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == SNAPSHOT_VERSION:
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"读取快照manifest失败，将重新生成全部快照: {e}")
+        return {"version": SNAPSHOT_VERSION, "files": {}}
+
+
+def create_snapshot_writer() -> Optional[FeedSnapshotWriter]:
+    """
+    根据环境变量 SNAPSHOT_DIR 创建快照写入器，未配置时返回None
+    """
+    root = os.environ.get("SNAPSHOT_DIR")
+    return FeedSnapshotWriter(root) if root else None
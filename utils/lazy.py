@@ -0,0 +1,29 @@
+import functools
+import threading
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def lazy_instance(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    把创建实例的函数包装为访问器：第一次调用时创建实例，之后都返回同一个实例
+    多线程同时第一次调用时只创建一次
+
+    使用示例：
+        @lazy_instance
+        def get_news_api() -> NewsApi:
+            return NewsApi()
+    """
+    lock = threading.Lock()
+    instances = []
+
+    @functools.wraps(factory)
+    def get_instance() -> T:
+        if not instances:
+            with lock:
+                if not instances:
+                    instances.append(factory())
+        return instances[0]
+
+    return get_instance
@@ -0,0 +1,368 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from api.newsItems import orig_id_key
+from utils.lazy import lazy_instance
+
+
+class LocalCache:
+    """
+    本地持久化缓存，使用一个SQLite文件保存跨次运行需要保留的状态
+    在GitHub Actions中通过 actions/cache 在两次运行之间恢复
+
+    seen_ids: 每个渠道已处理过的orig_Id，用于在不读数据库的情况下去重，
+              数据库仍然是唯一可信来源，缓存过期或未命中时重新从数据库同步；
+              orig_Id 按 orig_id_key 转换后保存，与数据库唯一键一样不区分ASCII字母的大小写
+    http_validators: 每个渠道最近一次成功处理的响应的 ETag/Last-Modified、
+              内容摘要和 updatedTime，用于条件请求和跳过未变化的数据
+    circuit_breakers: 每个渠道的连续失败次数和熔断截止时间
+    scheduled_sources: 定时触发入口（scheduled）中每个渠道最近一次处理的时间，
+              以及上次因到达截止时间没有处理的渠道（续跑游标，按 pendingSeq 顺序）
+
+    未配置路径时缓存处于关闭状态，所有读取方法返回空结果，写入方法不做任何操作
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        if path:
+            self._open()
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def _open(self):
+        """
+        打开SQLite文件并创建所需的表
+        """
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS seen_ids (
+                    sourceId TEXT NOT NULL,
+                    orig_Id TEXT NOT NULL,
+                    seenAt REAL NOT NULL,
+                    PRIMARY KEY (sourceId, orig_Id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS idx_seen_source_time ON seen_ids (sourceId, seenAt);
+                CREATE TABLE IF NOT EXISTS seen_sync (
+                    sourceId TEXT PRIMARY KEY,
+                    syncedAt REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    sourceId TEXT PRIMARY KEY,
+                    etag TEXT,
+                    lastModified TEXT,
+                    contentHash TEXT,
+                    updatedTime INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS circuit_breakers (
+                    sourceId TEXT PRIMARY KEY,
+                    failures INTEGER NOT NULL,
+                    openedUntil REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS scheduled_sources (
+                    sourceId TEXT PRIMARY KEY,
+                    lastRunAt REAL,
+                    pendingSeq INTEGER
+                );
+            """)
+            logging.info(f"本地缓存已打开: {self.path}")
+        except Exception as e:
+            logging.error(f"打开本地缓存 {self.path} 失败，本次运行不使用缓存: {e}")
+            self._conn = None
+
+    def get_seen_ids(self, source_ids: List[str], ttl_seconds: float) -> Dict[str, FrozenSet[str]]:
+        """
+        获取最近一次与数据库同步未超过 ttl_seconds 的渠道的orig_Id集合
+
+        Args:
+            source_ids: 渠道ID列表
+            ttl_seconds: 缓存有效期（秒），超过后需要重新从数据库同步
+
+        Returns:
+            Dict[str, FrozenSet[str]]: 键为缓存有效的渠道ID，值为orig_Id比较键（orig_id_key）集合；
+            缓存过期或从未同步的渠道不包含在内
+        """
+        if not self.enabled or not source_ids:
+            return {}
+        deadline = time.time() - ttl_seconds
+        placeholders = ", ".join(["?"] * len(source_ids))
+        try:
+            with self._lock:
+                fresh = [
+                    row[0] for row in self._conn.execute(
+                        f"SELECT sourceId FROM seen_sync WHERE syncedAt >= ? AND sourceId IN ({placeholders})",
+                        [deadline, *source_ids]
+                    )
+                ]
+                seen = {source_id: set() for source_id in fresh}
+                if fresh:
+                    fresh_placeholders = ", ".join(["?"] * len(fresh))
+                    for source_id, orig_id in self._conn.execute(
+                        f"SELECT sourceId, orig_Id FROM seen_ids WHERE sourceId IN ({fresh_placeholders})",
+                        fresh
+                    ):
+                        # 旧版本写入的记录没有转换，读取时再转换一次
+                        seen[source_id].add(orig_id_key(orig_id))
+            return {source_id: frozenset(ids) for source_id, ids in seen.items()}
+        except Exception as e:
+            logging.error(f"读取本地缓存失败: {e}")
+            return {}
+
+    def sync_seen_ids(self, seen: Dict[str, Iterable[str]]):
+        """
+        写入从数据库读取的orig_Id集合，并把这些渠道标记为刚刚同步
+
+        Args:
+            seen: 键为渠道ID，值为orig_Id集合
+        """
+        if not self.enabled or not seen:
+            return
+        now = time.time()
+
+        def work(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO seen_ids (sourceId, orig_Id, seenAt) VALUES (?, ?, ?)",
+                [(source_id, orig_id_key(orig_id), now) for source_id, ids in seen.items() for orig_id in ids]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO seen_sync (sourceId, syncedAt) VALUES (?, ?)",
+                [(source_id, now) for source_id in seen]
+            )
+
+        self._write("写入本地缓存", work)
+
+    def add_seen_ids(self, source_id: str, orig_ids: Iterable[str]):
+        """
+        记录已写入数据库（或数据库中已存在）的orig_Id，已有记录刷新最近出现时间
+
+        Args:
+            source_id: 渠道ID
+            orig_ids: orig_Id列表
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        self._write("写入本地缓存", lambda conn: conn.executemany(
+            "INSERT OR REPLACE INTO seen_ids (sourceId, orig_Id, seenAt) VALUES (?, ?, ?)",
+            [(source_id, orig_id_key(orig_id), now) for orig_id in orig_ids]
+        ))
+
+    def evict_seen_ids(self, max_per_source: int, max_age_seconds: float) -> int:
+        """
+        淘汰缓存：删除超过 max_age_seconds 未出现的记录，
+        每个渠道只保留最近出现的 max_per_source 条
+
+        Args:
+            max_per_source: 每个渠道保留的最大记录数
+            max_age_seconds: 记录最长保留时间（秒）
+
+        Returns:
+            int: 删除的记录数量
+        """
+        if not self.enabled:
+            return 0
+        def work(conn):
+            deleted = conn.execute(
+                "DELETE FROM seen_ids WHERE seenAt < ?", (time.time() - max_age_seconds,)
+            ).rowcount
+            deleted += conn.execute("""
+                DELETE FROM seen_ids WHERE (sourceId, orig_Id) IN (
+                    SELECT sourceId, orig_Id FROM (
+                        SELECT sourceId, orig_Id,
+                               ROW_NUMBER() OVER (PARTITION BY sourceId ORDER BY seenAt DESC) AS rn
+                        FROM seen_ids
+                    ) WHERE rn > ?
+                )
+            """, (max_per_source,)).rowcount
+            return deleted
+
+        return self._write("淘汰本地缓存", work) or 0
+
+    def get_http_validators(self) -> Dict[str, Dict]:
+        """
+        获取所有渠道保存的HTTP校验信息
+
+        Returns:
+            Dict[str, Dict]: 键为渠道ID，值包含 etag、lastModified、contentHash、updatedTime
+        """
+        if not self.enabled:
+            return {}
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT sourceId, etag, lastModified, contentHash, updatedTime FROM http_validators"
+                ).fetchall()
+            return {
+                row[0]: {"etag": row[1], "lastModified": row[2], "contentHash": row[3], "updatedTime": row[4]}
+                for row in rows
+            }
+        except Exception as e:
+            logging.error(f"读取本地缓存失败: {e}")
+            return {}
+
+    def set_http_validators(self, source_id: str, validators: Dict):
+        """
+        保存渠道的HTTP校验信息
+
+        Args:
+            source_id: 渠道ID
+            validators: 包含 etag、lastModified、contentHash、updatedTime
+        """
+        if not self.enabled:
+            return
+        self._write("写入本地缓存", lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO http_validators (sourceId, etag, lastModified, contentHash, updatedTime) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (source_id, validators.get("etag"), validators.get("lastModified"),
+             validators.get("contentHash"), validators.get("updatedTime"))
+        ))
+
+    def get_circuit_states(self) -> Dict[str, Dict]:
+        """
+        获取所有渠道的熔断状态
+
+        Returns:
+            Dict[str, Dict]: 键为渠道ID，值包含 failures、openedUntil
+        """
+        if not self.enabled:
+            return {}
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT sourceId, failures, openedUntil FROM circuit_breakers"
+                ).fetchall()
+            return {row[0]: {"failures": row[1], "openedUntil": row[2]} for row in rows}
+        except Exception as e:
+            logging.error(f"读取本地缓存失败: {e}")
+            return {}
+
+    def set_circuit_state(self, source_id: str, state: Dict):
+        """
+        保存渠道的熔断状态
+
+        Args:
+            source_id: 渠道ID
+            state: 包含 failures、openedUntil
+        """
+        if not self.enabled:
+            return
+        self._write("写入本地缓存", lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO circuit_breakers (sourceId, failures, openedUntil) VALUES (?, ?, ?)",
+            (source_id, state["failures"], state["openedUntil"])
+        ))
+
+    def delete_circuit_state(self, source_id: str):
+        """
+        清除渠道的熔断状态
+        """
+        if not self.enabled:
+            return
+        self._write("写入本地缓存", lambda conn: conn.execute(
+            "DELETE FROM circuit_breakers WHERE sourceId = ?", (source_id,)
+        ))
+
+    def get_scheduled_state(self) -> Tuple[List[str], Dict[str, float]]:
+        """
+        获取定时触发入口的续跑游标和各渠道最近一次处理的时间
+
+        Returns:
+            Tuple: (上次没有处理的渠道ID列表，按原顺序；键为渠道ID、值为最近一次处理时间的字典)
+        """
+        if not self.enabled:
+            return [], {}
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT sourceId, lastRunAt, pendingSeq FROM scheduled_sources"
+                ).fetchall()
+        except Exception as e:
+            logging.error(f"读取本地缓存失败: {e}")
+            return [], {}
+        pending = [row[0] for row in sorted((row for row in rows if row[2] is not None), key=lambda row: row[2])]
+        return pending, {row[0]: row[1] for row in rows if row[1] is not None}
+
+    def save_scheduled_state(self, processed: Iterable[str], pending: List[str], run_at: float):
+        """
+        保存一次定时触发的结果：记录已处理渠道的处理时间，用 pending 替换续跑游标
+
+        Args:
+            processed: 本次处理过的渠道ID
+            pending: 本次没有处理、下次优先处理的渠道ID，按处理顺序
+            run_at: 处理时间（time.time()）
+        """
+        if not self.enabled:
+            return
+
+        def work(conn):
+            conn.execute("UPDATE scheduled_sources SET pendingSeq = NULL WHERE pendingSeq IS NOT NULL")
+            conn.executemany(
+                "INSERT INTO scheduled_sources (sourceId, lastRunAt) VALUES (?, ?) "
+                "ON CONFLICT (sourceId) DO UPDATE SET lastRunAt = excluded.lastRunAt",
+                [(source_id, run_at) for source_id in processed]
+            )
+            conn.executemany(
+                "INSERT INTO scheduled_sources (sourceId, pendingSeq) VALUES (?, ?) "
+                "ON CONFLICT (sourceId) DO UPDATE SET pendingSeq = excluded.pendingSeq",
+                [(source_id, seq) for seq, source_id in enumerate(pending)]
+            )
+
+        self._write("写入本地缓存", work)
+
+    def _write(self, action: str, work):
+        """
+        在一个事务中执行写操作，失败时回滚
+
+        Args:
+            action: 操作描述，用于日志
+            work: 接收SQLite连接并执行写操作的函数
+
+        Returns:
+            work 的返回值，失败时返回None
+        """
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                result = work(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logging.error(f"{action}失败: {e}")
+                return None
+
+    def close(self):
+        """
+        关闭缓存文件
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# 第一次使用时才打开缓存文件，导入模块没有副作用
+@lazy_instance
+def get_local_cache() -> LocalCache:
+    """
+    获取 LocalCache 实例，第一次调用时创建
+    缓存文件路径由环境变量 LOCAL_CACHE_PATH 指定，未设置时缓存处于关闭状态
+    """
+    return LocalCache(os.environ.get("LOCAL_CACHE_PATH"))
+
+
+def __getattr__(name):
+    # 兼容 from utils.local_cache import local_cache 的用法
+    if name == "local_cache":
+        return get_local_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,44 +1,127 @@
+import atexit
+import json
 import logging
-from datetime import datetime
 import os
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
+from typing import Optional
+
+# 后台写日志的线程，setup_logger 重复调用时先停止旧的
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出为一行JSON，便于日志系统采集
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """
+    只在调用线程中合并消息参数和格式化异常堆栈，其余格式化在后台线程完成，
+    异常堆栈保留在 exc_text 中，由各个 handler 的格式化器决定如何输出
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _get_int_env(name: str, default: int) -> int:
+    value = os.environ.get(name, "")
+    return int(value) if value.isdigit() and int(value) > 0 else default
+
+
+def format_params(params, max_items: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    生成用于日志的参数摘要，避免批量SQL出错时把整批参数写入日志
+    序列只保留前 max_items（LOG_PARAMS_MAX_ITEMS，默认5）个元素并注明总数，
+    结果最长 max_chars（LOG_PARAMS_MAX_CHARS，默认1000）个字符
+
+    Args:
+        params: SQL参数、参数列表或SQL语句
+        max_items: 序列最多保留的元素数量
+        max_chars: 结果最多保留的字符数
+
+    Returns:
+        str: 参数摘要，参数为空时为"无"
+    """
+    if not params:
+        return "无"
+    max_items = max_items or _get_int_env("LOG_PARAMS_MAX_ITEMS", 5)
+    max_chars = max_chars or _get_int_env("LOG_PARAMS_MAX_CHARS", 1000)
+    if isinstance(params, (list, tuple)) and len(params) > max_items:
+        text = f"{repr(list(params[:max_items]))[:-1]}, ...] (共 {len(params)} 项)"
+    else:
+        text = repr(params)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... (共 {len(text)} 字符)"
+    return text
+
 
 def setup_logger():
     """
-    配置日志系统，创建两个日志文件：
-    - info_日期.log: 只记录INFO级别的日志
-    - error_日期.log: 只记录ERROR级别的日志
+    配置日志系统，在 LOG_DIR（默认logs）目录下创建两个日志文件：
+    - info.log: 只记录INFO级别的日志
+    - error.log: 只记录ERROR级别的日志
+    每天零点轮转，旧文件加日期后缀（如 info.log.2024-01-01），保留 LOG_BACKUP_DAYS（默认30）天
     同时在控制台显示所有日志
+
+    记录日志的线程只把日志放入队列，由后台线程写文件和控制台，磁盘IO不阻塞抓取和写库
+    LOG_FORMAT=json 时每条日志输出为一行JSON
     """
-    # 确保logs目录存在
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
+    global _listener
 
-    # 配置日志文件名
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    info_log_file = logs_dir / f'info_{date_str}.log'
-    error_log_file = logs_dir / f'error_{date_str}.log'
+    # 确保logs目录存在
+    logs_dir = Path(os.environ.get("LOG_DIR", "logs"))
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    backup_days = _get_int_env("LOG_BACKUP_DAYS", 30)
 
     # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if os.environ.get("LOG_FORMAT", "text").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
 
-    # 清理现有的handlers
+    # 清理现有的handlers，停止旧的后台线程
     root_logger = logging.getLogger()
-    if root_logger.handlers:
-        for handler in root_logger.handlers:
-            root_logger.removeHandler(handler)
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    stop_logger()
 
     # 创建INFO级别的handler
-    info_handler = logging.FileHandler(info_log_file, encoding='utf-8')
+    info_handler = TimedRotatingFileHandler(
+        logs_dir / 'info.log', when='midnight', backupCount=backup_days, encoding='utf-8'
+    )
     info_handler.setFormatter(formatter)
     info_handler.setLevel(logging.INFO)
     info_handler.addFilter(lambda record: record.levelno == logging.INFO)
 
     # 创建ERROR级别的handler
-    error_handler = logging.FileHandler(error_log_file, encoding='utf-8')
+    error_handler = TimedRotatingFileHandler(
+        logs_dir / 'error.log', when='midnight', backupCount=backup_days, encoding='utf-8'
+    )
     error_handler.setFormatter(formatter)
     error_handler.setLevel(logging.ERROR)
 
@@ -47,10 +130,28 @@ def setup_logger():
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.INFO)
 
-    # 配置根日志记录器
+    # 配置根日志记录器，只挂一个队列handler
+    log_queue = queue.SimpleQueue()
     root_logger.setLevel(logging.INFO)
-    root_logger.addHandler(info_handler)
-    root_logger.addHandler(error_handler)
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(_PreparedQueueHandler(log_queue))
+    _listener = QueueListener(
+        log_queue, info_handler, error_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.unregister(stop_logger)
+    atexit.register(stop_logger)
 
     logging.info("日志配置完成")
+
+
+def stop_logger():
+    """
+    停止后台写日志的线程，写完队列中剩余的日志并关闭文件，进程退出时自动调用
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
@@ -0,0 +1,194 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+# 计为正常（source_up 为1）的新闻源状态
+UP_STATUSES = ("success", "not_modified")
+
+
+class RunMetrics:
+    """
+    一次运行的指标：各阶段累计耗时、计数器和每个新闻源的指标
+    各线程并发累加，线程安全；阶段耗时是各线程耗时之和，不是墙钟时间
+
+    阶段：fetch（获取API数据）、dedup（去重）、insert（写入）、retention（裁剪推送记录）、
+          cleanup（清理旧新闻）、snapshot（写快照）
+    计数器：db_statements（执行的SQL语句数）、db_round_trips（与数据库的往返次数，含提交和回滚）
+    新闻源指标：status、fetchSeconds、payloadBytes、items、droppedItems、newItems
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        清空指标，开始新一次运行
+        """
+        with self._lock:
+            self.started = time.time()
+            self._started_monotonic = time.monotonic()
+            self.stages: Dict[str, Dict] = {}
+            self.counters: Dict[str, int] = {}
+            self.sources: Dict[str, Dict] = {}
+
+    @contextmanager
+    def timed(self, stage: str):
+        """
+        统计代码块耗时并累加到指定阶段
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.monotonic() - started)
+
+    def add_time(self, stage: str, seconds: float):
+        """
+        累加阶段耗时
+        """
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+
+    def incr(self, name: str, value: int = 1):
+        """
+        累加计数器
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_source(self, source_id: str, **fields):
+        """
+        记录新闻源的指标，同名字段覆盖
+        """
+        with self._lock:
+            self.sources.setdefault(source_id, {}).update(fields)
+
+    def snapshot(self) -> Dict:
+        """
+        获取当前指标
+
+        Returns:
+            Dict: 包含 startedAt、elapsedSeconds、stages、counters、sources 以及汇总的 totals
+        """
+        with self._lock:
+            sources = {source_id: dict(fields) for source_id, fields in self.sources.items()}
+            return {
+                "startedAt": self.started,
+                "elapsedSeconds": round(time.monotonic() - self._started_monotonic, 3),
+                "stages": {
+                    stage: {"seconds": round(entry["seconds"], 3), "count": entry["count"]}
+                    for stage, entry in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                "sources": sources,
+                "totals": {
+                    "sources": len(sources),
+                    "failedSources": sum(1 for fields in sources.values() if fields.get("status") == "failed"),
+                    "deferredSources": sum(1 for fields in sources.values() if fields.get("status") == "deferred"),
+                    "payloadBytes": sum(fields.get("payloadBytes") or 0 for fields in sources.values()),
+                    "items": sum(fields.get("items") or 0 for fields in sources.values()),
+                    "newItems": sum(fields.get("newItems") or 0 for fields in sources.values())
+                }
+            }
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def to_prometheus(snapshot: Dict) -> str:
+    """
+    把指标转换为 Prometheus textfile 格式
+
+    Args:
+        snapshot: RunMetrics.snapshot 的结果
+
+    Returns:
+        str: 文本格式的指标
+    """
+    lines = []
+
+    def metric(name: str, help_text: str, samples):
+        lines.append(f"# HELP news_publisher_{name} {help_text}")
+        lines.append(f"# TYPE news_publisher_{name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            lines.append(f"news_publisher_{name}{{{label_text}}} {value}" if label_text else f"news_publisher_{name} {value}")
+
+    totals = snapshot["totals"]
+    metric("run_timestamp_seconds", "Run start time", [({}, round(snapshot["startedAt"], 3))])
+    metric("run_elapsed_seconds", "Run wall-clock duration", [({}, snapshot["elapsedSeconds"])])
+    metric("run_sources", "Sources processed in the run", [({}, totals["sources"])])
+    metric("run_failed_sources", "Sources that failed in the run", [({}, totals["failedSources"])])
+    metric("run_deferred_sources", "Sources deferred to the next run at the deadline", [({}, totals["deferredSources"])])
+    metric("run_payload_bytes", "Payload bytes fetched in the run", [({}, totals["payloadBytes"])])
+    metric("run_items", "Items fetched in the run", [({}, totals["items"])])
+    metric("run_new_items", "New items stored in the run", [({}, totals["newItems"])])
+    metric("stage_seconds", "Accumulated time per stage",
+           [({"stage": stage}, entry["seconds"]) for stage, entry in sorted(snapshot["stages"].items())])
+    metric("db_statements", "SQL statements executed", [({}, snapshot["counters"].get("db_statements", 0))])
+    metric("db_round_trips", "Database round trips", [({}, snapshot["counters"].get("db_round_trips", 0))])
+
+    sources = sorted(snapshot["sources"].items())
+    # deferred 的数据源本次没有取到数据，不算正常，另由 source_deferred 区分于失败
+    metric("source_up", "1 if the source was fetched successfully or was not modified",
+           [({"source": source_id}, 1 if fields.get("status") in UP_STATUSES else 0) for source_id, fields in sources])
+    metric("source_deferred", "1 if the source was deferred to the next run at the deadline",
+           [({"source": source_id}, 1 if fields.get("status") == "deferred" else 0) for source_id, fields in sources])
+    for key, name, help_text in (
+        ("fetchSeconds", "source_fetch_seconds", "Fetch latency per source"),
+        ("payloadBytes", "source_payload_bytes", "Payload bytes per source"),
+        ("items", "source_items", "Items returned per source"),
+        ("droppedItems", "source_dropped_items", "Items dropped for missing or oversized fields per source"),
+        ("newItems", "source_new_items", "New items stored per source"),
+    ):
+        metric(name, help_text, [
+            ({"source": source_id}, round(fields[key], 3) if isinstance(fields[key], float) else fields[key])
+            for source_id, fields in sources if fields.get(key) is not None
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: str, text: str):
+    """
+    先写入临时文件再替换，node_exporter 等读取方不会读到写了一半的文件
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, target)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def export_metrics(snapshot: Dict, prometheus_path: Optional[str] = None, json_path: Optional[str] = None):
+    """
+    导出指标：Prometheus textfile 和 JSON 运行汇总
+    路径为空时使用环境变量 METRICS_TEXTFILE / METRICS_JSON，都未配置时不导出
+
+    Args:
+        snapshot: RunMetrics.snapshot 的结果
+        prometheus_path: Prometheus textfile 路径
+        json_path: JSON 运行汇总路径
+    """
+    prometheus_path = prometheus_path or os.environ.get("METRICS_TEXTFILE")
+    json_path = json_path or os.environ.get("METRICS_JSON")
+    if prometheus_path:
+        _atomic_write(prometheus_path, to_prometheus(snapshot))
+    if json_path:
+        _atomic_write(json_path, json.dumps(snapshot, ensure_ascii=False, indent=2))
+
+
+# 创建实例供直接导入使用
+run_metrics = RunMetrics()
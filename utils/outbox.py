@@ -0,0 +1,279 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from api.newsItems import NewsItem
+from utils.lazy import lazy_instance
+
+
+class NewsOutbox:
+    """
+    新闻写入的本地暂存区，使用一个SQLite文件作为预写日志
+    数据库不可用时，抓取到的新数据先写入暂存区，数据库恢复后按数据源批量补写，
+    补写与正常写入走同一条路径（INSERT IGNORE + 只为新插入的新闻创建推送记录），重复补写不会产生重复数据
+
+    同一数据源的同一个orig_Id只暂存一条，数据库持续不可用期间反复抓取到的数据不会累积
+    补写失败超过 max_attempts 次的记录视为无法写入，记录日志后丢弃；
+    因数据错误（重试也不会成功）无法写入的新闻移入隔离表 news_outbox_rejected，不再补写，留待人工处理
+
+    未配置路径时暂存区处于关闭状态；配置了路径但文件不存在时，读取方法直接返回空结果，不创建文件
+    """
+    def __init__(self, path: Optional[str] = None, max_attempts: int = 20):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connection(self, create: bool) -> Optional[sqlite3.Connection]:
+        """
+        获取SQLite连接，第一次使用时打开文件并建表
+
+        Args:
+            create: 文件不存在时是否创建
+        """
+        if self._conn is not None:
+            return self._conn
+        if not create and not Path(self.path).exists():
+            return None
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # 暂存的数据只有这一份，每次提交都同步到磁盘
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS news_outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                sourceId TEXT NOT NULL,
+                sourceName TEXT NOT NULL,
+                orig_Id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                queuedAt REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (sourceId, orig_Id)
+            );
+            CREATE TABLE IF NOT EXISTS news_outbox_rejected (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                sourceId TEXT NOT NULL,
+                sourceName TEXT NOT NULL,
+                orig_Id TEXT NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL,
+                rejectedAt REAL NOT NULL,
+                reason TEXT NOT NULL,
+                UNIQUE (sourceId, orig_Id)
+            );
+        """)
+        self._conn = conn
+        return conn
+
+    def add(self, source_id: str, source_name: str, news_list: List[NewsItem]) -> Optional[int]:
+        """
+        暂存一个数据源的新数据，已暂存的orig_Id忽略
+
+        Args:
+            source_id: 渠道ID
+            source_name: 渠道名称
+            news_list: 新闻列表
+
+        Returns:
+            int: 新暂存的记录数量，暂存区关闭或写入失败返回None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        rows = [(source_id, source_name, item.id, item.title, item.url, now) for item in news_list]
+        return self._write("写入新闻暂存区", lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO news_outbox (sourceId, sourceName, orig_Id, title, url, queuedAt) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        ).rowcount)
+
+    def pending_count(self) -> int:
+        """
+        获取暂存区中待补写的记录数量
+        """
+        if not self.enabled:
+            return 0
+        try:
+            with self._lock:
+                conn = self._connection(create=False)
+                if conn is None:
+                    return 0
+                return conn.execute("SELECT COUNT(*) FROM news_outbox").fetchone()[0]
+        except Exception as e:
+            logging.error(f"读取新闻暂存区失败: {e}")
+            return 0
+
+    def take(self, limit: int) -> Dict[str, Tuple[str, List[int], List[NewsItem]]]:
+        """
+        按暂存顺序取出最早的一批记录（不删除），按数据源分组
+
+        Args:
+            limit: 最多取出的记录数量
+
+        Returns:
+            Dict: 键为渠道ID，值为 (渠道名称, 记录序号列表, 新闻列表)
+        """
+        if not self.enabled:
+            return {}
+        try:
+            with self._lock:
+                conn = self._connection(create=False)
+                if conn is None:
+                    return {}
+                rows = conn.execute(
+                    "SELECT seq, sourceId, sourceName, orig_Id, title, url FROM news_outbox ORDER BY seq LIMIT ?",
+                    (limit,)
+                ).fetchall()
+        except Exception as e:
+            logging.error(f"读取新闻暂存区失败: {e}")
+            return {}
+
+        batches: Dict[str, Tuple[str, List[int], List[NewsItem]]] = {}
+        for seq, source_id, source_name, orig_id, title, url in rows:
+            _, seqs, items = batches.setdefault(source_id, (source_name, [], []))
+            seqs.append(seq)
+            items.append(NewsItem(orig_id, title, url))
+        return batches
+
+    def remove(self, seqs: List[int]) -> bool:
+        """
+        删除已补写的记录
+
+        Returns:
+            bool: 是否删除成功
+        """
+        if not self.enabled or not seqs:
+            return True
+        return self._write("删除新闻暂存区记录", lambda conn: conn.executemany(
+            "DELETE FROM news_outbox WHERE seq = ?", [(seq,) for seq in seqs]
+        )) is not None
+
+    def mark_failed(self, seqs: List[int]) -> int:
+        """
+        记录一次补写失败，失败次数达到 max_attempts 的记录被丢弃
+
+        Returns:
+            int: 丢弃的记录数量
+        """
+        if not self.enabled or not seqs:
+            return 0
+
+        def work(conn):
+            conn.executemany(
+                "UPDATE news_outbox SET attempts = attempts + 1 WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+            placeholders = ", ".join(["?"] * len(seqs))
+            dropped = conn.execute(
+                f"DELETE FROM news_outbox WHERE attempts >= ? AND seq IN ({placeholders})",
+                [self.max_attempts, *seqs]
+            ).rowcount
+            if dropped:
+                logging.error(f"新闻暂存区有 {dropped} 条记录补写失败 {self.max_attempts} 次，已丢弃")
+            return dropped
+
+        return self._write("更新新闻暂存区", work) or 0
+
+    def reject(self, seqs: List[int], reason: str) -> int:
+        """
+        把因数据错误无法写入的暂存记录移入隔离表，不再补写
+
+        Args:
+            seqs: 暂存记录序号列表
+            reason: 无法写入的原因
+
+        Returns:
+            int: 隔离的记录数量
+        """
+        if not self.enabled or not seqs:
+            return 0
+        placeholders = ", ".join(["?"] * len(seqs))
+
+        def work(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO news_outbox_rejected "
+                "(sourceId, sourceName, orig_Id, title, url, rejectedAt, reason) "
+                f"SELECT sourceId, sourceName, orig_Id, title, url, ?, ? FROM news_outbox WHERE seq IN ({placeholders})",
+                [time.time(), reason, *seqs]
+            )
+            return conn.execute(f"DELETE FROM news_outbox WHERE seq IN ({placeholders})", seqs).rowcount
+
+        return self._write("隔离新闻暂存区记录", work) or 0
+
+    def add_rejected(self, source_id: str, source_name: str, news_list: List[NewsItem], reason: str) -> int:
+        """
+        把因数据错误无法写入数据库的新数据直接写入隔离表
+
+        Args:
+            source_id: 渠道ID
+            source_name: 渠道名称
+            news_list: 新闻列表
+            reason: 无法写入的原因
+
+        Returns:
+            int: 隔离的记录数量，暂存区关闭或写入失败返回0
+        """
+        if not self.enabled or not news_list:
+            return 0
+        now = time.time()
+        rows = [(source_id, source_name, item.id, item.title, item.url, now, reason) for item in news_list]
+        return self._write("写入新闻隔离表", lambda conn: conn.executemany(
+            "INSERT OR REPLACE INTO news_outbox_rejected "
+            "(sourceId, sourceName, orig_Id, title, url, rejectedAt, reason) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        ).rowcount) or 0
+
+    def _write(self, action: str, work):
+        """
+        在一个事务中执行写操作，失败时回滚
+
+        Args:
+            action: 操作描述，用于日志
+            work: 接收SQLite连接并执行写操作的函数
+
+        Returns:
+            work 的返回值，失败时返回None
+        """
+        with self._lock:
+            conn = None
+            try:
+                conn = self._connection(create=True)
+                conn.execute("BEGIN IMMEDIATE")
+                result = work(conn)
+                conn.execute("COMMIT")
+                return result
+            except Exception as e:
+                if conn is not None and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logging.error(f"{action}失败: {e}")
+                return None
+
+    def close(self):
+        """
+        关闭暂存区文件
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_news_outbox() -> NewsOutbox:
+    """
+    获取 NewsOutbox 实例，第一次调用时创建
+    文件路径由环境变量 OUTBOX_PATH 指定（默认 cache/outbox.sqlite3，与本地缓存一起由 actions/cache 保存），设置为空字符串时关闭暂存区
+    """
+    attempts_env = os.environ.get("OUTBOX_MAX_ATTEMPTS", "")
+    max_attempts = int(attempts_env) if attempts_env.isdigit() and int(attempts_env) > 0 else 20
+    return NewsOutbox(os.environ.get("OUTBOX_PATH", "cache/outbox.sqlite3"), max_attempts)
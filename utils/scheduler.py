@@ -0,0 +1,300 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# 指数移动平均的平滑系数
+EWMA_ALPHA = 0.3
+
+
+def _ewma(previous: Optional[float], value: float) -> float:
+    return value if previous is None else previous + EWMA_ALPHA * (value - previous)
+
+
+class SourceStats:
+    """
+    单个新闻源的运行统计，每次处理后由调度器更新
+    """
+    def __init__(self, source_id: str, interval: float):
+        self.source_id = source_id
+        # 当前使用的轮询间隔（秒）
+        self.interval = interval
+        self.runs = 0
+        self.failures = 0
+        self.total_new = 0
+        self.last_new = 0
+        self.last_status = None
+        # 新增数量和获取耗时的指数移动平均
+        self.avg_new = None
+        self.avg_fetch_seconds = None
+        # API数据 updatedTime（毫秒）以及相邻两次变化之间间隔（秒）的指数移动平均
+        self.last_updated_time = None
+        self.avg_update_delta = None
+        self.last_run_at = None
+        self.next_poll_at = None
+
+    def record(self, result: Dict):
+        """
+        记录一次处理结果
+
+        Args:
+            result: NewsPublisher.run_source 返回的处理结果
+        """
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_status = result.get("status")
+        # 失败的请求也计入获取耗时，持续超时的新闻源由此被识别为慢新闻源
+        if result.get("fetchSeconds") is not None:
+            self.avg_fetch_seconds = _ewma(self.avg_fetch_seconds, result["fetchSeconds"])
+        if self.last_status == "failed":
+            self.failures += 1
+            self.last_new = 0
+            return
+        new_count = result.get("newCount") or 0
+        self.last_new = new_count
+        self.total_new += new_count
+        self.avg_new = _ewma(self.avg_new, new_count)
+        updated_time = result.get("updatedTime")
+        if updated_time:
+            if self.last_updated_time and updated_time > self.last_updated_time:
+                delta = (updated_time - self.last_updated_time) / 1000
+                self.avg_update_delta = _ewma(self.avg_update_delta, delta)
+            self.last_updated_time = updated_time
+
+    def as_dict(self) -> Dict:
+        return {
+            "sourceId": self.source_id,
+            "interval": round(self.interval, 1),
+            "runs": self.runs,
+            "failures": self.failures,
+            "totalNew": self.total_new,
+            "lastNew": self.last_new,
+            "lastStatus": self.last_status,
+            "avgNew": None if self.avg_new is None else round(self.avg_new, 2),
+            "avgFetchSeconds": None if self.avg_fetch_seconds is None else round(self.avg_fetch_seconds, 3),
+            "avgUpdateDeltaSeconds": None if self.avg_update_delta is None else round(self.avg_update_delta, 1),
+            "lastRunAt": self.last_run_at,
+            "nextPollAt": self.next_poll_at
+        }
+
+
+class AdaptivePolicy:
+    """
+    根据运行统计调整新闻源的轮询间隔
+    - 没有新数据：间隔乘以 backoff_factor（指数退避）
+    - 新数据达到 busy_threshold 条：间隔乘以 tighten_factor（收紧）
+    - 平均获取耗时达到 slow_fetch_seconds 的慢新闻源：不收紧，每次都按 backoff_factor 退避，
+      避免慢请求长时间占用抓取线程
+    - 轮询间隔不小于上游 updatedTime 变化间隔的一半，比这更快只会拿到未变化的数据
+    - 结果限制在 [min_interval, max_interval]，新闻源可以用 min_interval/max_interval 字段单独配置
+    - 获取失败时不调整，由熔断器负责；慢新闻源失败（通常是请求超时）时同样退避
+    """
+    def __init__(self,
+                 enabled: bool = True,
+                 min_interval: float = 120,
+                 max_interval: float = 7200,
+                 backoff_factor: float = 1.5,
+                 tighten_factor: float = 0.5,
+                 busy_threshold: int = 5,
+                 slow_fetch_seconds: float = 10):
+        self.enabled = enabled
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.tighten_factor = tighten_factor
+        self.busy_threshold = busy_threshold
+        self.slow_fetch_seconds = slow_fetch_seconds
+
+    @classmethod
+    def from_env(cls) -> "AdaptivePolicy":
+        """
+        从环境变量创建策略
+        ADAPTIVE_POLLING（0 关闭）/ ADAPTIVE_MIN_INTERVAL / ADAPTIVE_MAX_INTERVAL /
+        ADAPTIVE_BACKOFF_FACTOR / ADAPTIVE_BUSY_THRESHOLD / ADAPTIVE_SLOW_FETCH_SECONDS
+        """
+        def get_float(name: str, default: float) -> float:
+            try:
+                value = float(os.environ.get(name, ""))
+                return value if value > 0 else default
+            except ValueError:
+                return default
+
+        return cls(
+            enabled=os.environ.get("ADAPTIVE_POLLING", "1") != "0",
+            min_interval=get_float("ADAPTIVE_MIN_INTERVAL", 120),
+            max_interval=get_float("ADAPTIVE_MAX_INTERVAL", 7200),
+            backoff_factor=get_float("ADAPTIVE_BACKOFF_FACTOR", 1.5),
+            busy_threshold=int(get_float("ADAPTIVE_BUSY_THRESHOLD", 5)),
+            slow_fetch_seconds=get_float("ADAPTIVE_SLOW_FETCH_SECONDS", 10)
+        )
+
+    def next_interval(self, source: Dict, stats: SourceStats, base_interval: float) -> float:
+        """
+        计算新闻源的下一次轮询间隔（秒）
+
+        Args:
+            source: 新闻源配置
+            stats: 已记录本次结果的运行统计
+            base_interval: 新闻源声明的轮询间隔
+
+        Returns:
+            float: 下一次轮询间隔
+        """
+        if not self.enabled:
+            return base_interval
+        lower = source.get("min_interval") or self.min_interval
+        upper = source.get("max_interval") or self.max_interval
+        interval = stats.interval
+        slow = stats.avg_fetch_seconds is not None and stats.avg_fetch_seconds >= self.slow_fetch_seconds
+        if stats.last_status == "failed":
+            if not slow:
+                return interval
+            interval *= self.backoff_factor
+        elif slow or stats.last_new == 0:
+            interval *= self.backoff_factor
+        elif stats.last_new >= self.busy_threshold:
+            interval *= self.tighten_factor
+        if stats.avg_update_delta:
+            lower = max(lower, min(stats.avg_update_delta / 2, upper))
+        return min(max(interval, lower), upper)
+
+
+class SourceScheduler:
+    """
+    进程内调度器，用于常驻模式
+    每个新闻源从 news-source.json 中声明的 interval（秒）开始轮询，
+    同一时刻到期的新闻源合并为一批交给 run_sources 并发处理，
+    处理结果记入 SourceStats，并由 AdaptivePolicy 计算下一次轮询时间；
+    另外可以注册按固定间隔执行的维护任务（如清理旧数据）
+    """
+    def __init__(self,
+                 sources: List[Dict],
+                 run_sources: Callable[[List[Dict]], Dict[str, Dict]],
+                 default_interval: int = 1800,
+                 policy: Optional[AdaptivePolicy] = None):
+        """
+        Args:
+            sources: 新闻源配置列表，可包含 interval、min_interval、max_interval 字段
+            run_sources: 处理一批到期新闻源的函数，返回键为新闻源ID的处理结果
+            default_interval: 未声明 interval 的新闻源使用的轮询间隔（秒）
+            policy: 轮询间隔调整策略，默认从环境变量创建
+        """
+        self.sources = {source["id"]: source for source in sources}
+        self.run_sources = run_sources
+        self.default_interval = default_interval
+        self.policy = policy or AdaptivePolicy.from_env()
+        self.stats = {
+            source_id: SourceStats(source_id, self.get_base_interval(source_id))
+            for source_id in self.sources
+        }
+        self._tasks: Dict[str, Dict] = {}
+        # 堆元素为 (到期时间, 序号, 类型, 键)，类型为 source 或 task
+        self._queue = []
+        self._counter = itertools.count()
+        self._stop_event = threading.Event()
+
+        now = time.monotonic()
+        for source_id in self.sources:
+            self._push(now, "source", source_id)
+
+    def get_base_interval(self, source_id: str) -> float:
+        """
+        获取新闻源声明的轮询间隔（秒）
+        """
+        return self.sources[source_id].get("interval") or self.default_interval
+
+    def get_stats(self) -> List[Dict]:
+        """
+        获取所有新闻源的运行统计
+
+        Returns:
+            List[Dict]: 每个新闻源的统计，见 SourceStats.as_dict
+        """
+        return [stats.as_dict() for stats in self.stats.values()]
+
+    def _reschedule(self, source_id: str, result: Optional[Dict], started: float):
+        """
+        记录处理结果并安排新闻源的下一次轮询
+        """
+        stats = self.stats[source_id]
+        if result is not None:
+            stats.record(result)
+            stats.interval = self.policy.next_interval(
+                self.sources[source_id], stats, self.get_base_interval(source_id)
+            )
+        stats.next_poll_at = time.time() + (started + stats.interval - time.monotonic())
+        self._push(started + stats.interval, "source", source_id)
+
+    def add_task(self, name: str, interval: float, func: Callable[[], None], run_immediately: bool = False):
+        """
+        注册按固定间隔执行的任务
+
+        Args:
+            name: 任务名
+            interval: 执行间隔（秒）
+            func: 任务函数
+            run_immediately: 是否在启动时立即执行一次
+        """
+        self._tasks[name] = {"interval": interval, "func": func}
+        self._push(time.monotonic() + (0 if run_immediately else interval), "task", name)
+
+    def _push(self, due: float, kind: str, key: str):
+        heapq.heappush(self._queue, (due, next(self._counter), kind, key))
+
+    def _pop_due(self, now: float) -> List[tuple]:
+        """
+        取出所有已到期的条目
+        """
+        due_items = []
+        while self._queue and self._queue[0][0] <= now:
+            due_items.append(heapq.heappop(self._queue))
+        return due_items
+
+    def run_forever(self):
+        """
+        循环执行到期的新闻源和任务，直到调用 stop()
+        """
+        logging.info(f"调度器启动，共 {len(self.sources)} 个新闻源，{len(self._tasks)} 个任务")
+        while not self._stop_event.is_set():
+            due_items = self._pop_due(time.monotonic())
+            if not due_items:
+                timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                self._stop_event.wait(timeout)
+                continue
+
+            due_sources = [self.sources[key] for _, _, kind, key in due_items if kind == "source"]
+            if due_sources:
+                started = time.monotonic()
+                results = {}
+                try:
+                    results = self.run_sources(due_sources) or {}
+                except Exception as e:
+                    logging.error(f"调度处理新闻源时发生错误: {e}", exc_info=True)
+                finally:
+                    for source in due_sources:
+                        self._reschedule(source["id"], results.get(source["id"]), started)
+                for source in due_sources:
+                    stats = self.stats[source["id"]]
+                    logging.info(f"新闻源 {source['id']} 本次新增 {stats.last_new} 条，"
+                                 f"下次轮询间隔 {stats.interval:.0f} 秒")
+
+            for _, _, kind, key in due_items:
+                if kind != "task":
+                    continue
+                task = self._tasks[key]
+                try:
+                    task["func"]()
+                except Exception as e:
+                    logging.error(f"执行定时任务 {key} 时发生错误: {e}", exc_info=True)
+                finally:
+                    self._push(time.monotonic() + task["interval"], "task", key)
+        logging.info("调度器已停止")
+
+    def stop(self):
+        """
+        停止调度器，当前批次处理完成后退出
+        """
+        self._stop_event.set()
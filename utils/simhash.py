@@ -0,0 +1,120 @@
+import hashlib
+import re
+import unicodedata
+from itertools import combinations
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 64位指纹分为8块，每块8位，任意两块组合为一个16位的段，共28段；
+# 汉明距离不超过6的两个指纹至少有两块完全相同（抽屉原理），即至少有一段完全相同，
+# 所以只需要按段精确匹配查找候选，再计算完整的汉明距离
+# 16位的段使每个桶只包含时间窗口内约1/65536的新闻，8位的段每个桶约占1/256，候选数量会随时间窗口线性增长
+FINGERPRINT_BITS = 64
+BLOCK_COUNT = 8
+BLOCK_BITS = FINGERPRINT_BITS // BLOCK_COUNT
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+BAND_BLOCKS = list(combinations(range(BLOCK_COUNT), 2))
+BAND_COUNT = len(BAND_BLOCKS)
+MAX_DISTANCE = BLOCK_COUNT - 2
+# 规范化链接的哈希单独作为一个桶，链接相同直接视为同一条新闻
+URL_BAND = 8
+# 标题段的段号从该值开始，与旧版本8位段的段号（0~7）区分，旧记录超出时间窗口后由清理任务删除
+TITLE_BAND_OFFSET = 16
+# 规范化后少于该长度的标题太短，相似度没有意义，只按链接匹配
+MIN_TITLE_LENGTH = 5
+
+# 不影响页面内容的跟踪参数
+_TRACKING_PARAMS = {"spm", "from", "source", "share", "share_token", "timestamp", "ref", "refer", "wfr", "s_trans"}
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def normalize_title(title: str) -> str:
+    """
+    规范化标题：全角转半角、统一小写，去掉标点、空白和符号
+    """
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", title or "").lower())
+
+
+def canonical_url(url: str) -> str:
+    """
+    规范化链接：协议和域名小写、去掉 www. 前缀、锚点、跟踪参数和末尾的斜杠，查询参数排序
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    return urlunsplit(("", host, parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def simhash(text: str) -> int:
+    """
+    计算文本的64位 SimHash 指纹，特征为单个字符和相邻两个字符（中文标题不分词）
+    """
+    shingles = list(text) + [text[i:i + 2] for i in range(len(text) - 1)]
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = _hash64(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def fingerprint(title: str, url: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    计算一条新闻的指纹
+
+    Returns:
+        Tuple: (标题SimHash，标题太短时为None,
+                规范化链接的64位哈希，链接只有域名时为None，避免所有指向首页的新闻被合并)
+    """
+    normalized = normalize_title(title)
+    title_hash = simhash(normalized) if len(normalized) >= MIN_TITLE_LENGTH else None
+    canonical = canonical_url(url)
+    parts = urlsplit(canonical)
+    url_hash = _hash64(canonical) if parts.path or parts.query else None
+    return title_hash, url_hash
+
+
+def bucket_keys(title_hash: Optional[int], url_hash: Optional[int]) -> List[Tuple[int, int]]:
+    """
+    获取指纹对应的LSH桶，每个桶为 (段号, 段值)，标题段的段号为 TITLE_BAND_OFFSET 加段的序号，
+    段值为两块拼接成的16位整数；链接哈希使用段号 URL_BAND
+    """
+    keys = []
+    if title_hash is not None:
+        blocks = [title_hash >> (block * BLOCK_BITS) & BLOCK_MASK for block in range(BLOCK_COUNT)]
+        keys.extend(
+            (TITLE_BAND_OFFSET + band, blocks[first] << BLOCK_BITS | blocks[second])
+            for band, (first, second) in enumerate(BAND_BLOCKS)
+        )
+    if url_hash is not None:
+        keys.append((URL_BAND, url_hash))
+    return keys
+
+
+def is_near_duplicate(title_hash: Optional[int], other_title_hash: Optional[int]) -> bool:
+    """
+    两个标题指纹的汉明距离不超过 MAX_DISTANCE 时视为同一条新闻
+    """
+    if title_hash is None or other_title_hash is None:
+        return False
+    return hamming_distance(title_hash, other_title_hash) <= MAX_DISTANCE
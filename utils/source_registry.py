@@ -0,0 +1,33 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SOURCE_FILE = Path(__file__).parent.parent / "news-source.json"
+
+_sources: Optional[List[Dict]] = None
+_lock = threading.Lock()
+
+
+def get_sources() -> List[Dict]:
+    """
+    获取 news-source.json 中的新闻源配置
+    每个进程只解析一次，NewsApi、NewsPublisher 等共用同一份列表，调用方不应修改
+
+    Returns:
+        List[Dict]: 新闻源配置列表，加载失败时返回空列表（下次调用会重新加载）
+    """
+    global _sources
+    if _sources is not None:
+        return _sources
+    with _lock:
+        if _sources is None:
+            try:
+                with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
+                    _sources = json.load(f)
+                logging.info(f"成功加载 {len(_sources)} 个新闻源")
+            except Exception as e:
+                logging.error(f"加载新闻源配置文件失败: {e}", exc_info=True)
+                return []
+    return _sources
@@ -0,0 +1,188 @@
+import logging
+import math
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import FrozenSet, List, Optional
+
+from db.dbBackend import get_db_manager
+from db.dbSourceLeases import get_db_source_leases
+from utils.lazy import lazy_instance
+
+
+class SourceSharding:
+    """
+    多进程/多主机分片处理渠道：每个进程通过 source_leases 表的租约认领一部分渠道，只处理自己持有租约的渠道
+
+    每次心跳：
+    1. 在 lease_workers 中记录心跳，按 ttl 内有心跳的进程数计算份额 ceil(渠道数 / 进程数)
+    2. 续约自己持有的租约
+    3. 持有数超过份额时释放多余的租约；不足份额时抢占空闲或已到期的租约
+    进程退出时释放全部租约；进程异常终止时租约在 ttl 秒后到期，由其他进程在下一次心跳时接管
+
+    到期时间由数据库时钟计算，各主机的时钟偏差不影响租约判断
+    心跳间隔应明显小于 ttl（默认 ttl/3）；本地记录的租约在 ttl 减去一个心跳间隔之后视为失效，
+    心跳失败时本进程会先于数据库中的租约到期停止处理，避免两个进程同时处理同一个渠道
+    start() 在后台线程中按心跳间隔持续心跳，处理一批渠道的耗时超过 ttl 时租约也不会到期
+    """
+    def __init__(self, source_ids: List[str], owner: Optional[str] = None,
+                 ttl_seconds: int = 90, heartbeat_seconds: Optional[int] = None):
+        """
+        Args:
+            source_ids: 参与分片的渠道ID
+            owner: 进程标识，默认为 主机名:进程号:随机串
+            ttl_seconds: 租约有效期（秒）
+            heartbeat_seconds: 心跳间隔（秒），默认为 ttl 的三分之一
+        """
+        self.source_ids = list(source_ids)
+        self._source_set = set(self.source_ids)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.ttl_seconds = ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds or max(1, ttl_seconds // 3)
+        self.owned: FrozenSet[str] = frozenset()
+        self.share = len(self.source_ids)
+        self._valid_until = 0.0
+        self._sources_ready = False
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def owns(self, source_id: str) -> bool:
+        """
+        本进程当前是否持有渠道的租约
+        """
+        return source_id in self.owned and time.monotonic() < self._valid_until
+
+    def heartbeat(self) -> FrozenSet[str]:
+        """
+        心跳：续约、按份额释放或抢占租约
+
+        Returns:
+            FrozenSet[str]: 本进程持有租约的渠道ID，心跳失败时为空集合
+        """
+        started = time.monotonic()
+        leases = get_db_source_leases()
+        db = get_db_manager()
+
+        with db.session():
+            try:
+                owned = self._rebalance(leases)
+            except Exception as e:
+                db.rollback()
+                logging.error(f"渠道租约心跳失败: {e}", exc_info=True)
+                owned = None
+
+        if owned is None:
+            self.owned = frozenset()
+            return self.owned
+        changed = owned != self.owned
+        self.owned = owned
+        self._valid_until = started + self.ttl_seconds - self.heartbeat_seconds
+        if changed:
+            logging.info(f"进程 {self.owner} 持有 {len(owned)}/{len(self.source_ids)} 个渠道（份额 {self.share}）: "
+                         f"{', '.join(sorted(owned))}")
+        return self.owned
+
+    def _rebalance(self, leases) -> Optional[FrozenSet[str]]:
+        """
+        在当前数据库会话中完成一次心跳，返回本进程持有的渠道，失败返回None
+        """
+        if not self._sources_ready and not leases.ensure_sources(self.source_ids, commit=False):
+            return None
+        if not leases.touch_worker(self.owner, commit=False):
+            return None
+        # 长时间没有心跳的进程记录只用于统计，清理掉
+        leases.remove_workers(idle_seconds=self.ttl_seconds * 10, commit=False)
+        workers = leases.count_live_workers(self.ttl_seconds)
+        if workers is None or leases.renew(self.owner, self.ttl_seconds, commit=False) is None:
+            return None
+        get_db_manager().commit()
+        self._sources_ready = True
+        self.share = math.ceil(len(self.source_ids) / max(workers, 1))
+
+        owned = leases.get_owned(self.owner)
+        if owned is None:
+            return None
+        owned = [source_id for source_id in owned if source_id in self._source_set]
+        if len(owned) > self.share:
+            # 释放多余的租约，由其他进程在下一次心跳时抢占
+            excess = owned[self.share:]
+            if leases.release(self.owner, excess) is None:
+                return None
+            return frozenset(owned[:self.share])
+        if len(owned) < self.share:
+            free = leases.get_free(self.source_ids)
+            if free is None:
+                return None
+            if free:
+                # 随机顺序抢占，多个进程同时心跳时减少冲突
+                random.shuffle(free)
+                if leases.claim(self.owner, free[:self.share - len(owned)], self.ttl_seconds) is None:
+                    return None
+                owned = leases.get_owned(self.owner)
+                if owned is None:
+                    return None
+        return frozenset(source_id for source_id in owned if source_id in self._source_set)
+
+    def start(self):
+        """
+        立即心跳一次，之后在后台线程中每 heartbeat_seconds 秒心跳一次，直到调用 release()
+        """
+        if self._heartbeat_thread is not None:
+            return
+        self.heartbeat()
+        self._stop_event.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name="source-leases-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logging.error(f"渠道租约心跳线程发生错误: {e}", exc_info=True)
+
+    def release(self):
+        """
+        停止后台心跳，释放本进程持有的全部租约并删除进程记录，进程退出时调用
+        """
+        thread, self._heartbeat_thread = self._heartbeat_thread, None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+        self.owned = frozenset()
+        self._valid_until = 0.0
+        leases = get_db_source_leases()
+        with get_db_manager().session():
+            leases.release(self.owner, commit=False)
+            leases.remove_workers(owner=self.owner, commit=False)
+            get_db_manager().commit()
+        logging.info(f"进程 {self.owner} 已释放全部渠道租约")
+
+
+# 第一次使用时才创建实例，导入模块没有副作用
+@lazy_instance
+def get_source_sharding() -> Optional[SourceSharding]:
+    """
+    获取 SourceSharding 实例，第一次调用时创建
+    SOURCE_SHARDING=1 时启用，租约有效期为 LEASE_TTL_SECONDS（默认90）秒，
+    心跳间隔为 LEASE_HEARTBEAT_SECONDS（默认为有效期的三分之一）；未启用时返回None
+    """
+    if os.environ.get("SOURCE_SHARDING") != "1":
+        return None
+    from utils.source_registry import get_sources
+
+    def get_int(name: str) -> Optional[int]:
+        value = os.environ.get(name, "")
+        return int(value) if value.isdigit() and int(value) > 0 else None
+
+    return SourceSharding(
+        [source["id"] for source in get_sources()],
+        owner=os.environ.get("WORKER_ID") or None,
+        ttl_seconds=get_int("LEASE_TTL_SECONDS") or 90,
+        heartbeat_seconds=get_int("LEASE_HEARTBEAT_SECONDS")
+    )
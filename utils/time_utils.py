@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta, timezone
+
+# 北京时间，固定UTC+8且没有夏令时，不需要时区数据库
+CHINA_TZ = timezone(timedelta(hours=8), "Asia/Shanghai")
+
+
+def china_now() -> datetime:
+    """
+    获取当前北京时间，去掉时区信息后直接写入数据库的 datetime 字段
+    """
+    return datetime.now(CHINA_TZ).replace(tzinfo=None)
+
+
+def china_from_timestamp(timestamp: float) -> datetime:
+    """
+    把Unix时间戳转换为北京时间，去掉时区信息，与 china_now 写入的时间一致，不受运行环境时区影响
+    """
+    return datetime.fromtimestamp(timestamp, CHINA_TZ).replace(tzinfo=None)
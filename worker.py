@@ -0,0 +1,30 @@
+"""
+定时触发入口：cron 每次运行 python worker.py，在时间预算内执行一次 main.scheduled，
+没有处理完的数据源留到下次运行，例如每10分钟运行一次：
+    */10 * * * * cd /path/to/news_publisher && LOCAL_CACHE_PATH=cache/local_cache.sqlite3 python worker.py
+
+scheduled 依赖 pymysql、sqlite3 和线程池等阻塞IO，只能在普通的 Python 进程中运行，不能部署到 Cloudflare Python Workers
+"""
+import asyncio
+import logging
+import sys
+
+from main import scheduled
+from utils.local_cache import get_local_cache
+from utils.logger import setup_logger
+from utils.outbox import get_news_outbox
+from utils.time_utils import china_now
+
+__all__ = ["scheduled"]
+
+
+if __name__ == "__main__":
+    setup_logger()
+    try:
+        result = asyncio.run(scheduled({"time": china_now().isoformat(timespec="seconds")}, {}, {}))
+        logging.info(result["message"])
+    finally:
+        # 关闭本地缓存和暂存区，把WAL内容写回主文件
+        get_local_cache().close()
+        get_news_outbox().close()
+    sys.exit(0 if result["status"] == "success" else 1)